@@ -1,3 +1,34 @@
+import argparse
+import array
+import ast
+import bisect
+import contextlib
+import csv
+import decimal
+import fractions
+import functools
+import heapq
+import itertools
+import json
+import math
+import mmap
+import numbers
+import operator
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+from memoize import MemoCache
+
+
 def add(a, b):
     """Add two numbers together."""
     return a + b
@@ -13,40 +44,1591 @@ def multiply(a, b):
     return a * b
 
 
-def divide(a, b):
-    """Divide a by b."""
+EXACT_PRECISION = 34
+_EXACT_CONTEXT = decimal.Context(prec=EXACT_PRECISION)
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _exact_quotient(a, b, scale=1):
+    """Return ``a * scale / b`` without losing precision.
+
+    Stays on native ints and floats whenever they hold the exact result
+    and only falls back to a Decimal rounded to ``EXACT_PRECISION``
+    digits otherwise. Fractions stay Fractions.
+    """
+    if type(a) is int and type(b) is int:
+        num = a * scale
+        if num % b == 0:
+            return num // b
+        # Small ints divide to an exact float when the odd part of b
+        # divides num.
+        if (-_MAX_EXACT_INT <= num <= _MAX_EXACT_INT
+                and -_MAX_EXACT_INT <= b <= _MAX_EXACT_INT):
+            if num % (b // (b & -b)) == 0:
+                return num / b
+            return _EXACT_CONTEXT.divide(decimal.Decimal(num),
+                                         decimal.Decimal(b))
+    elif isinstance(a, fractions.Fraction) or isinstance(
+            b, fractions.Fraction):
+        return fractions.Fraction(a) * scale / fractions.Fraction(b)
+    elif isinstance(a, decimal.Decimal) or isinstance(b, decimal.Decimal):
+        return _EXACT_CONTEXT.divide(
+            _EXACT_CONTEXT.multiply(decimal.Decimal(a), scale),
+            decimal.Decimal(b))
+    try:
+        a_num, a_den = a.as_integer_ratio()
+        b_num, b_den = b.as_integer_ratio()
+    except (OverflowError, ValueError):
+        return a / b * scale
+    num = a_num * b_den * scale
+    if num == 0:
+        return a / b * scale
+    den = a_den * b_num
+    if den < 0:
+        num, den = -num, -den
+    divisor = math.gcd(num, den)
+    num //= divisor
+    den //= divisor
+    # A float can only hold num / den when den is a power of two and the
+    # odd part of num fits in the 53-bit mantissa; tiny quotients may
+    # still underflow, so the float is checked before it is returned.
+    if not den & (den - 1) and abs(num) // (num & -num) < _MAX_EXACT_INT:
+        try:
+            quotient = num / den
+        except OverflowError:
+            pass
+        else:
+            if quotient.as_integer_ratio() == (num, den):
+                return quotient
+    return _EXACT_CONTEXT.divide(decimal.Decimal(num), decimal.Decimal(den))
+
+
+def divide(a, b, exact=False):
+    """Divide a by b.
+
+    With ``exact=True`` the result keeps full precision, see
+    ``_exact_quotient``.
+    """
     if b == 0:
         raise ValueError("Cannot divide by zero!")
+    if exact:
+        return _exact_quotient(a, b)
     return a / b
 
 
-def calculate_percentage(value, total):
-    """Calculate percentage of value from total."""
+def calculate_percentage(value, total, exact=False):
+    """Calculate percentage of value from total.
+
+    ``exact`` works as for ``divide``.
+    """
     if total == 0:
         raise ValueError("Total cannot be zero!")
+    if exact:
+        return _exact_quotient(value, total, 100)
     return (value / total) * 100
 
 
+OPERATIONS = {
+    "add": add,
+    "subtract": subtract,
+    "multiply": multiply,
+    "divide": divide,
+    "calculate_percentage": calculate_percentage,
+}
+_EXACT_OPERATIONS = {
+    "divide": functools.partial(divide, exact=True),
+    "calculate_percentage": functools.partial(calculate_percentage,
+                                              exact=True),
+}
+
+
+def _batch_operand(values):
+    """Return a batch operand as an array, iterable or broadcast scalar."""
+    if isinstance(values, numbers.Number):
+        return values
+    if np is not None:
+        return np.asarray(values, dtype=np.float64)
+    try:
+        return memoryview(values)
+    except TypeError:
+        return values if hasattr(values, "__len__") else list(values)
+
+
+def _batch_pairs(a, b):
+    """Pair up two batch operands element-wise for the pure-Python path."""
+    a_scalar = isinstance(a, numbers.Number)
+    b_scalar = isinstance(b, numbers.Number)
+    if a_scalar and b_scalar:
+        return [(a, b)]
+    if a_scalar:
+        return ((a, y) for y in b)
+    if b_scalar:
+        return ((x, b) for x in a)
+    if len(a) != len(b):
+        raise ValueError("Batch operands must have the same length!")
+    return zip(a, b)
+
+
+def _batch_binary(a, b, op, ufunc_name):
+    """Apply an arithmetic operation element-wise, returning floats."""
+    a = _batch_operand(a)
+    b = _batch_operand(b)
+    if np is not None:
+        return getattr(np, ufunc_name)(a, b, dtype=np.float64)
+    return array.array("d", (op(x, y) for x, y in _batch_pairs(a, b)))
+
+
+def add_batch(a, b):
+    """Add two batches of numbers element-wise."""
+    return _batch_binary(a, b, add, "add")
+
+
+def subtract_batch(a, b):
+    """Subtract batch b from batch a element-wise."""
+    return _batch_binary(a, b, subtract, "subtract")
+
+
+def multiply_batch(a, b):
+    """Multiply two batches of numbers element-wise."""
+    return _batch_binary(a, b, multiply, "multiply")
+
+
+def _batch_divide(a, b, scale, fill, return_mask):
+    """Divide element-wise, replacing zero-divisor rows with fill."""
+    a = _batch_operand(a)
+    b = _batch_operand(b)
+    if np is not None:
+        nonzero = np.not_equal(b, 0)
+        shape = np.broadcast(a, b).shape
+        result = np.full(shape, fill, dtype=np.float64)
+        np.divide(a, b, out=result, where=nonzero)
+        if scale is not None:
+            np.multiply(result, scale, out=result, where=nonzero)
+        if return_mask:
+            return result, ~np.broadcast_to(nonzero, shape)
+        return result
+
+    result = array.array("d")
+    mask = bytearray()
+    for x, y in _batch_pairs(a, b):
+        if y == 0:
+            result.append(fill)
+            mask.append(1)
+        elif scale is None:
+            result.append(x / y)
+            mask.append(0)
+        else:
+            result.append((x / y) * scale)
+            mask.append(0)
+    if return_mask:
+        return result, mask
+    return result
+
+
+_SPLITTER = 2.0 ** 27 + 1
+# Below this magnitude _two_product's partial products may underflow.
+_TWO_PRODUCT_MIN = 2.0 ** -960
+
+
+def _two_product(x, y):
+    """Return ``(p, e)`` arrays with ``p + e == x * y`` exactly (Dekker)."""
+    p = x * y
+    t = _SPLITTER * x
+    x_hi = t - (t - x)
+    x_lo = x - x_hi
+    t = _SPLITTER * y
+    y_hi = t - (t - y)
+    y_lo = y - y_hi
+    return p, ((x_hi * y_hi - p) + x_hi * y_lo + x_lo * y_hi) + x_lo * y_lo
+
+
+def _exact_array(values):
+    """Return values as an int/float ndarray that float64 holds exactly."""
+    # Typed buffers hold one type, so they need no per-element scan.
+    array_input = isinstance(values, (np.ndarray, array.array, memoryview))
+    source = values
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and values.dtype.itemsize <= 8:
+        # Mixed Python ints and floats are coerced to float64, which may
+        # round large ints and loses which rows should divide to ints.
+        if array_input or isinstance(source, numbers.Number) or not any(
+                isinstance(value, numbers.Integral) for value in source):
+            return values
+        return None
+    if values.dtype.kind in "iu" and (
+            not values.size or (values.min() >= -_MAX_EXACT_INT
+                                and values.max() <= _MAX_EXACT_INT)):
+        return values
+    return None
+
+
+def _batch_divide_exact(a, b, scale, fill, return_mask):
+    """Divide element-wise like ``divide(exact=True)``, filling zero rows.
+
+    With NumPy, rows whose float64 quotient is provably exact are taken
+    from one vectorized division; only the rest go through
+    ``_exact_quotient``.
+    """
+    scale = 1 if scale is None else scale
+    x = y = None
+    if np is not None:
+        x = _exact_array(a)
+        y = _exact_array(b)
+    if x is None or y is None:
+        results = []
+        mask = bytearray()
+        for lhs, rhs in _batch_pairs(_batch_list(a), _batch_list(b)):
+            mask.append(rhs == 0)
+            results.append(fill if rhs == 0 else
+                           _exact_quotient(lhs, rhs, scale))
+        if np is not None:
+            mask = np.frombuffer(mask, dtype=bool).copy()
+        return (results, mask) if return_mask else results
+
+    x, y = np.broadcast_arrays(x, y)
+    zero = y == 0
+    with np.errstate(all="ignore"):
+        fx = x.astype(np.float64)
+        fy = y.astype(np.float64)
+        num, num_error = _two_product(fx, np.float64(scale))
+        quotient = num / fy
+        product, product_error = _two_product(quotient, fy)
+        exact = ((num_error == 0) & (product == num) & (product_error == 0)
+                 & np.isfinite(quotient)
+                 & (((np.abs(num) >= _TWO_PRODUCT_MIN)
+                     & (np.abs(quotient) >= np.finfo(np.float64).tiny))
+                    | (num == 0)))
+    results = quotient.astype(object)
+    if x.dtype.kind in "iu" and y.dtype.kind in "iu":
+        # int / int stays an int whenever it divides evenly.
+        integral = exact & (quotient == np.floor(quotient))
+        results[integral] = quotient[integral].astype(np.int64).astype(
+            object)
+    results[zero] = fill
+    for i in np.flatnonzero(~exact & ~zero).tolist():
+        results[i] = _exact_quotient(x[i].item(), y[i].item(), scale)
+    results = results.tolist()
+    return (results, zero) if return_mask else results
+
+
+def _batch_list(values):
+    """Return a batch operand as Python numbers, keeping scalars."""
+    if isinstance(values, numbers.Number):
+        return values
+    if np is not None and isinstance(values, np.ndarray):
+        return values.tolist()
+    return values if hasattr(values, "__len__") else list(values)
+
+
+def divide_batch(a, b, fill=math.nan, return_mask=False, exact=False):
+    """Divide batch a by batch b element-wise.
+
+    Rows with a zero divisor are set to ``fill`` instead of raising.
+    With ``return_mask=True`` a ``(result, mask)`` pair is returned where
+    the mask is truthy for every zero-divisor row. With ``exact=True``
+    the result is a list holding ``divide(x, y, exact=True)`` for every
+    row.
+    """
+    if exact:
+        return _batch_divide_exact(a, b, None, fill, return_mask)
+    return _batch_divide(a, b, None, fill, return_mask)
+
+
+def calculate_percentage_batch(values, totals, fill=math.nan,
+                               return_mask=False, exact=False):
+    """Calculate percentages of values from totals element-wise.
+
+    Zero totals follow the same fill/mask policy as ``divide_batch``,
+    and ``exact`` works the same way.
+    """
+    if exact:
+        return _batch_divide_exact(values, totals, 100, fill, return_mask)
+    return _batch_divide(values, totals, 100, fill, return_mask)
+
+
+def _factorize(keys):
+    """Return ``(codes, unique_keys)`` numbering keys by first appearance."""
+    lookup = {}
+    codes = [lookup.setdefault(key, len(lookup)) for key in keys]
+    return codes, list(lookup)
+
+
+def _float_array(values):
+    """Return values as a float64 ndarray, copying only when needed."""
+    if hasattr(values, "__len__") or hasattr(values, "__array__"):
+        return np.asarray(values, dtype=np.float64)
+    return np.fromiter(values, dtype=np.float64)
+
+
+def percent_of_total(values, keys=None, return_totals=False):
+    """Calculate every value's percentage of the total in bulk.
+
+    Equivalent to ``calculate_percentage(value, sum(values))`` per row,
+    but ``values`` (an iterable, buffer or array) is read only once. With
+    ``keys``, an iterable of one group key per value, each value is a
+    percentage of its own group's total. A zero total raises the usual
+    ``ValueError``; with keys, only a zero-total group raises.
+    ``return_totals=True`` also returns the total, or a dict of totals
+    per key.
+    """
+    if keys is None:
+        shares, total = _percent_of_total(values)
+    else:
+        shares, total = _grouped_percent_of_total(values, keys)
+    return (shares, total) if return_totals else shares
+
+
+def _percent_of_total(values):
+    """Return shares of the overall total and the total."""
+    if np is not None:
+        values = _float_array(values)
+        total = float(values.sum())
+        if total == 0:
+            raise ValueError("Total cannot be zero!")
+        shares = np.divide(values, total)
+        shares *= 100
+        return shares, total
+
+    try:
+        values = memoryview(values)
+    except TypeError:
+        values = array.array("d", values)
+    else:
+        if values.format != "d":
+            values = array.array("d", values)
+    total = math.fsum(values)
+    if total == 0:
+        raise ValueError("Total cannot be zero!")
+    return array.array("d", ((v / total) * 100 for v in values)), total
+
+
+def _grouped_percent_of_total(values, keys):
+    """Return shares of each group's total and the totals per key."""
+    if np is not None:
+        values = _float_array(values)
+        if isinstance(keys, np.ndarray):
+            group_keys, codes = np.unique(keys, return_inverse=True)
+            group_keys = group_keys.tolist()
+        else:
+            codes, group_keys = _factorize(keys)
+            codes = np.asarray(codes, dtype=np.intp)
+        if len(codes) != len(values):
+            raise ValueError("Batch operands must have the same length!")
+        totals = np.bincount(codes, weights=values,
+                             minlength=len(group_keys))
+        _check_group_totals(group_keys, totals.tolist())
+        shares = np.divide(values, totals[codes])
+        shares *= 100
+        return shares, dict(zip(group_keys, totals.tolist()))
+
+    values = array.array("d", values)
+    codes, group_keys = _factorize(keys)
+    if len(codes) != len(values):
+        raise ValueError("Batch operands must have the same length!")
+    totals = [0.0] * len(group_keys)
+    for value, code in zip(values, codes):
+        totals[code] += value
+    _check_group_totals(group_keys, totals)
+    shares = array.array("d", [(value / totals[code]) * 100
+                               for value, code in zip(values, codes)])
+    return shares, dict(zip(group_keys, totals))
+
+
+def _check_group_totals(group_keys, totals):
+    """Raise the zero-total error for the first group summing to zero."""
+    for key, total in zip(group_keys, totals):
+        if total == 0:
+            raise ValueError(f"Total cannot be zero for group {key!r}!")
+
+
+BATCH_OPERATIONS = {
+    "add": add_batch,
+    "subtract": subtract_batch,
+    "multiply": multiply_batch,
+    "divide": divide_batch,
+    "calculate_percentage": calculate_percentage_batch,
+}
+
+
+_REDUCE_CHUNK = 65536
+_PRODUCT_BLOCK = 512
+
+
+def _float_chunks(values, size=_REDUCE_CHUNK):
+    """Yield float64 buffers covering ``values`` in O(size) memory.
+
+    Arrays and float64 buffers are yielded whole without copying; other
+    iterables are consumed ``size`` items at a time. Chunks are NumPy
+    arrays when NumPy is available and ``array('d')`` otherwise.
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        yield np.ascontiguousarray(values, dtype=np.float64).ravel()
+        return
+    try:
+        view = memoryview(values)
+    except TypeError:
+        pass
+    else:
+        if view.format == "d" and view.ndim == 1:
+            yield np.frombuffer(view) if np is not None else view
+            return
+    iterator = iter(values)
+    while True:
+        chunk = array.array("d", itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield np.frombuffer(chunk) if np is not None else chunk
+
+
+class CompensatedSum:
+    """Running sum that does not accumulate rounding error.
+
+    ``add`` uses Neumaier's variant of Kahan summation; ``update`` sums
+    whole chunks with ``math.fsum`` and folds them in the same way.
+    """
+
+    def __init__(self, values=()):
+        self._total = 0.0
+        self._compensation = 0.0
+        self.update(values)
+
+    def add(self, value):
+        """Add one value."""
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    def update(self, values):
+        """Add every value from an iterable, buffer or array."""
+        for chunk in _float_chunks(values):
+            try:
+                self.add(math.fsum(memoryview(chunk)))
+            except (OverflowError, ValueError):
+                # Infinite or overflowing terms: let them propagate.
+                for value in memoryview(chunk):
+                    self.add(value)
+
+    @property
+    def value(self):
+        """The compensated sum."""
+        if not math.isfinite(self._total):
+            return self._total
+        return self._total + self._compensation
+
+
+class LogProduct:
+    """Running product that cannot overflow or underflow midway.
+
+    The product is kept as a mantissa and a binary exponent, i.e. its
+    base-2 logarithm is accumulated exactly, so it only overflows when
+    ``value`` is finally read.
+    """
+
+    def __init__(self, values=()):
+        self._mantissa = 1.0
+        self._exponent = 0
+        self.update(values)
+
+    def add(self, value):
+        """Multiply in one value."""
+        self._mantissa, exponent = math.frexp(self._mantissa * value)
+        self._exponent += exponent
+
+    def update(self, values):
+        """Multiply in every value from an iterable, buffer or array."""
+        for chunk in _float_chunks(values):
+            if np is None:
+                for value in chunk:
+                    self.add(value)
+                continue
+            mantissas, exponents = np.frexp(chunk)
+            self._exponent += int(exponents.sum())
+            # Mantissas are at least 0.5, so blocks of 512 cannot
+            # underflow before they are renormalized.
+            while mantissas.size > 1:
+                padding = -mantissas.size % _PRODUCT_BLOCK
+                if padding:
+                    mantissas = np.concatenate(
+                        (mantissas, np.ones(padding)))
+                mantissas, exponents = np.frexp(
+                    mantissas.reshape(-1, _PRODUCT_BLOCK).prod(axis=1))
+                self._exponent += int(exponents.sum())
+            if mantissas.size:
+                self.add(float(mantissas[0]))
+
+    @property
+    def log(self):
+        """Natural logarithm of the absolute product."""
+        if self._mantissa == 0:
+            return -math.inf
+        return math.log(abs(self._mantissa)) + self._exponent * math.log(2)
+
+    @property
+    def sign(self):
+        """Sign of the product: -1.0, 0.0 or 1.0 (nan if undefined)."""
+        if math.isnan(self._mantissa):
+            return math.nan
+        return math.copysign(1.0, self._mantissa) if self._mantissa else 0.0
+
+    @property
+    def value(self):
+        """The product, or a signed infinity if it does not fit a float."""
+        try:
+            return math.ldexp(self._mantissa, self._exponent)
+        except OverflowError:
+            return math.copysign(math.inf, self._mantissa)
+
+
+class RunningStats:
+    """Running mean and variance using Welford's method.
+
+    ``update`` reduces whole chunks with NumPy when available and merges
+    them with Chan's parallel formula.
+    """
+
+    def __init__(self, values=()):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.update(values)
+
+    def add(self, value):
+        """Add one value."""
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def update(self, values):
+        """Add every value from an iterable, buffer or array."""
+        for chunk in _float_chunks(values):
+            if np is None:
+                for value in chunk:
+                    self.add(value)
+                continue
+            if not chunk.size:
+                continue
+            mean = float(chunk.mean())
+            deviations = chunk - mean
+            self._merge(chunk.size, mean, float(deviations @ deviations))
+
+    def _merge(self, count, mean, m2):
+        """Combine with the statistics of another batch of values."""
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def mean(self):
+        """Arithmetic mean of the values."""
+        if not self.count:
+            raise ValueError("Mean requires at least one value!")
+        return self._mean
+
+    @property
+    def variance(self):
+        """Population variance of the values."""
+        if not self.count:
+            raise ValueError("Variance requires at least one value!")
+        return self._m2 / self.count
+
+    @property
+    def sample_variance(self):
+        """Sample variance of the values."""
+        if self.count < 2:
+            raise ValueError("Sample variance requires at least two "
+                             "values!")
+        return self._m2 / (self.count - 1)
+
+
+def stable_sum(values):
+    """Sum values without accumulating rounding error."""
+    return CompensatedSum(values).value
+
+
+def stable_product(values):
+    """Multiply values without intermediate overflow or underflow."""
+    return LogProduct(values).value
+
+
+def mean_variance(values):
+    """Return the mean and population variance of values in one pass."""
+    stats = RunningStats(values)
+    return stats.mean, stats.variance
+
+
+_NUMBER_RE = re.compile(r"((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)")
+_EXPRESSION_FUNCTIONS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "divide",
+}
+_EXPRESSION_NAMESPACE = {
+    "__builtins__": {},
+    "add": add,
+    "subtract": subtract,
+    "multiply": multiply,
+    "divide": divide,
+}
+
+
+def _split_expression(expr):
+    """Split an expression into its template pieces and operand values."""
+    pieces = _NUMBER_RE.split(expr)
+    operands = [int(text) if text.isdigit() else float(text)
+                for text in pieces[1::2]]
+    return tuple(pieces[::2]), operands
+
+
+def _expression_source(node, names):
+    """Translate a validated expression AST node into Python source."""
+    if isinstance(node, ast.BinOp) and type(node.op) in _EXPRESSION_FUNCTIONS:
+        return "{}({}, {})".format(_EXPRESSION_FUNCTIONS[type(node.op)],
+                                   _expression_source(node.left, names),
+                                   _expression_source(node.right, names))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return f"(-{_expression_source(node.operand, names)})"
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+        return f"(+{_expression_source(node.operand, names)})"
+    if isinstance(node, ast.Name) and node.id in names:
+        return node.id
+    raise ValueError("Unsupported expression!")
+
+
+def compile_expression(template):
+    """Compile an expression template into a callable.
+
+    ``template`` holds the text between operands, as produced by splitting
+    ``"5 + 10"`` into ``("", " + ", "")``. The returned callable takes one
+    argument per operand slot and dispatches to the module functions, so
+    dividing by zero raises the usual ``ValueError``.
+    """
+    if any("#" in piece for piece in template):
+        raise ValueError("Unsupported expression!")
+    names = [f"_{i}" for i in range(len(template) - 1)]
+    source = "".join(piece + (f" {name} " if name else "")
+                     for piece, name in zip(template, names + [""]))
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError:
+        raise ValueError("Invalid expression!") from None
+    body = _expression_source(tree.body, set(names))
+    code = compile(f"lambda {', '.join(names)}: {body}", "<expression>",
+                   "eval")
+    return eval(code, _EXPRESSION_NAMESPACE)
+
+
+OPERATORS = ("+", "-", "*", "/")
+RAW_OPERATION = 255
+_OP_CODES = {symbol: code for code, symbol in enumerate(OPERATORS)}
+_NAMED_OP_CODES = {"add": 0, "subtract": 1, "multiply": 2, "divide": 3}
+
+# Bit flags stored per history record in HistoryStore._kinds.
+_LHS_INT = 1
+_RHS_INT = 2
+_RESULT_INT = 4
+
+
+def _number_kind(value, flag):
+    """Return the kind flag for a number, or None if it is not columnar."""
+    if type(value) is int:
+        return flag if -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT else None
+    if type(value) is float:
+        return 0
+    return None
+
+
+def _parse_operand(text):
+    """Parse an operand that formats back to exactly the same text."""
+    try:
+        value = int(text)
+    except ValueError:
+        try:
+            value = float(text)
+        except ValueError:
+            return None
+        return value if repr(value) == text else None
+    return value if str(value) == text else None
+
+
+def _format_number(value, is_int):
+    """Format a stored column value the way an f-string would."""
+    return str(int(value)) if is_int else repr(value)
+
+
+def _format_fields(fields):
+    """Format ``HistoryStore._fields`` output as a history string."""
+    code, kinds, lhs, rhs, result, raw = fields
+    if code == RAW_OPERATION:
+        operation, result = raw
+        return f"{operation} = {result}"
+    return "{} {} {} = {}".format(
+        _format_number(lhs, kinds & _LHS_INT),
+        OPERATORS[code],
+        _format_number(rhs, kinds & _RHS_INT),
+        _format_number(result, kinds & _RESULT_INT))
+
+
+class HistoryStore:
+    """Compact, optionally bounded storage for calculation history.
+
+    Records are kept as (operation code, operands, result) in typed
+    columns and only formatted as ``"<operation> = <result>"`` strings
+    when read. With a ``capacity`` the store behaves as a ring buffer
+    and silently drops the oldest records.
+    """
+
+    def __init__(self, capacity=None):
+        if capacity is not None and capacity <= 0:
+            raise ValueError("History capacity must be positive!")
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        """Drop every stored record."""
+        self._ops = array.array("B")
+        self._lhs = array.array("d")
+        self._rhs = array.array("d")
+        self._results = array.array("d")
+        self._kinds = array.array("B")
+        self._raw = {}
+        self._start = 0
+
+    def __len__(self):
+        return len(self._ops)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        return self._format(self._slot(index))
+
+    def _slot(self, index):
+        """Translate a logical record index into a column slot."""
+        size = len(self._ops)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        return (self._start + index) % size
+
+    def _store(self, op, lhs, rhs, result, kinds, raw=None):
+        """Write one record, overwriting the oldest when full.
+
+        Returns the slot the record was written to.
+        """
+        if self.capacity is None or len(self._ops) < self.capacity:
+            slot = len(self._ops)
+            self._ops.append(op)
+            self._lhs.append(lhs)
+            self._rhs.append(rhs)
+            self._results.append(result)
+            self._kinds.append(kinds)
+        else:
+            slot = self._start
+            self._start = (slot + 1) % self.capacity
+            self._raw.pop(slot, None)
+            self._ops[slot] = op
+            self._lhs[slot] = lhs
+            self._rhs[slot] = rhs
+            self._results[slot] = result
+            self._kinds[slot] = kinds
+        if raw is not None:
+            self._raw[slot] = raw
+        return slot
+
+    def append(self, operation, result):
+        """Store an ``"a <op> b"`` operation string and its result.
+
+        Returns the operation code the record was stored under.
+        """
+        parts = operation.split(" ") if type(operation) is str else ()
+        if len(parts) == 3 and parts[1] in _OP_CODES:
+            lhs = _parse_operand(parts[0])
+            rhs = _parse_operand(parts[2])
+            if lhs is not None and rhs is not None:
+                return self.record(parts[1], lhs, rhs, result)
+        self._store(RAW_OPERATION, 0.0, 0.0, 0.0, 0,
+                    raw=(operation, result))
+        return RAW_OPERATION
+
+    def record(self, op, lhs, rhs, result):
+        """Store a structured record without building or parsing text.
+
+        Returns the operation code the record was stored under.
+        """
+        code = _OP_CODES.get(op)
+        lhs_kind = _number_kind(lhs, _LHS_INT)
+        rhs_kind = _number_kind(rhs, _RHS_INT)
+        result_kind = _number_kind(result, _RESULT_INT)
+        if (code is None or lhs_kind is None or rhs_kind is None
+                or result_kind is None):
+            self._store(RAW_OPERATION, 0.0, 0.0, 0.0, 0,
+                        raw=(f"{lhs} {op} {rhs}", result))
+            return RAW_OPERATION
+        self._store(code, lhs, rhs, result,
+                    lhs_kind | rhs_kind | result_kind)
+        return code
+
+    def records(self):
+        """Yield ``(op, lhs, rhs, result)`` tuples, oldest first.
+
+        Records that could not be stored in columns are yielded as
+        ``(None, operation, None, result)``.
+        """
+        for i in range(len(self)):
+            yield self._record(self._slot(i))
+
+    def columns(self):
+        """Return the records as typed columns, oldest first.
+
+        Returns ``(columns, raw)`` where ``columns`` maps the
+        ``ARCHIVE_COLUMNS`` names to arrays and ``raw`` maps row numbers
+        to the ``(operation, result)`` of free-form records.
+        """
+        start = self._start
+        columns = {}
+        for name, column in zip(ARCHIVE_COLUMNS, (
+                self._ops, self._kinds, self._lhs, self._rhs,
+                self._results)):
+            columns[name] = column[start:] + column[:start]
+        size = len(self)
+        raw = {(slot - start) % size: value
+               for slot, value in self._raw.items()}
+        return columns, raw
+
+    @classmethod
+    def from_columns(cls, columns, raw=None, capacity=None):
+        """Build a store from ``columns()`` output, oldest record first.
+
+        Columns are copied as raw bytes, so memoryviews of an archive load
+        without a per-record loop. With a ``capacity`` only the newest
+        records are kept.
+        """
+        store = cls(capacity)
+        targets = (store._ops, store._kinds, store._lhs, store._rhs,
+                   store._results)
+        for name, target in zip(ARCHIVE_COLUMNS, targets):
+            target.frombytes(memoryview(columns[name]).cast("B"))
+        skip = 0
+        if capacity is not None and len(store) > capacity:
+            skip = len(store) - capacity
+            for target in targets:
+                del target[:skip]
+        store._raw = {row - skip: value
+                      for row, value in (raw or {}).items() if row >= skip}
+        return store
+
+    def memory_usage(self):
+        """Estimate the bytes held by the stored records."""
+        size = sys.getsizeof(self._raw) + sum(
+            sys.getsizeof(column) for column in (
+                self._ops, self._kinds, self._lhs, self._rhs,
+                self._results))
+        for value in self._raw.values():
+            size += sum(map(sys.getsizeof, value), sys.getsizeof(value))
+        return size
+
+    def _fields(self, slot):
+        """Return ``(code, kinds, lhs, rhs, result, raw)`` for a slot."""
+        return (self._ops[slot], self._kinds[slot], self._lhs[slot],
+                self._rhs[slot], self._results[slot], self._raw.get(slot))
+
+    def _record(self, slot):
+        """Return the structured record held in a column slot."""
+        code, kinds, lhs, rhs, result, raw = self._fields(slot)
+        if code == RAW_OPERATION:
+            operation, result = raw
+            return None, operation, None, result
+        return (OPERATORS[code],
+                int(lhs) if kinds & _LHS_INT else lhs,
+                int(rhs) if kinds & _RHS_INT else rhs,
+                int(result) if kinds & _RESULT_INT else result)
+
+    def _format(self, slot):
+        """Format the record in a slot as a history string."""
+        return _format_fields(self._fields(slot))
+
+
+ARCHIVE_MAGIC = b"CALCCOLS"
+ARCHIVE_VERSION = 1
+# name and array typecode of every archived column
+ARCHIVE_COLUMNS = ("op", "kinds", "lhs", "rhs", "result")
+_ARCHIVE_TYPES = ("B", "B", "d", "d", "d")
+# magic, version
+_ARCHIVE_HEADER = struct.Struct("<8sI4x")
+# directory offset, directory length, magic
+_ARCHIVE_TRAILER = struct.Struct("<QQ8s")
+_ARCHIVE_ALIGN = 8
+
+
+def export_history(history, path):
+    """Write a history store to a columnar archive file.
+
+    Every column is one contiguous, 8-byte aligned little-endian array;
+    the op column holds codes into the archive's operator dictionary, or
+    ``RAW_OPERATION`` for free-form records, which are kept in a small
+    JSON table. A JSON directory of column offsets sits at the end of
+    the file. The file is written under a temporary name and renamed, so
+    readers never see a partial archive.
+    """
+    columns, raw = history.columns()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION))
+        directory = {"rows": len(columns["op"]),
+                     "dictionary": list(OPERATORS),
+                     "raw_code": RAW_OPERATION,
+                     "columns": {}}
+        for name, typecode in zip(ARCHIVE_COLUMNS, _ARCHIVE_TYPES):
+            column = columns[name]
+            if getattr(column, "typecode", None) != typecode and getattr(
+                    column, "format", None) != typecode:
+                column = array.array(typecode, column)
+            if sys.byteorder != "little":
+                column = array.array(typecode, column)
+                column.byteswap()
+            f.write(bytes(-f.tell() % _ARCHIVE_ALIGN))
+            directory["columns"][name] = {"type": typecode,
+                                          "offset": f.tell(),
+                                          "length": len(column)}
+            f.write(column)
+        directory["raw"] = [[row, f"{operation}", f"{result}"]
+                            for row, (operation, result)
+                            in sorted(raw.items())]
+        data = json.dumps(directory).encode()
+        offset = f.tell()
+        f.write(data)
+        f.write(_ARCHIVE_TRAILER.pack(offset, len(data), ARCHIVE_MAGIC))
+    os.replace(tmp_path, path)
+
+
+class HistoryArchive(HistoryStore):
+    """Read-only history backed by a memory-mapped columnar archive.
+
+    Columns are memoryviews straight into the mapped file, so opening an
+    archive costs one directory read no matter how many records it holds.
+    ``to_numpy()`` exposes the same memory as NumPy arrays.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.capacity = None
+        self._start = 0
+        self._views = []
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._directory = self._read_directory()
+        except (ValueError, struct.error):
+            self._map.close()
+            raise ValueError(f"Not a calculator history archive: {path}")
+        self.dictionary = tuple(self._directory["dictionary"])
+        self._ops, self._kinds, self._lhs, self._rhs, self._results = (
+            self._column(name) for name in ARCHIVE_COLUMNS)
+        self._raw = {row: (operation, result)
+                     for row, operation, result in self._directory["raw"]}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_directory(self):
+        """Check the header and trailer and parse the column directory."""
+        magic, version = _ARCHIVE_HEADER.unpack_from(self._map, 0)
+        offset, length, end_magic = _ARCHIVE_TRAILER.unpack_from(
+            self._map, len(self._map) - _ARCHIVE_TRAILER.size)
+        if (magic != ARCHIVE_MAGIC or end_magic != ARCHIVE_MAGIC
+                or version != ARCHIVE_VERSION):
+            raise ValueError("bad archive magic")
+        return json.loads(self._map[offset:offset + length])
+
+    def _column(self, name):
+        """Return a zero-copy memoryview of one column."""
+        info = self._directory["columns"][name]
+        size = struct.calcsize(info["type"])
+        start = info["offset"]
+        view = memoryview(self._map)[start:start + info["length"] * size]
+        view = view.cast(info["type"])
+        self._views.append(view)
+        return view
+
+    def to_numpy(self):
+        """Return the columns as read-only NumPy arrays sharing the map."""
+        if np is None:
+            raise ValueError("NumPy is required for to_numpy()!")
+        arrays = {}
+        for name in ARCHIVE_COLUMNS:
+            info = self._directory["columns"][name]
+            dtype = np.dtype(info["type"]).newbyteorder("<")
+            arrays[name] = np.frombuffer(self._map, dtype=dtype,
+                                         count=info["length"],
+                                         offset=info["offset"])
+        return arrays
+
+    def columns(self):
+        """Return the mapped columns and the free-form records."""
+        return dict(zip(ARCHIVE_COLUMNS, (
+            self._ops, self._kinds, self._lhs, self._rhs,
+            self._results))), dict(self._raw)
+
+    def close(self):
+        """Release the mapped file.
+
+        NumPy arrays from ``to_numpy()`` keep the mapping alive until they
+        are garbage collected.
+        """
+        for view in self._views:
+            view.release()
+        self._views = []
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def clear(self):
+        """Reject changes; archives are read-only."""
+        raise ValueError("History archives are read-only!")
+
+    def _store(self, op, lhs, rhs, result, kinds, raw=None):
+        """Reject changes; archives are read-only."""
+        raise ValueError("History archives are read-only!")
+
+
+def load_history(path):
+    """Open a columnar history archive written by ``export_history``."""
+    return HistoryArchive(path)
+
+
+_first = operator.itemgetter(0)
+_second = operator.itemgetter(1)
+
+
+class HistoryIndex:
+    """Secondary indexes over a history store.
+
+    Every record gets a sequence number; the index keeps the record
+    timestamps in sequence order, one sequence array per operation and a
+    result column sorted for bisect range queries. New results land in a
+    small pending run that is sorted on demand and merged into the main
+    run once it grows, so appends stay cheap. Records the store has
+    dropped (ring buffer eviction) are skipped and purged lazily.
+    """
+
+    def __init__(self, history, clock=time.time, merge_threshold=1024):
+        self.history = history
+        self.clock = clock
+        self.merge_threshold = merge_threshold
+        self.clear()
+
+    def clear(self):
+        """Drop every indexed record."""
+        self._appended = 0
+        self._base = 0
+        self._times = array.array("d")
+        self._codes = array.array("B")
+        self._by_op = {}
+        self._result_values = array.array("d")
+        self._result_seqs = array.array("q")
+        self._pending = []
+        self._pending_sorted = True
+        self._next_check = self.merge_threshold
+
+    def add(self, code, result):
+        """Index the record just appended to the history."""
+        seq = self._appended
+        self._appended += 1
+        timestamp = self.clock()
+        times = self._times
+        if times and timestamp < times[-1]:
+            timestamp = times[-1]
+        times.append(timestamp)
+        self._codes.append(code)
+        by_op = self._by_op.get(code)
+        if by_op is None:
+            by_op = self._by_op[code] = array.array("q")
+        by_op.append(seq)
+        if code != RAW_OPERATION and result == result:
+            self._pending.append((result, seq))
+            self._pending_sorted = False
+        if seq >= self._next_check:
+            self._maintain()
+
+    def _maintain(self):
+        """Purge dropped records and merge a grown pending run."""
+        self._next_check = self._appended + self.merge_threshold
+        if self._first_live() - self._base > len(self.history):
+            self._purge()
+        elif len(self._pending) > max(self.merge_threshold,
+                                      len(self._result_values) >> 2):
+            self._merge()
+
+    def _first_live(self):
+        """Return the sequence number of the oldest stored record."""
+        return self._appended - len(self.history)
+
+    def _merge(self):
+        """Merge the pending results into the sorted run."""
+        merged = sorted(itertools.chain(
+            zip(self._result_values, self._result_seqs), self._pending))
+        first_live = self._first_live()
+        if self._base < first_live:
+            merged = [item for item in merged if item[1] >= first_live]
+        self._result_values = array.array("d", map(_first, merged))
+        self._result_seqs = array.array("q", map(_second, merged))
+        self._pending = []
+        self._pending_sorted = True
+
+    def _purge(self):
+        """Forget records that the history store no longer holds."""
+        first_live = self._first_live()
+        dropped = first_live - self._base
+        del self._times[:dropped]
+        del self._codes[:dropped]
+        self._base = first_live
+        for code, seqs in self._by_op.items():
+            del seqs[:bisect.bisect_left(seqs, first_live)]
+        self._merge()
+
+    def query(self, op=None, min_result=None, max_result=None, since=None,
+              until=None):
+        """Return matching records as ``(op, lhs, rhs, result, timestamp)``.
+
+        ``op`` is an operator symbol or operation name such as
+        ``"divide"``; result and time bounds are inclusive, with times in
+        the clock's units (seconds since the epoch by default). Records
+        are returned oldest first.
+        """
+        first_live = self._first_live()
+        lo = max(first_live, self._base)
+        hi = self._appended
+        if since is not None:
+            lo = max(lo, self._base + bisect.bisect_left(self._times, since))
+        if until is not None:
+            hi = min(hi, self._base + bisect.bisect_right(self._times, until))
+        code = None
+        if op is not None:
+            code = _OP_CODES.get(op, _NAMED_OP_CODES.get(op))
+            if code is None:
+                raise ValueError(f"Unknown operation: {op}")
+
+        if min_result is not None or max_result is not None:
+            seqs = sorted(seq for seq in self._result_range(min_result,
+                                                            max_result)
+                          if lo <= seq < hi and (
+                              code is None
+                              or self._codes[seq - self._base] == code))
+        elif code is not None:
+            by_op = self._by_op.get(code, ())
+            seqs = by_op[bisect.bisect_left(by_op, lo):
+                         bisect.bisect_left(by_op, hi)]
+        else:
+            seqs = range(lo, hi)
+
+        history = self.history
+        return [history._record(history._slot(seq - first_live))
+                + (self._times[seq - self._base],) for seq in seqs]
+
+    def _result_range(self, min_result, max_result):
+        """Yield sequence numbers whose result lies within the bounds."""
+        if not self._pending_sorted:
+            self._pending.sort()
+            self._pending_sorted = True
+        values = self._result_values
+        start = 0 if min_result is None else bisect.bisect_left(values,
+                                                                min_result)
+        stop = (len(values) if max_result is None
+                else bisect.bisect_right(values, max_result))
+        yield from self._result_seqs[start:stop]
+        pending = self._pending
+        start = 0 if min_result is None else bisect.bisect_left(
+            pending, (min_result, -1))
+        for value, seq in itertools.islice(pending, start, None):
+            if max_result is not None and value > max_result:
+                break
+            yield seq
+
+
 class Calculator:
     """A simple calculator class."""
 
-    def __init__(self):
-        self.history = []
+    def __init__(self, history_capacity=None, expression_cache_size=256,
+                 history=None, exact=False):
+        if history is None:
+            history = HistoryStore(history_capacity)
+        self.history = history
+        self.exact = exact
+        self._compiled_expression = functools.lru_cache(
+            maxsize=expression_cache_size)(compile_expression)
+        self._memo = None
+        self._history_index = None
 
     def add_to_history(self, operation, result):
         """Add operation to calculation history."""
-        self.history.append(f"{operation} = {result}")
+        code = self.history.append(operation, result)
+        if self._history_index is not None:
+            self._history_index.add(code, result)
+
+    def record(self, op, a, b, result):
+        """Add a structured ``a <op> b`` operation to the history."""
+        code = self.history.record(op, a, b, result)
+        if self._history_index is not None:
+            self._history_index.add(code, result)
+
+    def enable_history_index(self, clock=time.time):
+        """Maintain query indexes as history is added.
+
+        Records already in the history are indexed with the current time.
+        """
+        index = HistoryIndex(self.history, clock=clock)
+        for op, _, _, result in self.history.records():
+            index.add(RAW_OPERATION if op is None else _OP_CODES[op], result)
+        self._history_index = index
+        return index
+
+    def query_history(self, op=None, min_result=None, max_result=None,
+                      since=None, until=None):
+        """Find history records by operation, result range and time.
+
+        See ``HistoryIndex.query``; requires ``enable_history_index()``.
+        """
+        if self._history_index is None:
+            raise ValueError("History indexing is not enabled!")
+        return self._history_index.query(op, min_result, max_result,
+                                         since, until)
+
+    def calculate(self, op, a, b):
+        """Apply the named module function, e.g. ``"divide"``, to a and b.
+
+        When the calculator was created with ``exact=True``, division and
+        percentages use the functions' exact mode.
+        """
+        try:
+            func = OPERATIONS[op]
+        except KeyError:
+            raise ValueError(f"Unknown operation: {op}") from None
+        if self.exact:
+            func = _EXACT_OPERATIONS.get(op, func)
+        if self._memo is None:
+            return func(a, b)
+        return self._memo.call((op, a, b, type(a), type(b)), func, a, b)
+
+    def enable_memoization(self, **options):
+        """Cache results of ``calculate`` and ``evaluate``.
+
+        Accepts the ``memoize.MemoCache`` options (policy, maxsize, ttl,
+        max_bytes, cache_exceptions) and returns the new cache.
+        """
+        self._memo = MemoCache(**options)
+        return self._memo
+
+    def disable_memoization(self):
+        """Stop caching results and drop the cache."""
+        self._memo = None
+
+    def memo_stats(self):
+        """Get memoization statistics, or None when caching is off."""
+        return None if self._memo is None else self._memo.stats()
+
+    def evaluate(self, expr):
+        """Evaluate an arithmetic expression such as ``"5 + 10"``.
+
+        Expressions are compiled once per template, so ``"5 + 10"`` and
+        ``"7 + 3"`` share a cached callable and only their operands are
+        extracted on later calls.
+        """
+        if self._memo is not None:
+            return self._memo.call(("evaluate", expr), self._evaluate, expr)
+        return self._evaluate(expr)
+
+    def _evaluate(self, expr):
+        """Evaluate an expression through the compiled template cache."""
+        template, operands = _split_expression(expr)
+        return self._compiled_expression(template)(*operands)
+
+    def expression_cache_info(self):
+        """Get hit/miss statistics of the compiled expression cache."""
+        return self._compiled_expression.cache_info()
 
     def get_history(self):
         """Get calculation history."""
-        return self.history
+        return list(self.history)
+
+    def export_history(self, path):
+        """Write the history to a columnar archive, see ``export_history``.
+
+        Load it back with ``load_history(path)``, or pass that to
+        ``Calculator(history=...)`` for a read-only calculator history.
+        """
+        export_history(self.history, path)
 
     def clear_history(self):
         """Clear calculation history."""
-        self.history = []
+        self.history.clear()
+        if self._history_index is not None:
+            self._history_index.clear()
 
 
-if __name__ == "__main__":
+class _ThreadHistory(HistoryStore):
+    """One thread's history buffer, tagging records with sequence numbers.
+
+    Only the owning thread appends, so ``lock`` is uncontended except
+    while a snapshot or clear holds it.
+    """
+
+    def __init__(self, capacity, sequence):
+        self.lock = threading.Lock()
+        self._sequence = sequence
+        super().__init__(capacity)
+
+    def clear(self):
+        """Drop every stored record."""
+        super().clear()
+        self._seqs = array.array("q")
+
+    def _store(self, op, lhs, rhs, result, kinds, raw=None):
+        """Write one record and stamp it with the next sequence number."""
+        slot = HistoryStore._store(self, op, lhs, rhs, result, kinds, raw)
+        if slot < len(self._seqs):
+            self._seqs[slot] = next(self._sequence)
+        else:
+            self._seqs.append(next(self._sequence))
+        return slot
+
+    def sequenced(self):
+        """Return ``(seq, fields)`` pairs, oldest first."""
+        seqs = self._seqs
+        return [(seqs[slot], self._fields(slot))
+                for slot in map(self._slot, range(len(self)))]
+
+
+class _SynchronizedMemo:
+    """Serialize access to a MemoCache shared between threads."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def call(self, key, func, *args):
+        with self._lock:
+            return self.cache.call(key, func, *args)
+
+    def stats(self):
+        with self._lock:
+            return self.cache.stats()
+
+
+class ConcurrentCalculator(Calculator):
+    """A Calculator that many threads can share.
+
+    Each thread appends to its own history buffer, so recording never
+    waits on other threads. Every record takes a number from one global
+    sequence, and ``get_history()`` merges the buffers in that order.
+    Snapshots and ``clear_history()`` briefly lock every buffer, so they
+    never see a half-written record or interleave with each other. With
+    a ``history_capacity`` each buffer keeps that many records and
+    ``get_history()`` returns the newest ``history_capacity`` overall.
+    History indexing is not supported.
+    """
+
+    def __init__(self, history_capacity=None, expression_cache_size=256,
+                 exact=False):
+        super().__init__(history_capacity, expression_cache_size,
+                         exact=exact)
+        self.history = None
+        self._capacity = history_capacity
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        self._buffers = []
+        self._buffers_lock = threading.Lock()
+
+    def _buffer(self):
+        """Return the calling thread's history buffer, creating it once."""
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer = _ThreadHistory(self._capacity, self._sequence)
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+            self._local.buffer = buffer
+            return buffer
+
+    def add_to_history(self, operation, result):
+        """Add operation to the calling thread's history buffer."""
+        buffer = self._buffer()
+        with buffer.lock:
+            buffer.append(operation, result)
+
+    def record(self, op, a, b, result):
+        """Add a structured ``a <op> b`` operation to the history."""
+        buffer = self._buffer()
+        with buffer.lock:
+            buffer.record(op, a, b, result)
+
+    def enable_history_index(self, clock=time.time):
+        """Reject indexing, which would need a shared index."""
+        raise ValueError("History indexing is not supported by "
+                         "ConcurrentCalculator!")
+
+    def enable_memoization(self, **options):
+        """Cache results of ``calculate`` and ``evaluate`` under a lock."""
+        self._memo = _SynchronizedMemo(MemoCache(**options))
+        return self._memo.cache
+
+    @contextlib.contextmanager
+    def _locked_buffers(self):
+        """Hold every history buffer's lock."""
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        with contextlib.ExitStack() as stack:
+            for buffer in buffers:
+                stack.enter_context(buffer.lock)
+            yield buffers
+
+    def _snapshot(self):
+        """Return ``(seq, fields)`` of every visible record in order."""
+        with self._locked_buffers() as buffers:
+            runs = [buffer.sequenced() for buffer in buffers]
+        merged = list(heapq.merge(*runs, key=_first))
+        if self._capacity is not None:
+            merged = merged[-self._capacity:]
+        return merged
+
+    def get_history(self):
+        """Get a consistent snapshot of the history in recording order."""
+        return [_format_fields(fields) for _, fields in self._snapshot()]
+
+    def export_history(self, path):
+        """Write a consistent snapshot of the history to an archive."""
+        snapshot = HistoryStore()
+        for _, (code, kinds, lhs, rhs, result, raw) in self._snapshot():
+            snapshot._store(code, lhs, rhs, result, kinds, raw)
+        export_history(snapshot, path)
+
+    def clear_history(self):
+        """Clear the history of every thread."""
+        with self._locked_buffers() as buffers:
+            for buffer in buffers:
+                buffer.clear()
+
+
+_OPERATION_ALIASES = dict(zip(OPERATORS, ("add", "subtract", "multiply",
+                                          "divide")))
+STREAM_FORMATS = ("csv", "jsonl")
+
+
+def _parse_number(value):
+    """Parse a CSV/JSON operand into an int or float."""
+    if type(value) in (int, float):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid operand: {value!r}")
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"Invalid operand: {value!r}") from None
+
+
+def read_operations(lines, fmt="csv"):
+    """Yield ``(line_no, op, a, b)`` rows from CSV or JSONL lines.
+
+    CSV rows are ``op,a,b`` with an optional ``op,a,b`` header; JSONL rows
+    are objects with ``op``, ``a`` and ``b`` keys. Rows that cannot be
+    read are yielded with a ``ValueError`` in place of ``op``.
+    """
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.reader(lines), 1):
+            if not row or (line_no == 1 and row[0].strip() == "op"):
+                continue
+            if len(row) != 3:
+                yield line_no, ValueError("Expected op,a,b"), None, None
+                continue
+            yield line_no, row[0].strip(), row[1].strip(), row[2].strip()
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                yield line_no, row["op"], row["a"], row["b"]
+            except (ValueError, KeyError, TypeError) as error:
+                yield line_no, ValueError(f"Invalid row: {error}"), None, None
+    else:
+        raise ValueError(f"Unknown stream format: {fmt}")
+
+
+def evaluate_operations(rows, on_error):
+    """Evaluate rows lazily, yielding ``(op, a, b, result)``.
+
+    Rows that fail, such as a division by zero or an overflow, are passed
+    to ``on_error(line_no, op, a, b, message)`` and skipped, so one bad
+    row never stops the stream.
+    """
+    for line_no, op, a, b in rows:
+        if isinstance(op, ValueError):
+            on_error(line_no, None, a, b, str(op))
+            continue
+        try:
+            func = OPERATIONS[_OPERATION_ALIASES.get(op, op)]
+        except (KeyError, TypeError):
+            on_error(line_no, op, a, b, f"Unknown operation: {op}")
+            continue
+        try:
+            a = _parse_number(a)
+            b = _parse_number(b)
+            result = func(a, b)
+        except (ValueError, ArithmeticError) as error:
+            on_error(line_no, op, a, b, str(error))
+            continue
+        yield op, a, b, result
+
+
+def _json_value(value):
+    """Spell non-finite floats as CSV does, since JSON has no literal."""
+    if type(value) is float and not math.isfinite(value):
+        return str(value)
+    return value
+
+
+def write_results(results, out, fmt="csv"):
+    """Write ``(op, a, b, result)`` rows as they arrive; return the count."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(("op", "a", "b", "result"))
+        for count, row in enumerate(results, 1):
+            writer.writerow(row)
+    else:
+        for count, (op, a, b, result) in enumerate(results, 1):
+            row = {"op": op, "a": _json_value(a), "b": _json_value(b),
+                   "result": _json_value(result)}
+            out.write(json.dumps(row, allow_nan=False) + "\n")
+    return count
+
+
+def _stream_format(path, fmt):
+    """Pick a stream format from an explicit option or the file name."""
+    if fmt:
+        return fmt
+    if path and path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def run_demo():
+    """Print the calculator demo."""
     print("=== Calculator Demo ===")
     print("2 + 3 =", add(2, 3))
     print("10 - 4 =", subtract(10, 4))
@@ -60,3 +1642,51 @@ if __name__ == "__main__":
     result = add(5, 10)
     calc.add_to_history("5 + 10", result)
     print("\nCalculation history:", calc.get_history())
+
+
+def main(argv=None):
+    """Run the demo, or stream an operation file through the calculator."""
+    parser = argparse.ArgumentParser(
+        description="Evaluate a CSV or JSONL stream of (op, a, b) rows. "
+                    "Without arguments the calculator demo is shown.")
+    parser.add_argument("input", nargs="?",
+                        help="operation file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="result file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=STREAM_FORMATS,
+                        help="input format (default: from file name)")
+    parser.add_argument("--output-format", choices=STREAM_FORMATS,
+                        help="output format (default: input format)")
+    parser.add_argument("-e", "--errors", default="-",
+                        help="JSONL file for failed rows (default: stderr)")
+    args = parser.parse_args(argv)
+
+    if args.input is None:
+        run_demo()
+        return 0
+
+    in_format = _stream_format(args.input, args.format)
+    out_format = args.output_format or in_format
+    with contextlib.ExitStack() as stack:
+        def open_stream(path, mode, default):
+            if path == "-":
+                return default
+            return stack.enter_context(
+                open(path, mode, newline="", encoding="utf-8"))
+
+        source = open_stream(args.input, "r", sys.stdin)
+        out = open_stream(args.output, "w", sys.stdout)
+        errors = open_stream(args.errors, "w", sys.stderr)
+
+        def on_error(line_no, op, a, b, message):
+            error = {"line": line_no, "op": op, "a": _json_value(a),
+                     "b": _json_value(b), "error": message}
+            errors.write(json.dumps(error, allow_nan=False) + "\n")
+
+        rows = read_operations(source, in_format)
+        write_results(evaluate_operations(rows, on_error), out, out_format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for shared calculators.
+Several threads record operations into one shared calculator, comparing
+ConcurrentCalculator's per-thread buffers with a plain Calculator guarded
+by a single lock. Reports throughput and scaling per thread count; on a
+free-threaded build the per-thread buffers should scale close to
+linearly, while the single lock serializes every append.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from app import Calculator, ConcurrentCalculator
+
+
+class LockedCalculator(Calculator):
+    """A Calculator whose history is guarded by one shared lock."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def record(self, op, a, b, result):
+        with self._lock:
+            super().record(op, a, b, result)
+
+    def get_history(self):
+        with self._lock:
+            return super().get_history()
+
+
+VARIANTS = {
+    "locked": LockedCalculator,
+    "concurrent": ConcurrentCalculator,
+}
+
+
+def run_threads(calculator, threads, operations):
+    """Record ``operations`` records per thread and return the seconds."""
+    barrier = threading.Barrier(threads + 1)
+
+    def work(worker):
+        record = calculator.record
+        barrier.wait()
+        for i in range(operations):
+            record("+", worker, i, worker + i)
+
+    pool = [threading.Thread(target=work, args=(n,))
+            for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if len(calculator.get_history()) != threads * operations:
+        raise RuntimeError("History lost records under contention")
+    return elapsed
+
+
+def benchmark(thread_counts, operations, repeat):
+    """Return throughput results for every variant and thread count."""
+    results = []
+    for name, factory in VARIANTS.items():
+        baseline = None
+        for threads in thread_counts:
+            seconds = min(run_threads(factory(), threads, operations)
+                          for _ in range(repeat))
+            throughput = threads * operations / seconds
+            if baseline is None:
+                baseline = throughput / threads
+            results.append({
+                "variant": name,
+                "threads": threads,
+                "seconds": seconds,
+                "throughput": throughput,
+                "scaling": throughput / baseline,
+            })
+    return results
+
+
+def main(argv=None):
+    """Parse arguments, run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(
+        description="Measure history recording under thread contention.")
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    parser.add_argument("--operations", type=int, default=100000,
+                        help="records per thread")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.threads, args.operations, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"🧵 History contention benchmark (GIL "
+          f"{'enabled' if gil else 'disabled'})")
+    for row in results:
+        print(f"   {row['variant']:<10} {row['threads']:>3} threads: "
+              f"{row['throughput']:>12,.0f} records/s "
+              f"(x{row['scaling']:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the exact-arithmetic mode of divide and calculate_percentage.
+Compares native float division, routing every row through Decimal, and
+the exact mode, which stays on native ints and floats whenever they hold
+the exact result. Scalar and batch variants are measured on the same
+mix of operands.
+"""
+
+import argparse
+import decimal
+import json
+import random
+import sys
+import time
+
+from app import (EXACT_PRECISION, calculate_percentage,
+                 calculate_percentage_batch, divide, divide_batch, np)
+
+
+def make_operands(rows, seed, inexact_rate):
+    """Build operand lists where ``inexact_rate`` rows need Decimal."""
+    rng = random.Random(seed)
+    a, b = [], []
+    for _ in range(rows):
+        if rng.random() < inexact_rate:
+            a.append(rng.randint(1, 10 ** 6))
+            b.append(rng.choice((3, 7, 10, 11, 100)))
+        else:
+            divisor = rng.choice((1, 2, 4, 8, 16))
+            a.append(rng.randint(1, 10 ** 6) * rng.choice((1, divisor)))
+            b.append(divisor)
+    return a, b
+
+
+def all_decimal(a, b, scale):
+    """Divide every row through Decimal, the approach exact mode avoids."""
+    with decimal.localcontext() as context:
+        context.prec = EXACT_PRECISION
+        if scale is None:
+            return [decimal.Decimal(x) / decimal.Decimal(y)
+                    for x, y in zip(a, b)]
+        return [decimal.Decimal(x) * scale / decimal.Decimal(y)
+                for x, y in zip(a, b)]
+
+
+def timed(func, repeat):
+    """Return the best wall time of ``repeat`` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark(rows, inexact_rate, repeat, seed=0):
+    """Return rows/second for every variant."""
+    a, b = make_operands(rows, seed, inexact_rate)
+    arrays = (np.array(a), np.array(b)) if np is not None else (a, b)
+    variants = {
+        "native divide": lambda: [divide(x, y) for x, y in zip(a, b)],
+        "all-Decimal divide": lambda: all_decimal(a, b, None),
+        "exact divide": lambda: [divide(x, y, exact=True)
+                                 for x, y in zip(a, b)],
+        "exact divide_batch": lambda: divide_batch(*arrays, exact=True),
+        "all-Decimal percentage": lambda: all_decimal(a, b, 100),
+        "exact percentage": lambda: [calculate_percentage(x, y, exact=True)
+                                     for x, y in zip(a, b)],
+        "exact percentage_batch": lambda: calculate_percentage_batch(
+            *arrays, exact=True),
+    }
+    return {name: rows / timed(func, repeat)
+            for name, func in variants.items()}
+
+
+def main(argv=None):
+    """Parse arguments, run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(
+        description="Measure exact-mode division throughput.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--inexact-rate", type=float, default=0.1,
+                        help="fraction of rows whose quotient needs Decimal")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.rows, args.inexact_rate, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    baseline = results["native divide"]
+    print(f"🎯 Exact arithmetic benchmark ({args.rows} rows, "
+          f"{args.inexact_rate:.0%} inexact)")
+    for name, throughput in results.items():
+        print(f"   {name:<24} {throughput:>12,.0f} rows/s "
+              f"({throughput / baseline:.2f}x native)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
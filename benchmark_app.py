@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for app.py.
+Measures per-call latency of every operation and of the Calculator
+methods, batch throughput of every batch operation and of column
+formulas, and history append cost at several history sizes. Results are
+written to a JSON baseline together with machine metadata; --compare
+re-runs the suite and exits non-zero when a benchmark got significantly
+slower than the baseline.
+
+Usage:
+    python benchmark_app.py --output benchmark-baseline.json
+    python benchmark_app.py --compare benchmark-baseline.json
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+from app import BATCH_OPERATIONS, OPERATIONS, Calculator, np
+from column_eval import compile_columns
+
+HISTORY_SIZES = (1000, 100000, 10000000)
+QUICK_HISTORY_SIZES = (1000, 100000)
+HISTORY_SEGMENTS = 10
+REPEATED_HISTORY_SIZE = 100000
+BATCH_SIZE = 100000
+COLUMN_FORMULAS = ("a * b / c", "percent(a, c)")
+
+
+def machine_metadata():
+    """Describe the machine and interpreter the suite ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__ if np is not None else None,
+        "commit": commit,
+    }
+
+
+def summarize(samples, unit):
+    """Build a benchmark result from per-sample timings."""
+    return {
+        "unit": unit,
+        "samples": samples,
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def time_call(func, repeat, min_time=0.02):
+    """Return ``repeat`` samples of the nanoseconds one call takes."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return [seconds / number * 1e9
+            for seconds in timer.repeat(repeat=repeat, number=number)]
+
+
+def latency_benchmarks(repeat):
+    """Yield ``(name, result)`` for per-call latencies in ns."""
+    for name, func in OPERATIONS.items():
+        yield (f"latency.{name}",
+               summarize(time_call(lambda: func(7, 3), repeat), "ns/call"))
+    calc = Calculator()
+    yield ("latency.Calculator.calculate",
+           summarize(time_call(lambda: calc.calculate("divide", 7, 3),
+                               repeat), "ns/call"))
+    yield ("latency.Calculator.evaluate",
+           summarize(time_call(lambda: calc.evaluate("7 / 3 + 2"), repeat),
+                     "ns/call"))
+    history = Calculator()
+    for i in range(1000):
+        history.record("+", i, 1, i + 1)
+    yield ("latency.Calculator.get_history[1000]",
+           summarize(time_call(history.get_history, repeat), "ns/call"))
+
+
+def batch_benchmarks(repeat, size=BATCH_SIZE):
+    """Yield ``(name, result)`` for batch costs in ns per row."""
+    if np is not None:
+        rng = np.random.default_rng(0)
+        a = rng.uniform(-1000, 1000, size)
+        b = rng.uniform(-1000, 1000, size)
+    else:
+        a = [float(i % 1000 - 500) for i in range(size)]
+        b = [float(i % 997 + 1) for i in range(size)]
+    for name, func in BATCH_OPERATIONS.items():
+        samples = time_call(lambda: func(a, b), repeat)
+        yield (f"batch.{name}",
+               summarize([ns / size for ns in samples], "ns/row"))
+    columns = {"a": a, "b": b, "c": b}
+    for formula in COLUMN_FORMULAS:
+        expr = compile_columns(formula)
+        samples = time_call(lambda: expr.evaluate(columns), repeat)
+        yield (f"batch.columns[{formula}]",
+               summarize([ns / size for ns in samples], "ns/row"))
+
+
+def _append_history(size, segments):
+    """Append ``size`` records, returning ns per append of each segment."""
+    record = Calculator().record
+    step = max(1, size // segments)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for start in range(0, size, step):
+            stop = min(size, start + step)
+            started = time.perf_counter()
+            for i in range(start, stop):
+                record("+", i, 1, i + 1)
+            samples.append((time.perf_counter() - started)
+                           / (stop - start) * 1e9)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def history_benchmarks(sizes, repeat):
+    """Yield ``(name, result)`` for history append costs in ns.
+
+    Histories up to ``REPEATED_HISTORY_SIZE`` are built ``repeat`` times
+    with one sample per build; larger ones are built once and every
+    tenth of the appends is one sample, so growth shows up as spread.
+    """
+    for size in sizes:
+        if size <= REPEATED_HISTORY_SIZE:
+            samples = [statistics.fmean(_append_history(size, 1))
+                       for _ in range(repeat)]
+        else:
+            samples = _append_history(size, HISTORY_SEGMENTS)
+        yield f"history.append[{size}]", summarize(samples, "ns/append")
+
+
+def run_suite(repeat=7, history_sizes=HISTORY_SIZES, name_filter=None):
+    """Run every benchmark and return a results document."""
+    benchmarks = {}
+    if name_filter:
+        history_sizes = [size for size in history_sizes
+                         if name_filter in f"history.append[{size}]"]
+    suites = (latency_benchmarks(repeat), batch_benchmarks(repeat),
+              history_benchmarks(history_sizes, repeat))
+    for suite in suites:
+        for name, result in suite:
+            if name_filter and name_filter not in name:
+                continue
+            benchmarks[name] = result
+            print(f"   {name:<40} {result['median']:>12.1f} "
+                  f"{result['unit']}", file=sys.stderr)
+    return {"metadata": machine_metadata(), "benchmarks": benchmarks}
+
+
+def mann_whitney_p(baseline, current):
+    """One-sided Mann-Whitney U p-value that ``current`` is larger.
+
+    Uses the normal approximation with a tie correction, which is
+    adequate for the handful of samples a benchmark produces.
+    """
+    n1, n2 = len(baseline), len(current)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(value, 0) for value in baseline]
+                      + [(value, 1) for value in current])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        count = j - i + 1
+        ties += count ** 3 - count
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined)
+                   if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, threshold=0.20, alpha=0.01):
+    """Compare two results documents.
+
+    Returns a list of rows ``(name, baseline median, current median,
+    ratio, p-value, regressed)``. A benchmark regressed when its median
+    is more than ``threshold`` slower and the slowdown is significant at
+    ``alpha``.
+    """
+    rows = []
+    for name, old in baseline["benchmarks"].items():
+        new = current["benchmarks"].get(name)
+        if new is None:
+            continue
+        ratio = new["median"] / old["median"] if old["median"] else 1.0
+        p_value = mann_whitney_p(old["samples"], new["samples"])
+        regressed = ratio > 1 + threshold and p_value < alpha
+        rows.append((name, old["median"], new["median"], ratio, p_value,
+                     regressed))
+    return rows
+
+
+def metadata_differences(baseline, current):
+    """List metadata fields that make a comparison less meaningful."""
+    keys = ("python", "implementation", "machine", "processor",
+            "cpu_count", "numpy")
+    return [f"{key}: {baseline['metadata'].get(key)} -> "
+            f"{current['metadata'].get(key)}"
+            for key in keys
+            if baseline["metadata"].get(key) != current["metadata"].get(key)]
+
+
+def main(argv=None):
+    """Parse arguments, run the suite and save or compare results."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark app.py and compare against a baseline.")
+    parser.add_argument("-o", "--output",
+                        help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare against a saved baseline")
+    parser.add_argument("--repeat", type=int, default=7,
+                        help="samples per latency and batch benchmark")
+    parser.add_argument("--quick", action="store_true",
+                        help="skip the 10M-entry history benchmark")
+    parser.add_argument("--filter", help="only run benchmarks whose name "
+                                         "contains this text")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="slowdown ratio tolerated before flagging")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="significance level for flagging slowdowns")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print("⏱️  Running app.py benchmarks...", file=sys.stderr)
+    sizes = QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES
+    results = run_suite(args.repeat, sizes, args.filter)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    if baseline is None:
+        return 0
+    for difference in metadata_differences(baseline, results):
+        print(f"⚠️  Baseline recorded on a different setup ({difference})")
+    regressions = 0
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} "
+          f"{'ratio':>7} {'p':>7}")
+    for name, old, new, ratio, p_value, regressed in compare(
+            baseline, results, args.threshold, args.alpha):
+        marker = "  ❌ slower" if regressed else ""
+        print(f"{name:<40} {old:>12.1f} {new:>12.1f} {ratio:>7.2f} "
+              f"{p_value:>7.3f}{marker}")
+        regressions += regressed
+    if regressions:
+        print(f"❌ {regressions} benchmark(s) regressed")
+        return 1
+    print("✅ No significant slowdowns")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Load generator for the asyncio calculator service.
+Opens several connections, pipelines requests on each of them and reports
+throughput plus p50/p99 latency. With --spawn it starts a service in the
+same process, which is handy for quick local measurements.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from calc_server import CalculatorService, serve
+
+_OPERATIONS = ("add", "subtract", "multiply", "divide",
+               "calculate_percentage")
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at ``fraction`` of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def make_request(request_id, rng, zero_rate):
+    """Build one random arithmetic request line."""
+    b = 0 if rng.random() < zero_rate else rng.uniform(1, 1000)
+    request = {"id": request_id, "op": rng.choice(_OPERATIONS),
+               "a": rng.uniform(-1000, 1000), "b": b}
+    return json.dumps(request).encode() + b"\n"
+
+
+async def run_connection(open_connection, requests, pipeline, zero_rate,
+                         seed, latencies):
+    """Send ``requests`` requests with at most ``pipeline`` in flight."""
+    reader, writer = await open_connection()
+    rng = random.Random(seed)
+    window = asyncio.Semaphore(pipeline)
+    sent_at = {}
+    errors = 0
+
+    async def send():
+        for request_id in range(requests):
+            await window.acquire()
+            sent_at[request_id] = time.perf_counter()
+            writer.write(make_request(request_id, rng, zero_rate))
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in range(requests):
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+        if "error" in response:
+            errors += 1
+        window.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def run_load(args):
+    """Run the configured load and return a summary dict."""
+    server = service = None
+    if args.spawn:
+        service = CalculatorService(max_batch=args.max_batch,
+                                    batch_window=args.batch_window)
+        server = await serve(service, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        def open_connection():
+            return asyncio.open_connection("127.0.0.1", port)
+    elif args.unix:
+        def open_connection():
+            return asyncio.open_unix_connection(args.unix)
+    else:
+        def open_connection():
+            return asyncio.open_connection(args.host, args.port)
+
+    latencies = []
+    started = time.perf_counter()
+    try:
+        errors = await asyncio.gather(*(
+            run_connection(open_connection, args.requests, args.pipeline,
+                           args.zero_rate, seed, latencies)
+            for seed in range(args.connections)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    summary = {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+    if service is not None:
+        summary["mean_batch_size"] = service.stats()["mean_batch_size"]
+    return summary
+
+
+def main(argv=None):
+    """Parse arguments, run the load and print the summary."""
+    parser = argparse.ArgumentParser(
+        description="Measure calculator service latency and throughput.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to a Unix socket instead")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start an in-process service to measure")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10000,
+                        help="requests per connection")
+    parser.add_argument("--pipeline", type=int, default=64,
+                        help="requests in flight per connection")
+    parser.add_argument("--zero-rate", type=float, default=0.01,
+                        help="fraction of requests with a zero divisor")
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--batch-window", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print("📈 Calculator service load test")
+        print(f"   Requests:   {summary['requests']} "
+              f"({summary['errors']} errors)")
+        print(f"   Throughput: {summary['throughput']:.0f} req/s")
+        print(f"   Latency:    p50 {summary['p50_ms']:.2f} ms, "
+              f"p99 {summary['p99_ms']:.2f} ms, "
+              f"max {summary['max_ms']:.2f} ms")
+        if "mean_batch_size" in summary:
+            print(f"   Mean batch: {summary['mean_batch_size']:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Asyncio calculator service speaking line-delimited JSON.
+Clients send one request object per line, e.g.
+{"id": 1, "op": "divide", "a": 10, "b": 4}, and may pipeline as many
+requests as they like; responses come back in request order, with
+infinite or NaN results spelled "inf", "-inf" and "nan". Queued
+arithmetic requests are micro-batched into the vectorized app.py batch
+functions, and bounded queues push back on clients that send faster than
+the service can answer.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+
+from app import (BATCH_OPERATIONS, OPERATIONS, OPERATORS, Calculator,
+                 _json_value, np)
+
+_MAX_EXACT_INT = 2 ** 53
+_ZERO_DIVISOR_OPERATIONS = ("divide", "calculate_percentage")
+_INT_OPERATIONS = ("add", "subtract", "multiply")
+_SYMBOLS = dict(zip(("add", "subtract", "multiply", "divide"), OPERATORS))
+_CONTROL_OPERATIONS = ("evaluate", "history", "clear_history", "stats")
+
+
+def _is_number(value):
+    """Check for a JSON number (bools are rejected)."""
+    return type(value) in (int, float)
+
+
+def _vectorizable(op, a, b):
+    """Check whether float64 evaluation gives the scalar result exactly."""
+    a_int = type(a) is int
+    b_int = type(b) is int
+    if a_int and b_int and op in _INT_OPERATIONS:
+        return False
+    return ((not a_int or abs(a) <= _MAX_EXACT_INT)
+            and (not b_int or abs(b) <= _MAX_EXACT_INT))
+
+
+def _call(func, a, b):
+    """Call a scalar function, returning its error instead of raising.
+
+    Arithmetic errors such as an overflowing integer division come back
+    as a ValueError too, so they answer their own request only.
+    """
+    try:
+        return func(a, b)
+    except ValueError as error:
+        return error
+    except ArithmeticError as error:
+        return ValueError(str(error))
+
+
+def evaluate_group(op, rows):
+    """Evaluate ``(a, b)`` rows of one operation, batching where exact.
+
+    Returns one result per row, or the ``ValueError`` the scalar function
+    raises for that row; arithmetic errors are returned as ValueErrors.
+    """
+    func = OPERATIONS[op]
+    results = [None] * len(rows)
+    batch = []
+    for i, (a, b) in enumerate(rows):
+        if _vectorizable(op, a, b):
+            batch.append(i)
+        else:
+            results[i] = _call(func, a, b)
+    if not batch:
+        return results
+    a = [rows[i][0] for i in batch]
+    b = [rows[i][1] for i in batch]
+    # Overflow gives inf like the scalar functions; nothing to warn about.
+    with (np.errstate(over="ignore", invalid="ignore") if np is not None
+          else contextlib.nullcontext()):
+        if op in _ZERO_DIVISOR_OPERATIONS:
+            values, mask = BATCH_OPERATIONS[op](a, b, return_mask=True)
+        else:
+            values, mask = BATCH_OPERATIONS[op](a, b), None
+    for j, i in enumerate(batch):
+        if mask is not None and mask[j]:
+            results[i] = _call(func, *rows[i])
+        else:
+            results[i] = float(values[j])
+    return results
+
+
+class CalculatorService:
+    """Serve a Calculator over line-delimited JSON connections.
+
+    ``max_batch`` bounds how many queued requests are evaluated together,
+    ``batch_window`` optionally waits for more requests before evaluating
+    a small batch, ``queue_size`` bounds the shared request queue and
+    ``max_inflight`` bounds unanswered requests per connection.
+    """
+
+    def __init__(self, calculator=None, max_batch=1024, batch_window=0.0,
+                 queue_size=10000, max_inflight=256):
+        self.calculator = calculator or Calculator()
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.queue_size = queue_size
+        self.max_inflight = max_inflight
+        self.requests = 0
+        self.batches = 0
+        self._queue = None
+        self._batcher = None
+
+    async def start(self):
+        """Start evaluating queued requests."""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._batcher = asyncio.create_task(self._run_batches())
+
+    async def stop(self):
+        """Stop the batcher task."""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    def stats(self):
+        """Get request and batching counters."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": (self.requests / self.batches
+                                if self.batches else 0.0),
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def handle_client(self, reader, writer):
+        """Read pipelined requests and answer them in order."""
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue(self.max_inflight)
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                future = loop.create_future()
+                await responses.put(future)
+                await self._submit(line, future)
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _submit(self, line, future):
+        """Validate one request line and queue it for evaluation."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as error:
+            future.set_result({"id": None, "error": f"Invalid request: "
+                                                    f"{error}"})
+            return
+        op = request.get("op")
+        if op in OPERATIONS:
+            if not (_is_number(request.get("a"))
+                    and _is_number(request.get("b"))):
+                future.set_result({"id": request.get("id"),
+                                   "error": "Operands must be numbers"})
+                return
+        elif op not in _CONTROL_OPERATIONS:
+            future.set_result({"id": request.get("id"),
+                               "error": f"Unknown operation: {op}"})
+            return
+        await self._queue.put((request, future))
+
+    async def _send_responses(self, responses, writer):
+        """Write responses in request order, flushing when idle."""
+        connected = True
+        while True:
+            future = await responses.get()
+            if future is None:
+                break
+            response = await future
+            if not connected:
+                continue
+            try:
+                try:
+                    line = json.dumps(response, allow_nan=False)
+                except ValueError as error:
+                    line = json.dumps({"id": response.get("id"),
+                                       "error": str(error)})
+                writer.write(line.encode() + b"\n")
+                if responses.empty():
+                    await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    async def _run_batches(self):
+        """Evaluate queued requests in micro-batches."""
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            self._drain(batch)
+            if self.batch_window and len(batch) < self.max_batch:
+                await asyncio.sleep(self.batch_window)
+                self._drain(batch)
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                self._process(batch)
+            except Exception as error:
+                # Fail this batch's requests; the batcher keeps serving.
+                for request, future in batch:
+                    if not future.done():
+                        future.set_result({"id": request.get("id"),
+                                           "error": str(error)})
+
+    def _drain(self, batch):
+        """Move already queued requests into the batch."""
+        queue = self._queue
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    def _process(self, batch):
+        """Evaluate one batch and resolve its futures in queue order."""
+        groups = {}
+        for position, (request, _) in enumerate(batch):
+            if request["op"] in OPERATIONS:
+                groups.setdefault(request["op"], []).append(position)
+        results = {}
+        for op, positions in groups.items():
+            rows = [(batch[p][0]["a"], batch[p][0]["b"]) for p in positions]
+            results.update(zip(positions, evaluate_group(op, rows)))
+
+        for position, (request, future) in enumerate(batch):
+            if position in results:
+                result = results[position]
+                if not isinstance(result, ValueError) and request.get(
+                        "record"):
+                    self._record(request, result)
+            else:
+                result = self._control(request)
+            if isinstance(result, ValueError):
+                response = {"id": request.get("id"), "error": str(result)}
+            else:
+                # JSON has no inf or nan; they are spelled as strings.
+                response = {"id": request.get("id"),
+                            "result": _json_value(result)}
+            if not future.done():
+                future.set_result(response)
+
+    def _record(self, request, result):
+        """Add an evaluated request to the calculator history."""
+        op, a, b = request["op"], request["a"], request["b"]
+        if op in _SYMBOLS:
+            self.calculator.record(_SYMBOLS[op], a, b, result)
+        else:
+            self.calculator.add_to_history(f"{a}% of {b}", result)
+
+    def _control(self, request):
+        """Run a non-arithmetic request against the calculator."""
+        op = request["op"]
+        if op == "history":
+            return self.calculator.get_history()
+        if op == "clear_history":
+            self.calculator.clear_history()
+            return True
+        if op == "stats":
+            return self.stats()
+        try:
+            expr = request["expr"]
+            result = self.calculator.evaluate(expr)
+        except (KeyError, TypeError, ValueError) as error:
+            return error if isinstance(error, ValueError) else ValueError(
+                f"Invalid evaluate request: {error}")
+        except (ArithmeticError, RecursionError) as error:
+            return ValueError(str(error))
+        if request.get("record"):
+            self.calculator.add_to_history(expr, result)
+        return result
+
+
+async def serve(service, host="127.0.0.1", port=8765, unix_path=None):
+    """Start the service and return the listening asyncio server."""
+    await service.start()
+    if unix_path:
+        return await asyncio.start_unix_server(service.handle_client,
+                                               path=unix_path)
+    return await asyncio.start_server(service.handle_client, host, port)
+
+
+async def _main(args):
+    """Run the service until interrupted."""
+    service = CalculatorService(max_batch=args.max_batch,
+                                batch_window=args.batch_window,
+                                queue_size=args.queue_size,
+                                max_inflight=args.max_inflight)
+    server = await serve(service, args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"🧮 Calculator service listening on {where}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    """Parse arguments and run the service."""
+    parser = argparse.ArgumentParser(
+        description="Serve the calculator over line-delimited JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on a Unix socket instead")
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--batch-window", type=float, default=0.0,
+                        help="seconds to wait for a fuller batch")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--max-inflight", type=int, default=256,
+                        help="unanswered requests allowed per connection")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
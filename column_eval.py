@@ -0,0 +1,313 @@
+"""
+Vectorized evaluation of formulas over named columns.
+A formula such as ``"a * b / c"`` or ``"percent(x, total)"`` is compiled
+once into a short program of element-wise steps. With NumPy the program
+runs block by block over cache-sized slices of the columns, writing every
+intermediate into a small set of reused scratch buffers; without NumPy it
+becomes one generated loop that computes each row without temporaries.
+Rows that hit a zero divisor follow the batch fill/mask policy, so every
+other row matches composing the scalar app.py functions.
+
+Usage:
+    expr = compile_columns("a * b / c")
+    result = expr.evaluate({"a": a, "b": b, "c": c})
+    shares = evaluate_columns("percent(x, total)", {"x": x, "total": t})
+"""
+
+import array
+import ast
+import functools
+import itertools
+import math
+import numbers
+
+from app import np
+
+# Rows per block: 128 KiB float64 buffers, so the columns' slices and the
+# scratch buffers of a block stay in L2 while every step runs over them.
+BLOCK_SIZE = 16384
+_BINARY_OPERATORS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "divide",
+}
+_FUNCTIONS = {
+    "add": "add",
+    "subtract": "subtract",
+    "multiply": "multiply",
+    "divide": "divide",
+    "percent": "calculate_percentage",
+    "calculate_percentage": "calculate_percentage",
+}
+_DIVISIONS = ("divide", "calculate_percentage")
+# Python source of each step, as the scalar functions compute it.
+_SOURCES = {
+    "add": "{} + {}",
+    "subtract": "{} - {}",
+    "multiply": "{} * {}",
+    "divide": "{} / {}",
+    "calculate_percentage": "({} / {}) * 100",
+    "negative": "-{}",
+}
+
+
+def _parse(formula):
+    """Parse a formula into a list of steps and its result operand.
+
+    Operands are ``("column", name)``, ``("constant", value)`` or
+    ``("step", index)``. Repeated subexpressions are computed once.
+    """
+    try:
+        tree = ast.parse(formula.strip(), mode="eval")
+    except SyntaxError:
+        raise ValueError("Invalid expression!") from None
+    steps = []
+    seen = {}
+
+    def emit(op, *operands):
+        key = (op, operands)
+        if key not in seen:
+            steps.append((op, operands))
+            seen[key] = ("step", len(steps) - 1)
+        return seen[key]
+
+    def visit(node):
+        if isinstance(node, ast.Constant) and isinstance(
+                node.value, numbers.Real) and not isinstance(node.value, bool):
+            return ("constant", node.value)
+        if isinstance(node, ast.Name):
+            return ("column", node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return visit(node.operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = visit(node.operand)
+            if operand[0] == "constant":
+                return ("constant", -operand[1])
+            return emit("negative", operand)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            return emit(_BINARY_OPERATORS[type(node.op)], visit(node.left),
+                        visit(node.right))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _FUNCTIONS and len(node.args) == 2
+                and not node.keywords):
+            return emit(_FUNCTIONS[node.func.id], visit(node.args[0]),
+                        visit(node.args[1]))
+        raise ValueError("Unsupported expression!")
+
+    return steps, visit(tree.body)
+
+
+def _allocate(steps):
+    """Assign each step a scratch register, reusing dead ones.
+
+    Returns the register of every step and the number of registers; the
+    last step gets ``None`` because it writes straight into the output.
+    """
+    last_use = {}
+    for index, (_, operands) in enumerate(steps):
+        for operand in operands:
+            if operand[0] == "step":
+                last_use[operand[1]] = index
+    registers = []
+    free = []
+    count = 0
+    for index, (_, operands) in enumerate(steps):
+        # Element-wise steps may overwrite an operand that dies here; an
+        # operand used twice, as in x * x, must be freed only once.
+        for operand in dict.fromkeys(operands):
+            if operand[0] == "step" and last_use[operand[1]] == index:
+                free.append(registers[operand[1]])
+        if index == len(steps) - 1:
+            registers.append(None)
+        elif free:
+            registers.append(free.pop())
+        else:
+            registers.append(count)
+            count += 1
+    return registers, count
+
+
+class ColumnExpression:
+    """A formula compiled for evaluation over named columns."""
+
+    def __init__(self, formula):
+        self.formula = formula
+        self._steps, self._result = _parse(formula)
+        names = [operand[1] for _, operands in self._steps
+                 for operand in operands if operand[0] == "column"]
+        if self._result[0] == "column":
+            names.append(self._result[1])
+        self.columns = tuple(dict.fromkeys(names))
+        self._registers, self._register_count = _allocate(self._steps)
+        self._loop = None
+
+    def __repr__(self):
+        return f"ColumnExpression({self.formula!r})"
+
+    def evaluate(self, columns, fill=math.nan, return_mask=False,
+                 block_size=BLOCK_SIZE):
+        """Evaluate the formula over a mapping of column name to values.
+
+        Columns may be arrays, sequences or scalars that broadcast. Rows
+        where any divisor is zero get ``fill``; with ``return_mask`` the
+        zero-divisor mask is returned too, as for ``divide_batch``.
+        """
+        if block_size < 1:
+            raise ValueError("Block size must be positive!")
+        values = {}
+        for name in self.columns:
+            try:
+                values[name] = columns[name]
+            except KeyError:
+                raise ValueError(f"Missing column {name!r}!") from None
+        if np is not None:
+            result, mask = self._evaluate_numpy(values, fill, block_size)
+        else:
+            result, mask = self._evaluate_pure(values, fill)
+        if return_mask:
+            return result, mask
+        return result
+
+    def _evaluate_numpy(self, values, fill, block_size):
+        """Run the steps block by block into reused scratch buffers."""
+        length = None
+        for name, column in values.items():
+            if not isinstance(column, numbers.Number):
+                column = values[name] = np.asarray(column, dtype=np.float64)
+                if length is not None and len(column) != length:
+                    raise ValueError(
+                        "Batch operands must have the same length!")
+                length = len(column)
+        if length is None:
+            length = 1
+        out = np.empty(length, dtype=np.float64)
+        mask = np.zeros(length, dtype=np.bool_)
+        if not self._steps:
+            out[:] = self._operand(self._result, values, (), 0, length)
+            return out, mask
+        size = min(block_size, length) or 1
+        scratch = [np.empty(size, dtype=np.float64)
+                   for _ in range(self._register_count)]
+        zero = np.empty(size, dtype=np.bool_)
+        with np.errstate(all="ignore"):
+            for start in range(0, length, size):
+                stop = min(length, start + size)
+                registers = scratch
+                is_zero = zero
+                if stop - start < size:
+                    registers = [buffer[:stop - start] for buffer in scratch]
+                    is_zero = zero[:stop - start]
+                self._run_block(values, registers, out[start:stop],
+                                mask[start:stop], is_zero, start, stop)
+        np.copyto(out, fill, where=mask)
+        return out, mask
+
+    def _operand(self, operand, values, registers, start, stop):
+        """Return the block of an operand."""
+        kind, value = operand
+        if kind == "constant":
+            return value
+        if kind == "column":
+            column = values[value]
+            if isinstance(column, numbers.Number):
+                return column
+            return column[start:stop]
+        return registers[self._registers[value]]
+
+    def _run_block(self, values, registers, out, mask, is_zero, start,
+                   stop):
+        """Evaluate every step over one block of rows."""
+        last = len(self._steps) - 1
+        for index, (op, operands) in enumerate(self._steps):
+            args = [self._operand(operand, values, registers, start, stop)
+                    for operand in operands]
+            target = out if index == last else (
+                registers[self._registers[index]])
+            if op == "negative":
+                np.negative(args[0], out=target)
+                continue
+            if op not in _DIVISIONS:
+                getattr(np, op)(args[0], args[1], out=target)
+                continue
+            divisor = args[1]
+            if not isinstance(divisor, numbers.Number) or divisor == 0:
+                np.equal(divisor, 0, out=is_zero)
+                np.logical_or(mask, is_zero, out=mask)
+            np.divide(args[0], divisor, out=target)
+            if op == "calculate_percentage":
+                np.multiply(target, 100, out=target)
+
+    def _evaluate_pure(self, values, fill):
+        """Run the generated row loop over the zipped columns."""
+        length = None
+        for name, column in values.items():
+            if isinstance(column, numbers.Number):
+                continue
+            if not hasattr(column, "__len__"):
+                column = values[name] = list(column)
+            if length is not None and len(column) != length:
+                raise ValueError("Batch operands must have the same length!")
+            length = len(column)
+        if length is None:
+            rows = [tuple(values.values())]
+        else:
+            rows = zip(*(column if not isinstance(column, numbers.Number)
+                         else itertools.repeat(column)
+                         for column in values.values()))
+        out = array.array("d")
+        mask = bytearray()
+        if self._loop is None:
+            self._loop = self._compile_loop()
+        self._loop(rows, out, mask, fill)
+        return out, mask
+
+    def _compile_loop(self):
+        """Generate a function computing every step of a row inline."""
+        names = {name: f"_c{i}" for i, name in enumerate(self.columns)}
+        # Constants are bound by name: the repr of inf or nan is no literal.
+        namespace = {"__builtins__": {}}
+
+        def source(operand):
+            kind, value = operand
+            if kind == "column":
+                return names[value]
+            if kind == "constant":
+                name = f"_k{len(namespace) - 1}"
+                namespace[name] = value
+                return name
+            return f"_t{value}"
+
+        lines = ["def _loop(_rows, _out, _mask, _fill):",
+                 "    _append = _out.append",
+                 "    _flag = _mask.append",
+                 "    for {} in _rows:".format(
+                     "".join(f"{name}, " for name in names.values()) or "_")]
+        for index, (op, operands) in enumerate(self._steps):
+            args = [source(operand) for operand in operands]
+            if op in _DIVISIONS:
+                lines += [f"        if {args[1]} == 0:",
+                          "            _append(_fill)",
+                          "            _flag(1)",
+                          "            continue"]
+            lines.append(f"        _t{index} = " + _SOURCES[op].format(*args))
+        lines += [f"        _append({source(self._result)})",
+                  "        _flag(0)"]
+        exec(compile("\n".join(lines), "<column expression>", "exec"),
+             namespace)
+        return namespace["_loop"]
+
+
+def compile_columns(formula):
+    """Compile a formula over named columns into a ColumnExpression."""
+    return ColumnExpression(formula)
+
+
+_compiled_columns = functools.lru_cache(maxsize=256)(compile_columns)
+
+
+def evaluate_columns(formula, columns, fill=math.nan, return_mask=False,
+                     block_size=BLOCK_SIZE):
+    """Evaluate a formula over columns, caching its compiled form."""
+    return _compiled_columns(formula).evaluate(
+        columns, fill=fill, return_mask=return_mask, block_size=block_size)
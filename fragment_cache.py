@@ -0,0 +1,153 @@
+"""
+Content-addressed cache of rendered test rows, kept across builds.
+Between two builds almost every test renders to the same markup, so each
+rendered row is stored under a hash of the test fields it shows and the
+next build splices the stored row into the page instead of rendering it
+again. Rows are kept in one pack file per report: the rows used by a
+build, in page order, followed by an index of their offsets. Every build
+writes a fresh pack, so rows of tests that no longer exist are dropped.
+Hashing a record costs about as much as rendering today's plain rows, so
+the cache is opt-in (``run_tests.py --fragment-cache DIR``); it pays off
+once rows get expensive to render.
+
+Usage:
+    with FragmentCache(".report-cache/jenkins.pack", _render_test) as cache:
+        for i, test in enumerate(tests):
+            out.write(cache.render(i, test))
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"FRAGPACK1\n"
+# Stands in for the test's position in the page, which is not cached.
+INDEX_MARK = "\x00"
+_TRAILER = struct.Struct("<QQ")
+
+
+def record_key(test):
+    """Hash every field of a test record that appears in its row.
+
+    Durations only matter to the millisecond shown in the report. Returns
+    None for a record that cannot be cached because a field contains
+    ``INDEX_MARK``.
+    """
+    outcome = test.get("outcome", "unknown")
+    fields = [str(test.get("nodeid", "Unknown Test")), str(outcome),
+              format(test.get("duration", 0), ".3f"),
+              str(test.get("file", "N/A")), str(test.get("function", "N/A"))]
+    if outcome == "failed" and "call" in test:
+        fields.append(
+            str(test["call"].get("longrepr", "No details available")))
+    # The mark cannot occur in a field, so it separates them unambiguously.
+    data = INDEX_MARK.join(fields)
+    if data.count(INDEX_MARK) != len(fields) - 1:
+        return None
+    return hashlib.blake2b(data.encode("utf-8", "surrogatepass"),
+                           digest_size=16).hexdigest()
+
+
+def renderer_version(render):
+    """Fingerprint a row renderer so that template changes miss the cache."""
+    code = render.__code__
+    data = repr((code.co_code, code.co_consts, code.co_names)).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest().encode()
+
+
+class FragmentCache:
+    """Render test rows through a pack file of previously rendered rows.
+
+    ``render(i, test)`` is the row renderer; a row is cached with its
+    position replaced by ``INDEX_MARK``. Use as a context manager: the new
+    pack replaces the old one only once the page is complete.
+    """
+
+    def __init__(self, path, render):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._render = render
+        self._version = renderer_version(render)
+        self.hits = 0
+        self.misses = 0
+        self._old, self._old_index = self._open_previous()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._new = open(self.tmp_path, "wb")
+        # Tracked here since tell() on a buffered file costs a system call.
+        self._size = self._new.write(MAGIC + self._version + b"\n")
+        self._new_index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open_previous(self):
+        """Open the last build's pack; return it with its index."""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return None, {}
+        try:
+            if f.readline() != MAGIC or f.readline()[:-1] != self._version:
+                raise ValueError("stale fragment pack")
+            end = f.seek(-_TRAILER.size, os.SEEK_END)
+            offset, length = _TRAILER.unpack(f.read(_TRAILER.size))
+            if offset + length != end:
+                raise ValueError("truncated fragment pack")
+            f.seek(offset)
+            index = json.loads(f.read(length))
+            pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None, {}
+        finally:
+            f.close()
+        return pack, index
+
+    def render(self, i, test):
+        """Return the row of test number ``i``, from the cache if possible."""
+        key = record_key(test)
+        if key is None:
+            return self._render(i, test)
+        entry = self._old_index.get(key)
+        if entry is not None:
+            self.hits += 1
+            offset, length = entry
+            fragment = self._old[offset:offset + length]
+        else:
+            self.misses += 1
+            fragment = self._render(INDEX_MARK, test).encode(
+                "utf-8", "surrogatepass")
+        if key not in self._new_index:
+            self._new_index[key] = (self._size, len(fragment))
+            self._size += self._new.write(fragment)
+        return fragment.decode("utf-8", "surrogatepass").replace(
+            INDEX_MARK, str(i))
+
+    def close(self):
+        """Write the index and move the new pack into place."""
+        index = json.dumps(self._new_index, separators=(",", ":")).encode()
+        self._new.write(index)
+        self._new.write(_TRAILER.pack(self._size, len(index)))
+        self._new.close()
+        if self._old is not None:
+            self._old.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard the new pack and keep the previous one."""
+        self._new.close()
+        if self._old is not None:
+            self._old.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
@@ -7,16 +7,25 @@ which works better with Jenkins HTML viewer restrictions.
 
 import json
 import os
+import re
 import sys
 from datetime import datetime
 import subprocess
 
+from report_writer import StreamingHTMLWriter
+from results_reader import iter_tests, read_summary
+from search_index import Runs, SearchIndex
 
-def run_pytest_with_json():
+# Tests per data shard, and the report subdirectory holding the shards
+SHARD_SIZE = 1000
+SHARD_DIR = "shards"
+
+
+def run_pytest_with_json(results_file="test-results.json"):
     """Run pytest and capture results in JSON format."""
     print("🧪 Running pytest to collect test results...")
     
-    cmd = [sys.executable, "-m", "pytest", "--tb=short", "-v", "--json-report", "--json-report-file=test-results.json"]
+    cmd = [sys.executable, "-m", "pytest", "--tb=short", "-v", "--json-report", f"--json-report-file={results_file}"]
     
     try:
         result = subprocess.run(cmd, capture_output=True, text=True)
@@ -229,6 +238,21 @@ tr:hover {
 .toggle-all:hover {
     background: #218838;
 }
+
+.report-status {
+    font-size: 0.9rem;
+    color: #666;
+}
+
+tr.spacer td {
+    padding: 0;
+    border: none;
+}
+
+tr.loading td {
+    color: #999;
+    font-style: italic;
+}
 """
     
     with open("pytest-report/style.css", "w") as f:
@@ -239,64 +263,506 @@ def create_js_file():
     """Create external JavaScript file like coverage.py does."""
     js_content = """
 // Coverage-style JavaScript for pytest report
-document.addEventListener('DOMContentLoaded', function() {
-    // Auto-expand failed tests
-    const failedRows = document.querySelectorAll('tr[data-status="failed"]');
-    failedRows.forEach(row => {
-        const details = row.querySelector('.test-details');
-        if (details) {
-            details.classList.add('show');
+// Test rows live in shards/*.js, loaded on demand. Only the rows in view
+// are in the DOM; the rest of the table is two spacer rows. The filter
+// looks query words up in the prebuilt index in shards/search.js.
+//
+// Sets of tests are kept as runs: [start, end, start, end, ...] of
+// consecutive test numbers, as the index stores them.
+var ROW_HEIGHT = 46;
+var DETAILS_HEIGHT = 180;
+var OVERSCAN = 10;
+var SEPARATORS = /[\\x00-\\x2f\\x3a-\\x40\\x5b-\\x60\\x7b-\\x7f]+/;
+
+var report = {
+    index: null,
+    shards: [],         // rows of each loaded shard
+    loading: {},        // shard number -> true while its script loads
+    search: null,       // the search index, loaded on first use
+    searchLoading: false,
+    matches: new Map(), // query word -> runs of the tests it matches
+    failed: null,       // 1 for every failed test
+    notPassed: null,    // runs of the tests that did not pass
+    view: null,         // numbers of the tests shown, or null for all
+    offsets: null,      // offsets[k] is the top of the k-th shown test
+    expanded: null,     // details state: 1 open, -1 closed, 0 default
+    heights: null,      // measured height in the current state, or 0
+    filter: '',
+    hidePassed: false,
+    scheduled: false
+};
+
+// Called by shards/index.js
+function pytestReportIndex(index) {
+    const total = index.total;
+    report.index = index;
+    report.shards = new Array(index.shards.length);
+    report.failed = new Uint8Array(total);
+    report.expanded = new Int8Array(total);
+    report.heights = new Float32Array(total);
+    const notPassed = [];
+    Object.keys(index.outcomes).forEach(outcome => {
+        const runs = decodeRuns(index.outcomes[outcome]);
+        if (outcome === 'failed') {
+            for (let k = 0; k < runs.length; k += 2) {
+                report.failed.fill(1, runs[k], runs[k + 1]);
+            }
+        }
+        if (outcome !== 'passed') {
+            notPassed.push(runs);
         }
     });
-    
+    report.notPassed = unionRuns(notPassed);
+    updateView();
+    window.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', scheduleRender);
+
     // Filter functionality
     const filterInput = document.getElementById('filter');
     if (filterInput) {
         filterInput.addEventListener('input', function() {
-            const filterValue = this.value.toLowerCase();
-            const rows = document.querySelectorAll('tbody tr');
-            
-            rows.forEach(row => {
-                const testName = row.querySelector('.test-name').textContent.toLowerCase();
-                if (testName.includes(filterValue)) {
-                    row.style.display = '';
-                } else {
-                    row.style.display = 'none';
-                }
-            });
+            report.filter = this.value;
+            updateView();
         });
     }
-    
+
     // Hide passed tests checkbox
     const hidePassedCheckbox = document.getElementById('hide-passed');
     if (hidePassedCheckbox) {
         hidePassedCheckbox.addEventListener('change', function() {
-            const passedRows = document.querySelectorAll('tr[data-status="passed"]');
-            passedRows.forEach(row => {
-                row.style.display = this.checked ? 'none' : '';
-            });
+            report.hidePassed = this.checked;
+            updateView();
         });
     }
-});
+}
+
+// Called by every shards/shard-NNNNN.js
+function pytestReportShard(number, rows) {
+    report.shards[number] = rows;
+    delete report.loading[number];
+    scheduleRender();
+}
 
-function toggleDetails(index) {
-    const details = document.getElementById('details-' + index);
-    if (details) {
-        details.classList.toggle('show');
+// Called by shards/search.js with newline-separated words and postings
+function pytestReportSearch(words, postings, prefixes) {
+    report.search = {
+        words: words ? words.split('\\n') : [],
+        postings: postings ? postings.split('\\n') : [],
+        prefixes: prefixes
+    };
+    updateView();
+}
+
+function loadScript(file) {
+    const script = document.createElement('script');
+    script.src = 'shards/' + file + '?v=' + report.index.build;
+    script.onerror = () => setStatus('Could not load test data: ' + file);
+    document.head.appendChild(script);
+}
+
+function loadShard(number) {
+    if (report.shards[number] || report.loading[number]) {
+        return;
     }
+    report.loading[number] = true;
+    loadScript(report.index.shards[number].file);
 }
 
-function toggleAllDetails() {
-    const allDetails = document.querySelectorAll('.test-details');
-    const anyVisible = Array.from(allDetails).some(detail => detail.classList.contains('show'));
-    
-    allDetails.forEach(detail => {
-        if (anyVisible) {
-            detail.classList.remove('show');
+function getTest(id) {
+    const rows = report.shards[Math.floor(id / report.index.shardSize)];
+    return rows ? rows[id % report.index.shardSize] : null;
+}
+
+function decodeRuns(text) {
+    const values = text ? text.split(',') : [];
+    const runs = [];
+    let position = 0;
+    for (let k = 0; k < values.length; k += 2) {
+        position += +values[k];
+        runs.push(position, position + +values[k + 1]);
+        position += +values[k + 1];
+    }
+    return runs;
+}
+
+function unionRuns(lists) {
+    if (lists.length === 1) {
+        return lists[0];
+    }
+    const pairs = [];
+    lists.forEach(runs => {
+        for (let k = 0; k < runs.length; k += 2) {
+            pairs.push([runs[k], runs[k + 1]]);
+        }
+    });
+    pairs.sort((a, b) => a[0] - b[0]);
+    const merged = [];
+    pairs.forEach(([start, end]) => {
+        const last = merged.length - 1;
+        if (last > 0 && start <= merged[last]) {
+            merged[last] = Math.max(merged[last], end);
+        } else {
+            merged.push(start, end);
+        }
+    });
+    return merged;
+}
+
+function intersectRuns(a, b) {
+    const runs = [];
+    let i = 0;
+    let j = 0;
+    while (i < a.length && j < b.length) {
+        const start = Math.max(a[i], b[j]);
+        const end = Math.min(a[i + 1], b[j + 1]);
+        if (start < end) {
+            runs.push(start, end);
+        }
+        if (a[i + 1] < b[j + 1]) {
+            i += 2;
+        } else {
+            j += 2;
+        }
+    }
+    return runs;
+}
+
+// Return the position of the first word not before ``word``.
+function lowerBound(words, word) {
+    let low = 0;
+    let high = words.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (words[mid] < word) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+    return low;
+}
+
+// Return the runs of the tests with a word starting with ``word``.
+function matchWord(word) {
+    let runs = report.matches.get(word);
+    if (runs) {
+        return runs;
+    }
+    const search = report.search;
+    if (Object.prototype.hasOwnProperty.call(search.prefixes, word)) {
+        runs = decodeRuns(search.prefixes[word]);
+    } else {
+        const first = lowerBound(search.words, word);
+        let last = first;
+        while (last < search.words.length &&
+               search.words[last].startsWith(word)) {
+            last++;
+        }
+        runs = unionPostings(first, last);
+    }
+    if (report.matches.size > 256) {
+        report.matches.clear();
+    }
+    report.matches.set(word, runs);
+    return runs;
+}
+
+// Return the runs of the tests of the words from ``first`` to ``last``.
+function unionPostings(first, last) {
+    const postings = report.search.postings;
+    if (last - first <= 64) {
+        const lists = [];
+        for (let position = first; position < last; position++) {
+            lists.push(decodeRuns(postings[position]));
+        }
+        return lists.length ? unionRuns(lists) : [];
+    }
+    // Many words: mark their tests, then collect the marked runs
+    const total = report.index.total;
+    const marks = new Uint8Array(total + 1);
+    for (let position = first; position < last; position++) {
+        const values = postings[position].split(',');
+        let start = 0;
+        for (let k = 0; k < values.length; k += 2) {
+            start += +values[k];
+            marks.fill(1, start, start + +values[k + 1]);
+            start += +values[k + 1];
+        }
+    }
+    const runs = [];
+    let id = marks.indexOf(1);
+    while (id !== -1 && id < total) {
+        const end = marks.indexOf(0, id);
+        runs.push(id, end);
+        id = marks.indexOf(1, end);
+    }
+    return runs;
+}
+
+// Recompute which tests are shown, then lay out and render the table.
+function updateView() {
+    const words = report.filter.toLowerCase().split(SEPARATORS)
+        .filter(word => word);
+    let runs = report.hidePassed ? report.notPassed : null;
+    if (words.length) {
+        if (!report.search) {
+            if (!report.searchLoading) {
+                report.searchLoading = true;
+                loadScript('search.js');
+            }
+            setStatus('Loading search index...');
+            return;
+        }
+        words.forEach(word => {
+            const matches = matchWord(word);
+            runs = runs ? intersectRuns(runs, matches) : matches;
+        });
+    }
+    report.view = runs && expandRuns(runs);
+    layout();
+    setStatus('Showing ' + viewLength() + ' of ' + report.index.total +
+              ' tests');
+    scheduleRender();
+}
+
+// Return the test numbers in runs, or null when they are all tests.
+function expandRuns(runs) {
+    let count = 0;
+    for (let k = 0; k < runs.length; k += 2) {
+        count += runs[k + 1] - runs[k];
+    }
+    if (count === report.index.total) {
+        return null;
+    }
+    const view = new Int32Array(count);
+    let n = 0;
+    for (let k = 0; k < runs.length; k += 2) {
+        for (let id = runs[k]; id < runs[k + 1]; id++) {
+            view[n++] = id;
+        }
+    }
+    return view;
+}
+
+function viewLength() {
+    return report.view ? report.view.length : report.index.total;
+}
+
+function viewId(k) {
+    return report.view ? report.view[k] : k;
+}
+
+function isExpanded(id) {
+    const state = report.expanded[id];
+    // Failed tests start expanded
+    return state ? state > 0 : report.failed[id] === 1;
+}
+
+function itemHeight(id) {
+    return report.heights[id] ||
+        (isExpanded(id) ? ROW_HEIGHT + DETAILS_HEIGHT : ROW_HEIGHT);
+}
+
+function layout() {
+    const count = viewLength();
+    const view = report.view;
+    const heights = report.heights;
+    const expanded = report.expanded;
+    const failed = report.failed;
+    const offsets = new Float64Array(count + 1);
+    let top = 0;
+    for (let k = 0; k < count; k++) {
+        const id = view ? view[k] : k;
+        let height = heights[id];
+        if (!height) {
+            const state = expanded[id];
+            height = (state ? state > 0 : failed[id])
+                ? ROW_HEIGHT + DETAILS_HEIGHT : ROW_HEIGHT;
+        }
+        top += height;
+        offsets[k + 1] = top;
+    }
+    report.offsets = offsets;
+}
+
+// Return the position in the view of the item covering ``top``.
+function findItem(top) {
+    const offsets = report.offsets;
+    let low = 0;
+    let high = offsets.length - 2;
+    while (low < high) {
+        const mid = (low + high + 1) >> 1;
+        if (offsets[mid] <= top) {
+            low = mid;
         } else {
-            detail.classList.add('show');
+            high = mid - 1;
+        }
+    }
+    return Math.max(low, 0);
+}
+
+function scheduleRender() {
+    if (!report.scheduled) {
+        report.scheduled = true;
+        window.requestAnimationFrame(render);
+    }
+}
+
+function render() {
+    report.scheduled = false;
+    const tbody = document.getElementById('results');
+    if (!tbody || !report.offsets) {
+        return;
+    }
+    const count = viewLength();
+    const offsets = report.offsets;
+    const tableTop = tbody.getBoundingClientRect().top + window.scrollY;
+    const top = window.scrollY - tableTop;
+    const first = Math.max(findItem(top) - OVERSCAN, 0);
+    const last = Math.min(findItem(top + window.innerHeight) + OVERSCAN,
+                          count - 1);
+
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(spacer(count ? offsets[first] : 0));
+    const items = [];
+    for (let k = first; k <= last; k++) {
+        const id = viewId(k);
+        const test = getTest(id);
+        if (test === null) {
+            loadShard(Math.floor(id / report.index.shardSize));
+            fragment.appendChild(loadingRow(itemHeight(id)));
+            continue;
+        }
+        const rows = testRows(id, test);
+        rows.forEach(row => fragment.appendChild(row));
+        items.push([id, rows]);
+    }
+    fragment.appendChild(spacer(count ? offsets[count] - offsets[last + 1]
+                                      : 0));
+    tbody.replaceChildren(fragment);
+
+    // Keep measured heights so the spacers match the real rows
+    let changed = false;
+    items.forEach(([id, rows]) => {
+        const height = rows[0].offsetHeight + rows[1].offsetHeight;
+        if (Math.abs(itemHeight(id) - height) > 1) {
+            report.heights[id] = height;
+            changed = true;
         }
     });
+    if (changed) {
+        layout();
+        scheduleRender();
+    }
+}
+
+function spacer(height) {
+    const row = document.createElement('tr');
+    row.className = 'spacer';
+    const cell = document.createElement('td');
+    cell.colSpan = 4;
+    cell.style.height = height + 'px';
+    row.appendChild(cell);
+    return row;
+}
+
+function loadingRow(height) {
+    const row = document.createElement('tr');
+    row.className = 'loading';
+    const cell = document.createElement('td');
+    cell.colSpan = 4;
+    cell.style.height = height + 'px';
+    cell.textContent = 'Loading...';
+    row.appendChild(cell);
+    return row;
+}
+
+function element(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) {
+        node.className = className;
+    }
+    if (text !== undefined) {
+        node.textContent = text;
+    }
+    return node;
+}
+
+function field(label, value) {
+    const paragraph = element('p');
+    paragraph.appendChild(element('strong', null, label + ':'));
+    paragraph.appendChild(document.createTextNode(' ' + value));
+    return paragraph;
+}
+
+// Build the two table rows of one test
+function testRows(id, test) {
+    const [name, outcome, duration, file, func, longrepr] = test;
+    const row = element('tr');
+    row.dataset.status = outcome;
+    row.appendChild(element('td', 'test-name', name));
+    const status = element('td');
+    status.appendChild(element('span', 'status ' + outcome, outcome));
+    row.appendChild(status);
+    row.appendChild(element('td', 'duration', duration.toFixed(3) + 's'));
+    const toggle = element('td');
+    const button = element('button', 'details-toggle', 'Details');
+    button.onclick = () => toggleDetails(id);
+    toggle.appendChild(button);
+    row.appendChild(toggle);
+
+    const detailsRow = element('tr');
+    const cell = element('td');
+    cell.colSpan = 4;
+    const details = element('div', 'test-details');
+    if (isExpanded(id)) {
+        details.classList.add('show');
+    }
+    details.appendChild(field('File', file));
+    details.appendChild(field('Function', func));
+    details.appendChild(field('Duration', duration.toFixed(3) + ' seconds'));
+    if (longrepr !== null) {
+        details.appendChild(element('p')).appendChild(
+            element('strong', null, 'Failure Details:'));
+        details.appendChild(element('pre', null, longrepr));
+    }
+    cell.appendChild(details);
+    detailsRow.appendChild(cell);
+    return [row, detailsRow];
+}
+
+function setStatus(text) {
+    const status = document.getElementById('report-status');
+    if (status) {
+        status.textContent = text;
+    }
+}
+
+function toggleDetails(id) {
+    report.expanded[id] = isExpanded(id) ? -1 : 1;
+    report.heights[id] = 0;
+    layout();
+    scheduleRender();
+}
+
+function toggleAllDetails() {
+    const count = viewLength();
+    let anyVisible = false;
+    for (let k = 0; k < count && !anyVisible; k++) {
+        anyVisible = isExpanded(viewId(k));
+    }
+    const state = anyVisible ? -1 : 1;
+    if (report.view) {
+        report.view.forEach(id => {
+            report.expanded[id] = state;
+            report.heights[id] = 0;
+        });
+    } else {
+        report.expanded.fill(state);
+        report.heights.fill(0);
+    }
+    layout();
+    scheduleRender();
 }
 """
     
@@ -304,8 +770,17 @@ function toggleAllDetails() {
         f.write(js_content)
 
 
-def generate_coverage_style_report():
-    """Generate a coverage-style HTML report with external CSS/JS."""
+def generate_coverage_style_report(results_file="test-results.json",
+                                   run_missing=True,
+                                   summary=None):
+    """Generate a coverage-style HTML report with external CSS/JS.
+
+    ``results_file`` is the pytest-json-report output to render. When it
+    is missing pytest is run to create it, unless ``run_missing`` is
+    false, as for ``run_tests.py`` which has already run the suite.
+    Test data is written as shards that the page loads on demand.
+    ``summary`` is the results' summary when the caller has read it.
+    """
     
     # Create pytest-report directory
     os.makedirs("pytest-report", exist_ok=True)
@@ -315,40 +790,155 @@ def generate_coverage_style_report():
     create_js_file()
     
     # Check if JSON report exists
-    if not os.path.exists("test-results.json"):
-        print("❌ test-results.json not found. Running pytest first...")
-        if not run_pytest_with_json():
+    if not os.path.exists(results_file):
+        if not run_missing:
+            print(f"❌ {results_file} not found")
+            return False
+        print(f"❌ {results_file} not found. Running pytest first...")
+        if not run_pytest_with_json(results_file):
             print("❌ Failed to generate test results")
             return False
     
-    # Load test results
+    # Load the summary unless the caller already has; test records
+    # are streamed while rendering
     try:
-        with open("test-results.json", "r") as f:
-            data = json.load(f)
+        if summary is None:
+            summary = read_summary(results_file)
     except Exception as e:
         print(f"❌ Failed to load test results: {e}")
         return False
-    
-    tests = data.get("tests", [])
-    summary = data.get("summary", {})
-    
+    tests = iter_tests(results_file)
+
+    # Stream the test data into shards, then write the page around it
+    try:
+        index = write_test_shards(tests, "pytest-report")
+        with StreamingHTMLWriter("pytest-report/index.html") as out:
+            out.writelines(render_coverage_style_report(summary, index))
+        print("✅ Coverage-style pytest report generated in pytest-report/")
+        print("   - Main file: pytest-report/index.html")
+        print("   - CSS file: pytest-report/style.css")
+        print("   - JS file: pytest-report/script.js")
+        print(f"   - Test data: pytest-report/{SHARD_DIR}/ "
+              f"({len(index['shards'])} shards)")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to write HTML report: {e}")
+        return False
+
+
+def write_test_shards(tests, directory, shard_size=SHARD_SIZE, search=True):
+    """Write the tests as paged JSON shards plus an index of them.
+
+    Each shard is a script calling ``pytestReportShard(number, rows)``, so
+    the page can load it on demand from a file:// URL as well as from
+    Jenkins. The index, also written as ``index.js``, holds the shards
+    and which tests had each outcome; with ``search`` the filter box's
+    search index is written to ``search.js``. Returns the index.
+    """
+    shard_dir = os.path.join(directory, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    search_index = SearchIndex() if search else None
+    outcomes = {}
+    shards = []
+    rows = []
+    for number, test in enumerate(tests):
+        row = _test_row(test)
+        rows.append(row)
+        if row[1] not in outcomes:
+            outcomes[row[1]] = Runs()
+        outcomes[row[1]].add(number)
+        if search_index is not None:
+            search_index.add(number, test)
+        if len(rows) == shard_size:
+            shards.append(_write_shard(shard_dir, len(shards), rows))
+            rows = []
+    if rows:
+        shards.append(_write_shard(shard_dir, len(shards), rows))
+    index = {
+        "build": datetime.now().strftime("%Y%m%d%H%M%S"),
+        "total": sum(shard["count"] for shard in shards),
+        "shardSize": shard_size,
+        "shards": shards,
+        "outcomes": {outcome: runs.encode()
+                     for outcome, runs in outcomes.items()},
+    }
+    if search_index is not None:
+        # Newline-joined strings load far faster than large array literals
+        data = search_index.to_dict()
+        _write_script(os.path.join(shard_dir, "search.js"),
+                      "pytestReportSearch", "\n".join(data["words"]),
+                      "\n".join(data["postings"]), data["prefixes"])
+    _write_script(os.path.join(shard_dir, "index.js"),
+                  "pytestReportIndex", index)
+    _remove_stale_shards(shard_dir, len(shards))
+    return index
+
+
+def _test_row(test):
+    """Return the compact row of one test for a shard.
+
+    Rows are ``[name, outcome, duration, file, function, longrepr]``;
+    longrepr is None unless the test failed.
+    """
+    outcome = test.get("outcome", "unknown")
+    longrepr = None
+    if outcome == "failed" and "call" in test:
+        longrepr = test["call"].get("longrepr", "No details available")
+    return [test.get("nodeid", "Unknown Test"), outcome,
+            round(test.get("duration", 0), 6),
+            test.get("file", "N/A"), test.get("function", "N/A"), longrepr]
+
+
+def _write_shard(shard_dir, number, rows):
+    """Write one shard; return its index entry."""
+    name = f"shard-{number:05d}.js"
+    _write_script(os.path.join(shard_dir, name), "pytestReportShard",
+                  number, rows)
+    failed = sum(1 for row in rows if row[1] == "failed")
+    return {"file": name, "count": len(rows), "failed": failed}
+
+
+def _remove_stale_shards(shard_dir, count):
+    """Delete the shards of a previous, larger report."""
+    for name in os.listdir(shard_dir):
+        match = re.fullmatch(r"shard-(\d+)\.js", name)
+        if match and int(match.group(1)) >= count:
+            os.remove(os.path.join(shard_dir, name))
+
+
+def _write_script(path, callback, *args):
+    """Write a data script passing its arguments to a callback."""
+    data = ",".join(json.dumps(arg, ensure_ascii=False, separators=(",", ":"))
+                    for arg in args)
+    with StreamingHTMLWriter(path) as out:
+        out.write(f"{callback}({data});\n")
+
+
+def render_coverage_style_report(summary, index):
+    """Yield the index page, which loads its rows from the shards."""
+    yield _render_header(summary, index)
+    yield _FOOTER
+
+
+def _render_header(summary, index):
+    """Render the page head, summary and the empty results table."""
     passed = summary.get("passed", 0)
     failed = summary.get("failed", 0)
     skipped = summary.get("skipped", 0)
     total = summary.get("total", 0)
     duration = summary.get("duration", 0)
-    
+
     # Calculate pass rate
     pass_rate = (passed / total * 100) if total > 0 else 0
-    
-    # Generate main HTML file
-    html_content = f"""<!DOCTYPE html>
+
+    return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
     <title>Pytest Test Report</title>
     <link rel="stylesheet" href="style.css" type="text/css">
     <script src="script.js" defer></script>
+    <script src="{SHARD_DIR}/index.js?v={index['build']}" defer></script>
 </head>
 <body class="indexfile">
 <header>
@@ -389,6 +979,7 @@ def generate_coverage_style_report():
             <input type="text" id="filter" placeholder="Filter tests...">
             <label><input type="checkbox" id="hide-passed"> Hide passed tests</label>
             <button class="toggle-all" onclick="toggleAllDetails()">Toggle All Details</button>
+            <span id="report-status" class="report-status">Loading {index['total']} tests...</span>
         </div>
         
         <div class="results-table">
@@ -401,45 +992,12 @@ def generate_coverage_style_report():
                         <th>Details</th>
                     </tr>
                 </thead>
-                <tbody>
-"""
-    
-    # Add test rows
-    for i, test in enumerate(tests):
-        test_name = test.get("nodeid", "Unknown Test")
-        outcome = test.get("outcome", "unknown")
-        duration = test.get("duration", 0)
-        
-        html_content += f"""
-                    <tr data-status="{outcome}">
-                        <td class="test-name">{test_name}</td>
-                        <td><span class="status {outcome}">{outcome}</span></td>
-                        <td class="duration">{duration:.3f}s</td>
-                        <td><button class="details-toggle" onclick="toggleDetails({i})">Details</button></td>
-                    </tr>
-                    <tr>
-                        <td colspan="4">
-                            <div class="test-details" id="details-{i}">
-                                <p><strong>File:</strong> {test.get('file', 'N/A')}</p>
-                                <p><strong>Function:</strong> {test.get('function', 'N/A')}</p>
-                                <p><strong>Duration:</strong> {duration:.3f} seconds</p>
-"""
-        
-        # Add failure details if test failed
-        if outcome == "failed" and "call" in test:
-            longrepr = test["call"].get("longrepr", "No details available")
-            html_content += f"""
-                                <p><strong>Failure Details:</strong></p>
-                                <pre>{longrepr}</pre>
-"""
-        
-        html_content += """
-                            </div>
-                        </td>
-                    </tr>
+                <tbody id="results">
 """
-    
-    html_content += """
+
+
+# Closing markup of the index page
+_FOOTER = """
                 </tbody>
             </table>
         </div>
@@ -448,19 +1006,6 @@ def generate_coverage_style_report():
 </body>
 </html>
 """
-    
-    # Write main HTML file
-    try:
-        with open("pytest-report/index.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print("✅ Coverage-style pytest report generated in pytest-report/")
-        print("   - Main file: pytest-report/index.html")
-        print("   - CSS file: pytest-report/style.css")
-        print("   - JS file: pytest-report/script.js")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to write HTML report: {e}")
-        return False
 
 
 if __name__ == "__main__":
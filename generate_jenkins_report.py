@@ -5,19 +5,23 @@ This creates a fully functional HTML report with inline CSS and JavaScript
 that works around Jenkins CSP restrictions.
 """
 
-import json
 import os
 import sys
 from datetime import datetime
 import subprocess
+from contextlib import nullcontext
 
+from fragment_cache import FragmentCache
+from report_writer import StreamingHTMLWriter
+from results_reader import iter_tests, read_summary
 
-def run_pytest_with_json():
+
+def run_pytest_with_json(results_file="test-results.json"):
     """Run pytest and capture results in JSON format."""
     print("🧪 Running pytest to collect test results...")
     
     # Run pytest with JSON report
-    cmd = [sys.executable, "-m", "pytest", "--tb=short", "-v", "--json-report", "--json-report-file=test-results.json"]
+    cmd = [sys.executable, "-m", "pytest", "--tb=short", "-v", "--json-report", f"--json-report-file={results_file}"]
     
     try:
         result = subprocess.run(cmd, capture_output=True, text=True)
@@ -32,36 +36,79 @@ def run_pytest_with_json():
         return False
 
 
-def generate_jenkins_compatible_report():
-    """Generate a Jenkins-compatible HTML report from JSON results."""
+def generate_jenkins_compatible_report(results_file="test-results.json",
+                                       run_missing=True,
+                                       cache_dir=None,
+                                       summary=None):
+    """Generate a Jenkins-compatible HTML report from JSON results.
+
+    ``results_file`` is the pytest-json-report output to render. When it
+    is missing pytest is run to create it, unless ``run_missing`` is
+    false, as for ``run_tests.py`` which has already run the suite.
+    With a ``cache_dir``, test rows unchanged since the last build are
+    reused from the fragment cache kept there.
+    ``summary`` is the results' summary when the caller has read it.
+    """
     
     # Check if JSON report exists
-    if not os.path.exists("test-results.json"):
-        print("❌ test-results.json not found. Running pytest first...")
-        if not run_pytest_with_json():
+    if not os.path.exists(results_file):
+        if not run_missing:
+            print(f"❌ {results_file} not found")
+            return False
+        print(f"❌ {results_file} not found. Running pytest first...")
+        if not run_pytest_with_json(results_file):
             print("❌ Failed to generate test results")
             return False
     
-    # Load test results
+    # Load the summary unless the caller already has; test records
+    # are streamed while rendering
     try:
-        with open("test-results.json", "r") as f:
-            data = json.load(f)
+        if summary is None:
+            summary = read_summary(results_file)
     except Exception as e:
         print(f"❌ Failed to load test results: {e}")
         return False
-    
-    # Extract test information
-    tests = data.get("tests", [])
-    summary = data.get("summary", {})
-    
+    tests = iter_tests(results_file)
+
+    # Stream the HTML report to disk, one test at a time
+    try:
+        cache = None
+        if cache_dir:
+            cache = FragmentCache(os.path.join(cache_dir, "jenkins.pack"),
+                                  _render_test)
+        with cache or nullcontext(), StreamingHTMLWriter("jenkins-pytest-report.html") as out:
+            out.writelines(render_jenkins_report(tests, summary, cache))
+        if cache is not None:
+            print(f"♻️  Reused {cache.hits} of {cache.hits + cache.misses} "
+                  "cached test rows")
+        print("✅ Jenkins-compatible HTML report generated: jenkins-pytest-report.html")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to write HTML report: {e}")
+        return False
+
+
+def render_jenkins_report(tests, summary, cache=None):
+    """Yield the report page piece by piece, one test at a time.
+
+    With a ``FragmentCache`` rows are taken from it where possible.
+    """
+    yield _render_header(summary)
+    render = _render_test if cache is None else cache.render
+    for i, test in enumerate(tests):
+        yield render(i, test)
+    yield _FOOTER
+
+
+def _render_header(summary):
+    """Render the page head, styles and summary cards."""
     passed = summary.get("passed", 0)
     failed = summary.get("failed", 0)
     skipped = summary.get("skipped", 0)
     total = summary.get("total", 0)
     duration = summary.get("duration", 0)
-    
-    # Generate HTML report
-    html_content = f"""<!DOCTYPE html>
+
+    return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -232,16 +279,17 @@ def generate_jenkins_compatible_report():
         <div class="tests-section">
             <h2>Test Results</h2>
 """
-    
-    # Add individual test results
-    for i, test in enumerate(tests):
-        test_name = test.get("nodeid", "Unknown Test")
-        outcome = test.get("outcome", "unknown")
-        duration = test.get("duration", 0)
-        
-        status_class = f"status-{outcome}"
-        
-        html_content += f"""
+
+
+def _render_test(i, test):
+    """Render the collapsible block of one test."""
+    test_name = test.get("nodeid", "Unknown Test")
+    outcome = test.get("outcome", "unknown")
+    duration = test.get("duration", 0)
+
+    status_class = f"status-{outcome}"
+
+    html = f"""
             <div class="test-item">
                 <div class="test-header" onclick="toggleDetails({i})">
                     <span class="test-name">{test_name}</span>
@@ -255,21 +303,22 @@ def generate_jenkins_compatible_report():
                     <p><strong>Duration:</strong> {duration:.3f} seconds</p>
 """
         
-        # Add failure information if test failed
-        if outcome == "failed" and "call" in test:
-            longrepr = test["call"].get("longrepr", "No details available")
-            html_content += f"""
+    # Add failure information if test failed
+    if outcome == "failed" and "call" in test:
+        longrepr = test["call"].get("longrepr", "No details available")
+        html += f"""
                     <h4>Failure Details:</h4>
                     <pre>{longrepr}</pre>
 """
-        
-        html_content += """
+
+    return html + """
                 </div>
             </div>
 """
-    
-    # Add JavaScript for interactivity
-    html_content += """
+
+
+# Closing markup and JavaScript for interactivity
+_FOOTER = """
         </div>
     </div>
     
@@ -311,16 +360,6 @@ def generate_jenkins_compatible_report():
 </body>
 </html>
 """
-    
-    # Write the HTML report
-    try:
-        with open("jenkins-pytest-report.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print("✅ Jenkins-compatible HTML report generated: jenkins-pytest-report.html")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to write HTML report: {e}")
-        return False
 
 
 if __name__ == "__main__":
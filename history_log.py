@@ -0,0 +1,275 @@
+"""
+Durable, memory-mapped storage for Calculator history.
+HistoryLog keeps history records in an append-only binary file of
+fixed-size, checksummed records that is memory-mapped for reads, so
+reopening a large history costs a header read and a tail check rather
+than a parse. Free-form operations that do not fit the fixed layout are
+kept in a side file referenced by offset.
+
+Usage: Calculator(history=HistoryLog("calculator-history.log"))
+"""
+
+import array
+import glob
+import json
+import mmap
+import os
+import struct
+import zlib
+
+from app import ARCHIVE_COLUMNS, RAW_OPERATION, HistoryStore
+
+MAGIC = b"CALCHIST"
+VERSION = 1
+# magic, version, record size, first live record, raw file generation
+HEADER = struct.Struct("<8sIIQQ")
+# op code, kind flags, checksum, lhs, rhs, result
+RECORD = struct.Struct("<BB2xIddd")
+_VALUES = struct.Struct("<ddd")
+_LIVE_START_OFFSET = 16
+
+
+def _fsync_directory(path):
+    """Persist a rename in the directory holding ``path``."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _checksum(op, kinds, lhs, rhs, result):
+    """Checksum the payload of one record."""
+    return zlib.crc32(_VALUES.pack(lhs, rhs, result), op << 8 | kinds)
+
+
+class HistoryLog(HistoryStore):
+    """Append-only, memory-mapped history log.
+
+    Appends are single positioned writes of one fixed-size record, so a
+    crash can at worst leave a torn record at the tail, which is detected
+    by its checksum and dropped on the next open. ``sync_every`` fsyncs
+    after that many appends (0 leaves flushing to the OS).
+    ``clear()`` only moves the live-start marker in the header; dead
+    records are dropped by ``compact()``, which runs automatically once
+    more than ``compact_threshold`` dead records outnumber the live ones.
+    With a ``capacity`` only the newest records are visible.
+    """
+
+    def __init__(self, path, capacity=None, sync_every=0,
+                 compact_threshold=65536):
+        if capacity is not None and capacity <= 0:
+            raise ValueError("History capacity must be positive!")
+        self.path = path
+        self.capacity = capacity
+        self.sync_every = sync_every
+        self.compact_threshold = compact_threshold
+        self._map = None
+        self._fd = None
+        self._raw_fd = None
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _raw_path(self, generation):
+        """Return the side-file path for a raw-record generation."""
+        return f"{self.path}.raw.{generation}"
+
+    def _open(self):
+        """Open (or create) the log and recover from a torn tail."""
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, 0))
+                f.flush()
+                os.fsync(f.fileno())
+        self._fd = os.open(self.path, os.O_RDWR)
+        header = os.pread(self._fd, HEADER.size, 0)
+        magic, version, record_size, live_start, generation = \
+            HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            os.close(self._fd)
+            raise ValueError(f"Not a calculator history log: {self.path}")
+        self._generation = generation
+        self._live_start = live_start
+        self._count = (os.fstat(self._fd).st_size - HEADER.size) // RECORD.size
+        while self._count and not self._valid(self._count - 1):
+            self._count -= 1
+        os.ftruncate(self._fd, HEADER.size + self._count * RECORD.size)
+        self._live_start = min(self._live_start, self._count)
+        self._raw_fd = os.open(self._raw_path(generation),
+                               os.O_RDWR | os.O_CREAT, 0o644)
+        self._raw_size = os.fstat(self._raw_fd).st_size
+        self._remove_stale_files()
+        self._remap()
+
+    def _remove_stale_files(self):
+        """Delete side files and compaction leftovers of other generations."""
+        current = self._raw_path(self._generation)
+        for path in glob.glob(glob.escape(self.path) + ".raw.*"):
+            if path != current:
+                os.remove(path)
+        if os.path.exists(self.path + ".compact"):
+            os.remove(self.path + ".compact")
+
+    def _valid(self, slot):
+        """Check the checksum of the record stored in a slot."""
+        data = os.pread(self._fd, RECORD.size,
+                        HEADER.size + slot * RECORD.size)
+        if len(data) != RECORD.size:
+            return False
+        op, kinds, crc, lhs, rhs, result = RECORD.unpack(data)
+        return crc == _checksum(op, kinds, lhs, rhs, result)
+
+    def _remap(self):
+        """Map the file again so newly appended records become readable."""
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Flush and close the log."""
+        if self._fd is None:
+            return
+        self.flush()
+        self._map.close()
+        os.close(self._fd)
+        os.close(self._raw_fd)
+        self._map = self._fd = self._raw_fd = None
+
+    def flush(self):
+        """Force appended records to disk."""
+        os.fsync(self._raw_fd)
+        os.fsync(self._fd)
+
+    def _first_live(self):
+        """Return the slot of the oldest visible record."""
+        if self.capacity is None:
+            return self._live_start
+        return max(self._live_start, self._count - self.capacity)
+
+    def __len__(self):
+        return self._count - self._first_live()
+
+    def _slot(self, index):
+        """Translate a logical record index into a record slot."""
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        return self._first_live() + index
+
+    def _fields(self, slot):
+        """Read ``(code, kinds, lhs, rhs, result, raw)`` from the map."""
+        offset = HEADER.size + slot * RECORD.size
+        if offset + RECORD.size > len(self._map):
+            self._remap()
+        op, kinds, _, lhs, rhs, result = RECORD.unpack_from(
+            self._map, offset)
+        raw = None
+        if op == RAW_OPERATION:
+            raw = tuple(json.loads(os.pread(self._raw_fd, int(rhs),
+                                            int(lhs))))
+        return op, kinds, lhs, rhs, result, raw
+
+    def columns(self):
+        """Return the visible records as typed columns, oldest first.
+
+        Columns are gathered with strided copies out of the map rather
+        than by decoding record by record.
+        """
+        start = self._first_live()
+        first = HEADER.size + start * RECORD.size
+        last = HEADER.size + self._count * RECORD.size
+        if last > len(self._map):
+            self._remap()
+        width = RECORD.size // 8
+        with memoryview(self._map) as view, \
+                view[first:last] as records, records.cast("d") as values:
+            columns = {"op": array.array("B", records[0::RECORD.size]),
+                       "kinds": array.array("B", records[1::RECORD.size])}
+            for name, field in zip(ARCHIVE_COLUMNS[2:], (1, 2, 3)):
+                column = array.array("d")
+                column.frombytes(values[field::width].tobytes())
+                columns[name] = column
+        ops = columns["op"]
+        raw = {row: self._fields(start + row)[5]
+               for row, op in enumerate(ops) if op == RAW_OPERATION}
+        return columns, raw
+
+    def _store(self, op, lhs, rhs, result, kinds, raw=None):
+        """Append one record, writing any raw payload first."""
+        if raw is not None:
+            operation, value = raw
+            data = json.dumps([f"{operation}", f"{value}"]).encode()
+            os.pwrite(self._raw_fd, data, self._raw_size)
+            lhs, rhs = float(self._raw_size), float(len(data))
+            self._raw_size += len(data)
+        record = RECORD.pack(op, kinds, _checksum(op, kinds, lhs, rhs, result),
+                             lhs, rhs, result)
+        os.pwrite(self._fd, record, HEADER.size + self._count * RECORD.size)
+        self._count += 1
+        if self.sync_every and self._count % self.sync_every == 0:
+            self.flush()
+        self._maybe_compact()
+
+    def clear(self):
+        """Hide every stored record; compaction reclaims the space."""
+        self._live_start = self._count
+        os.pwrite(self._fd, struct.pack("<Q", self._live_start),
+                  _LIVE_START_OFFSET)
+        os.fsync(self._fd)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Compact once dead records dominate the file."""
+        dead = self._first_live()
+        if dead > self.compact_threshold and dead > len(self):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log keeping only the visible records.
+
+        The new log and side file are written under new names and
+        atomically swapped in with ``os.replace``, so a crash leaves
+        either the old or the new history intact.
+        """
+        generation = self._generation + 1
+        new_raw_path = self._raw_path(generation)
+        tmp_path = self.path + ".compact"
+        with open(tmp_path, "wb") as out, open(new_raw_path, "wb") as raw:
+            out.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0,
+                                  generation))
+            raw_size = 0
+            for slot in range(self._first_live(), self._count):
+                offset = HEADER.size + slot * RECORD.size
+                if offset + RECORD.size > len(self._map):
+                    self._remap()
+                record = self._map[offset:offset + RECORD.size]
+                if record[0] == RAW_OPERATION:
+                    op, kinds, _, lhs, rhs, result = RECORD.unpack(record)
+                    data = os.pread(self._raw_fd, int(rhs), int(lhs))
+                    raw.write(data)
+                    lhs = float(raw_size)
+                    raw_size += len(data)
+                    record = RECORD.pack(
+                        op, kinds, _checksum(op, kinds, lhs, rhs, result),
+                        lhs, rhs, result)
+                out.write(record)
+            raw.flush()
+            os.fsync(raw.fileno())
+            out.flush()
+            os.fsync(out.fileno())
+        self._map.close()
+        self._map = None
+        os.close(self._fd)
+        os.close(self._raw_fd)
+        os.replace(tmp_path, self.path)
+        _fsync_directory(self.path)
+        self._open()
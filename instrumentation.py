@@ -0,0 +1,267 @@
+"""
+Instrumentation for the calculator functions and Calculator methods.
+enable() swaps the app.py operations and Calculator methods for wrappers
+that count calls and errors and record latency histograms; disable()
+puts the originals back, so instrumentation costs nothing while it is
+off. Metrics export as a JSON snapshot or in Prometheus text format.
+
+Usage:
+    registry = instrumentation.enable(sample_rate=0.01)
+    ...
+    print(registry.to_prometheus())
+    instrumentation.disable()
+"""
+
+import bisect
+import functools
+import json
+import time
+
+import app
+
+# Upper bounds of the latency buckets, in seconds.
+DEFAULT_BOUNDS = (1e-7, 2.5e-7, 5e-7, 1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5,
+                  5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+FUNCTIONS = ("add", "subtract", "multiply", "divide", "calculate_percentage",
+             "add_batch", "subtract_batch", "multiply_batch", "divide_batch",
+             "calculate_percentage_batch", "percent_of_total")
+METHODS = ("calculate", "evaluate", "add_to_history", "record",
+           "get_history", "clear_history", "query_history",
+           "export_history")
+_CLASSES = ("Calculator", "ConcurrentCalculator")
+# Module-level tables that hold references to the functions.
+_TABLES = ("OPERATIONS", "BATCH_OPERATIONS", "_EXPRESSION_NAMESPACE")
+
+
+class FunctionStats:
+    """Call, error and latency statistics of one function.
+
+    Calls and errors are counted exactly; with sampling only every
+    ``sample_every``-th call is timed, and the histogram counts those
+    timed calls only.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        """Zero every counter."""
+        self.calls = 0
+        self.errors = {}
+        # Reset in place: instrumented wrappers hold on to this list.
+        self.buckets = getattr(self, "buckets", [])
+        self.buckets[:] = [0] * (len(self.bounds) + 1)
+        self.latency_sum = 0.0
+
+    @property
+    def timed(self):
+        """Number of calls whose latency was recorded."""
+        return sum(self.buckets)
+
+    def observe(self, seconds):
+        """Record the latency of one timed call."""
+        self.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.latency_sum += seconds
+
+    def error(self, error):
+        """Count an exception raised by the function."""
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def snapshot(self):
+        """Return the statistics as a JSON-serializable dict."""
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "timed": self.timed,
+            "latency_sum": self.latency_sum,
+            "latency_mean": (self.latency_sum / self.timed
+                             if self.timed else 0.0),
+            "buckets": [[bound, count] for bound, count in zip(
+                self.bounds + ("+Inf",), self.buckets)],
+        }
+
+
+class Registry:
+    """Statistics of every instrumented function, by name."""
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.functions = {}
+
+    def stats(self, name):
+        """Return the statistics of a function, creating them once."""
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats(self.bounds)
+        return stats
+
+    def reset(self):
+        """Zero the statistics of every function."""
+        for stats in self.functions.values():
+            stats.reset()
+
+    def snapshot(self):
+        """Return every function's statistics as a dict."""
+        return {name: stats.snapshot()
+                for name, stats in sorted(self.functions.items())}
+
+    def to_json(self, indent=2):
+        """Return the snapshot as JSON text."""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix="calculator"):
+        """Return the statistics in Prometheus text exposition format."""
+        lines = [f"# HELP {prefix}_calls_total Calls per function.",
+                 f"# TYPE {prefix}_calls_total counter"]
+        items = sorted(self.functions.items())
+        for name, stats in items:
+            lines.append(f'{prefix}_calls_total{{function="{name}"}} '
+                         f"{stats.calls}")
+        lines += [f"# HELP {prefix}_errors_total Exceptions per function.",
+                  f"# TYPE {prefix}_errors_total counter"]
+        for name, stats in items:
+            for error, count in sorted(stats.errors.items()):
+                lines.append(f'{prefix}_errors_total{{function="{name}",'
+                             f'error="{error}"}} {count}')
+        lines += [f"# HELP {prefix}_latency_seconds Latency of timed calls.",
+                  f"# TYPE {prefix}_latency_seconds histogram"]
+        for name, stats in items:
+            cumulative = 0
+            for bound, count in zip(stats.bounds + ("+Inf",), stats.buckets):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f'{prefix}_latency_seconds_bucket{{function='
+                             f'"{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_latency_seconds_sum{{function="{name}"}} '
+                         f"{stats.latency_sum!r}")
+            lines.append(f'{prefix}_latency_seconds_count{{function='
+                         f'"{name}"}} {stats.timed}')
+        return "\n".join(lines) + "\n"
+
+
+def instrument(func, stats, sample_every=1):
+    """Wrap ``func`` so its calls are recorded in ``stats``.
+
+    Every call and exception is counted; only every ``sample_every``-th
+    call is timed.
+    """
+    perf_counter = time.perf_counter
+    bisect_left = bisect.bisect_left
+    bounds = stats.bounds
+    buckets = stats.buckets
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        stats.calls += 1
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as error:
+            stats.error(error)
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            buckets[bisect_left(bounds, elapsed)] += 1
+            stats.latency_sum += elapsed
+
+    @functools.wraps(func)
+    def sampled(*args, **kwargs):
+        stats.calls += 1
+        if stats.calls % sample_every:
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                stats.error(error)
+                raise
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as error:
+            stats.error(error)
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            buckets[bisect_left(bounds, elapsed)] += 1
+            stats.latency_sum += elapsed
+
+    wrapper = timed if sample_every <= 1 else sampled
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+_originals = None
+_registry = None
+
+
+def enable(sample_rate=1.0, registry=None, bounds=DEFAULT_BOUNDS):
+    """Instrument the app.py operations and Calculator methods.
+
+    ``sample_rate`` is the fraction of calls that are timed, e.g. 0.01
+    times one call in a hundred. Returns the ``Registry`` collecting the
+    metrics; enabling again re-instruments with the new settings.
+    """
+    global _originals, _registry
+    if not 0 < sample_rate <= 1:
+        raise ValueError("Sample rate must be in (0, 1]!")
+    disable()
+    registry = registry or Registry(bounds)
+    sample_every = max(1, round(1 / sample_rate))
+    originals = []
+
+    def patch(owner, key, value, setter):
+        originals.append((owner, key, value, setter))
+
+    wrapped = {}
+    for name in FUNCTIONS:
+        func = getattr(app, name)
+        wrapped[id(func)] = instrument(func, registry.stats(name),
+                                       sample_every)
+        patch(app, name, func, setattr)
+        setattr(app, name, wrapped[id(func)])
+    for table_name in _TABLES:
+        table = getattr(app, table_name)
+        for key, value in list(table.items()):
+            if id(value) in wrapped:
+                patch(table, key, value, dict.__setitem__)
+                table[key] = wrapped[id(value)]
+    exact = app._EXACT_OPERATIONS
+    for key, value in list(exact.items()):
+        if id(value.func) in wrapped:
+            patch(exact, key, value, dict.__setitem__)
+            exact[key] = functools.partial(wrapped[id(value.func)],
+                                           *value.args, **value.keywords)
+    for class_name in _CLASSES:
+        cls = getattr(app, class_name)
+        for method in METHODS:
+            func = cls.__dict__.get(method)
+            if func is None:
+                continue
+            stats = registry.stats(f"{class_name}.{method}")
+            patch(cls, method, func, setattr)
+            setattr(cls, method, instrument(func, stats, sample_every))
+    _originals = originals
+    _registry = registry
+    return registry
+
+
+def disable():
+    """Restore the uninstrumented functions and methods."""
+    global _originals, _registry
+    if _originals is None:
+        return
+    for owner, key, value, setter in reversed(_originals):
+        setter(owner, key, value)
+    _originals = None
+    _registry = None
+
+
+def is_enabled():
+    """Check whether instrumentation is active."""
+    return _originals is not None
+
+
+def registry():
+    """Return the active registry, or None when disabled."""
+    return _registry
@@ -0,0 +1,289 @@
+"""
+Result memoization for the calculator functions.
+Provides a bounded cache with LRU, LFU and TTL eviction policies, an
+optional memory cap, hit-rate statistics and negative caching of errors.
+"""
+
+import functools
+import sys
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+_MISSING = object()
+
+
+class MemoStats(namedtuple("MemoStats", "hits misses evictions expirations "
+                                        "currsize nbytes")):
+    """Snapshot of memoization cache statistics."""
+
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _CachedError:
+    """A cached exception, re-raised on every hit."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _LRUPolicy:
+    """Evict the least recently used entry."""
+
+    def __init__(self, ttl, clock):
+        self._entries = OrderedDict()
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value = self._entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+
+    def pop_victim(self):
+        return self._entries.popitem(last=False)
+
+    def expire(self):
+        return ()
+
+    def clear(self):
+        self._entries.clear()
+
+
+class _LFUPolicy:
+    """Evict the least frequently used entry, oldest first on ties."""
+
+    def __init__(self, ttl, clock):
+        self._entries = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_freq = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return _MISSING
+        value, freq = item
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._buckets[freq + 1][key] = None
+        self._entries[key] = (value, freq + 1)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (value, 1)
+        self._buckets[1][key] = None
+        self._min_freq = 1
+
+    def pop_victim(self):
+        if self._min_freq not in self._buckets:
+            self._min_freq = min(self._buckets)
+        bucket = self._buckets[self._min_freq]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self._buckets[self._min_freq]
+        return key, self._entries.pop(key)[0]
+
+    def expire(self):
+        return ()
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+
+class _TTLPolicy:
+    """Expire entries ``ttl`` seconds after insertion, oldest first."""
+
+    def __init__(self, ttl, clock):
+        if ttl is None or ttl <= 0:
+            raise ValueError("TTL policy requires a positive ttl!")
+        self._entries = OrderedDict()
+        self._ttl = ttl
+        self._clock = clock
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return _MISSING
+        value, expires_at = item
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            self.expired += 1
+            return _MISSING
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (value, self._clock() + self._ttl)
+
+    def pop_victim(self):
+        key, (value, _) = self._entries.popitem(last=False)
+        return key, value
+
+    def expire(self):
+        """Drop and return expired keys from the front of the queue."""
+        now = self._clock()
+        expired = []
+        for key, (_, expires_at) in self._entries.items():
+            if expires_at > now:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._entries[key]
+        self.expired += len(expired)
+        return expired
+
+    def clear(self):
+        self._entries.clear()
+
+
+POLICIES = {
+    "lru": _LRUPolicy,
+    "lfu": _LFUPolicy,
+    "ttl": _TTLPolicy,
+}
+
+
+def _entry_size(key, value):
+    """Approximate the memory held by one cache entry."""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(item) for item in key)
+    if isinstance(value, _CachedError):
+        size += sys.getsizeof(value.error)
+    return size
+
+
+def make_key(args, kwargs=None):
+    """Build a cache key that keeps ``1`` and ``1.0`` apart."""
+    key = args + tuple(type(arg) for arg in args)
+    if kwargs:
+        for name, value in sorted(kwargs.items()):
+            key += (name, value, type(value))
+    return key
+
+
+class MemoCache:
+    """Bounded result cache with pluggable eviction.
+
+    ``policy`` is one of ``"lru"``, ``"lfu"`` or ``"ttl"`` (which also
+    needs ``ttl`` in seconds). ``max_bytes`` caps the approximate memory
+    held by cached keys and values. Exceptions listed in
+    ``cache_exceptions`` are stored as negative results and re-raised on
+    later hits without calling the function again.
+    """
+
+    def __init__(self, maxsize=1024, policy="lru", ttl=None, max_bytes=None,
+                 cache_exceptions=(ValueError,), clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("Cache maxsize must be positive!")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.cache_exceptions = tuple(cache_exceptions)
+        self._policy = POLICIES[policy](ttl, clock)
+        self._sizes = {}
+        self.clear()
+
+    def clear(self):
+        """Drop every cached entry and reset the statistics."""
+        self._policy.clear()
+        self._sizes.clear()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._policy.expired = 0
+
+    def stats(self):
+        """Get a snapshot of the cache statistics."""
+        return MemoStats(self.hits, self.misses, self.evictions,
+                         self._policy.expired,
+                         len(self._policy), self._nbytes)
+
+    def call(self, key, func, *args, **kwargs):
+        """Return ``func(*args, **kwargs)``, cached under ``key``."""
+        value = self._policy.get(key)
+        if value is _MISSING:
+            self.misses += 1
+            if key in self._sizes:
+                self._nbytes -= self._sizes.pop(key)
+            try:
+                value = func(*args, **kwargs)
+            except self.cache_exceptions as error:
+                self._store(key, _CachedError(error))
+                raise
+            self._store(key, value)
+            return value
+        self.hits += 1
+        if type(value) is _CachedError:
+            raise value.error.with_traceback(None)
+        return value
+
+    def _store(self, key, value):
+        """Evict until the new entry fits within bounds, then insert it."""
+        for expired in self._policy.expire():
+            self._nbytes -= self._sizes.pop(expired, 0)
+        size = 0
+        if self.max_bytes is not None:
+            size = _entry_size(key, value)
+        while len(self._policy) and (
+                (self.maxsize is not None
+                 and len(self._policy) >= self.maxsize)
+                or (self.max_bytes is not None
+                    and self._nbytes + size > self.max_bytes)):
+            victim, _ = self._policy.pop_victim()
+            self._nbytes -= self._sizes.pop(victim, 0)
+            self.evictions += 1
+        self._policy.put(key, value)
+        if size:
+            self._sizes[key] = size
+            self._nbytes += size
+
+
+def memoize(func=None, **options):
+    """Decorate a function with a ``MemoCache``.
+
+    Accepts the ``MemoCache`` options, e.g.
+    ``memoize(policy="lfu", maxsize=10000)(divide)``. The wrapper exposes
+    ``cache``, ``cache_stats()`` and ``cache_clear()``.
+    """
+    if func is None:
+        return functools.partial(memoize, **options)
+
+    cache = MemoCache(**options)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return cache.call(make_key(args, kwargs), func, *args, **kwargs)
+
+    wrapper.cache = cache
+    wrapper.cache_stats = cache.stats
+    wrapper.cache_clear = cache.clear
+    return wrapper
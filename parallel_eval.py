@@ -0,0 +1,223 @@
+"""
+Multi-core batch evaluation for the app.py functions.
+Inputs are split into chunks that a process pool evaluates with the
+vectorized batch functions. Operands, results and zero-divisor masks live
+in multiprocessing.shared_memory blocks, so workers read and write them in
+place instead of pickling arrays, and every chunk writes to its own offset
+so the output order always matches the input order.
+"""
+
+import array
+import math
+import numbers
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from app import BATCH_OPERATIONS, np
+
+_ZERO_DIVISOR_OPERATIONS = ("divide", "calculate_percentage")
+_ITEM_SIZES = {"d": 8, "B": 1}
+
+
+def _view(block, length, typecode):
+    """Return a typed view of the first ``length`` items of a block."""
+    if np is not None:
+        dtype = np.float64 if typecode == "d" else np.bool_
+        return np.ndarray((length,), dtype=dtype, buffer=block.buf)
+    return block.buf[:length * _ITEM_SIZES[typecode]].cast(typecode)
+
+
+def _compute_chunk(op, blocks, length, start, stop, b_scalar, fill):
+    """Evaluate one chunk, writing results (and mask) in place."""
+    a = _view(blocks["a"], length, "d")[start:stop]
+    if "b" in blocks:
+        b = _view(blocks["b"], length, "d")[start:stop]
+    else:
+        b = b_scalar
+    func = BATCH_OPERATIONS[op]
+    if op in _ZERO_DIVISOR_OPERATIONS:
+        result, mask = func(a, b, fill=fill, return_mask=True)
+        if "mask" in blocks:
+            _view(blocks["mask"], length, "B")[start:stop] = mask
+    else:
+        result = func(a, b)
+    _view(blocks["out"], length, "d")[start:stop] = result
+
+
+def _evaluate_chunk(op, names, length, start, stop, b_scalar, fill):
+    """Worker entry point; returns ``(chunk size, seconds taken)``."""
+    started = time.perf_counter()
+    blocks = {key: shared_memory.SharedMemory(name=name)
+              for key, name in names.items()}
+    try:
+        _compute_chunk(op, blocks, length, start, stop, b_scalar, fill)
+    finally:
+        for block in blocks.values():
+            block.close()
+    return stop - start, time.perf_counter() - started
+
+
+def _operand_length(values):
+    """Return the number of items in a batch operand, or None for scalars."""
+    if isinstance(values, numbers.Number):
+        return None
+    try:
+        return len(values)
+    except TypeError:
+        return len(memoryview(values))
+
+
+class ParallelExecutor:
+    """Evaluate batch operations across a pool of worker processes.
+
+    The chunk size starts at ``chunk_size`` and is re-tuned after every
+    chunk so that one chunk takes about ``target_chunk_seconds``; the
+    tuned value carries over to later runs. Inputs shorter than
+    ``min_parallel_size`` are evaluated in-process.
+    """
+
+    def __init__(self, workers=None, chunk_size=65536,
+                 target_chunk_seconds=0.02, min_chunk_size=1024,
+                 max_chunk_size=1 << 22, min_parallel_size=100000):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.target_chunk_seconds = target_chunk_seconds
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.min_parallel_size = min_parallel_size
+        self.chunks_run = 0
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _tune(self, size, seconds):
+        """Move the chunk size towards the latency target."""
+        ideal = size * self.target_chunk_seconds / max(seconds, 1e-6)
+        tuned = int((self.chunk_size + ideal) / 2)
+        self.chunk_size = max(self.min_chunk_size,
+                              min(self.max_chunk_size, tuned))
+
+    def run(self, op, a, b, fill=math.nan, return_mask=False):
+        """Evaluate ``BATCH_OPERATIONS[op](a, b)`` in parallel.
+
+        Takes the same operands and zero-divisor ``fill``/``return_mask``
+        options as the batch functions in app.py and returns the same
+        result types.
+        """
+        if op not in BATCH_OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+        a_length = _operand_length(a)
+        b_length = _operand_length(b)
+        if a_length is None:
+            raise ValueError("The first operand must be a batch!")
+        if b_length is not None and b_length != a_length:
+            raise ValueError("Batch operands must have the same length!")
+        if a_length < max(self.min_parallel_size, 1):
+            return self._run_inline(op, a, b, fill, return_mask)
+
+        masked = return_mask and op in _ZERO_DIVISOR_OPERATIONS
+        blocks = {}
+        try:
+            blocks["a"] = self._share(a, a_length, "d")
+            if b_length is not None:
+                blocks["b"] = self._share(b, a_length, "d")
+            blocks["out"] = self._share(None, a_length, "d")
+            if masked:
+                blocks["mask"] = self._share(None, a_length, "B")
+            self._dispatch(op, blocks, a_length, b, fill)
+            result = self._collect(blocks["out"], a_length, "d")
+            if return_mask:
+                if masked:
+                    mask = self._collect(blocks["mask"], a_length, "B")
+                else:
+                    mask = self._collect(None, a_length, "B")
+                return result, mask
+            return result
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+    def _run_inline(self, op, a, b, fill, return_mask):
+        """Evaluate a small batch in the calling process."""
+        func = BATCH_OPERATIONS[op]
+        if op in _ZERO_DIVISOR_OPERATIONS:
+            return func(a, b, fill=fill, return_mask=return_mask)
+        result = func(a, b)
+        if return_mask:
+            return result, self._collect(None, len(result), "B")
+        return result
+
+    def _dispatch(self, op, blocks, length, b, fill):
+        """Keep every worker busy with chunks until the input is done."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        names = {key: block.name for key, block in blocks.items()}
+        b_scalar = b if "b" not in blocks else None
+        pending = set()
+        start = 0
+        try:
+            while start < length or pending:
+                while start < length and len(pending) < 2 * self.workers:
+                    stop = min(length, start + self.chunk_size)
+                    pending.add(self._pool.submit(
+                        _evaluate_chunk, op, names, length, start, stop,
+                        b_scalar, fill))
+                    start = stop
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._tune(*future.result())
+                    self.chunks_run += 1
+        finally:
+            for future in pending:
+                future.cancel()
+            wait(pending)
+
+    @staticmethod
+    def _share(values, length, typecode):
+        """Create a shared block, optionally filled with ``values``."""
+        block = shared_memory.SharedMemory(
+            create=True, size=max(1, length * _ITEM_SIZES[typecode]))
+        if values is not None:
+            if np is not None:
+                _view(block, length, typecode)[:] = values
+            else:
+                source = array.array(typecode, values)
+                view = _view(block, length, typecode)
+                view[:] = source
+                view.release()
+        return block
+
+    @staticmethod
+    def _collect(block, length, typecode):
+        """Copy a shared block (or zeros) into a regular result array."""
+        if np is not None:
+            if block is None:
+                return np.zeros(length, dtype=bool)
+            return np.array(_view(block, length, typecode))
+        if typecode == "B":
+            if block is None:
+                return bytearray(length)
+            return bytearray(block.buf[:length])
+        result = array.array(typecode)
+        result.frombytes(block.buf[:length * _ITEM_SIZES[typecode]])
+        return result
+
+
+def parallel_batch(op, a, b, fill=math.nan, return_mask=False,
+                   **executor_options):
+    """Evaluate one batch operation with a short-lived ParallelExecutor."""
+    with ParallelExecutor(**executor_options) as executor:
+        return executor.run(op, a, b, fill=fill, return_mask=return_mask)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Build every HTML report, running independent generators concurrently.
+Each report generator is listed with the reports it depends on: the
+flake8, Jenkins-compatible and coverage-style reports only need their
+inputs, so they run at the same time in a process pool, and the
+dashboard that links them runs once they are written. The summary of
+test-results.json is read once here and handed to the generators, which
+stream the test records themselves rather than receive them pickled.
+Each generator's output is printed as it finishes, followed by how long
+every generator took.
+
+Usage:
+    python report_orchestrator.py
+    python report_orchestrator.py --jobs 1 jenkins dashboard
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from results_reader import read_summary
+
+RESULTS_FILE = "test-results.json"
+# name: (module, function, reports it depends on)
+REPORTS = {
+    "flake8": ("generate_flake8_report", "generate_flake8_html_report", ()),
+    "jenkins": ("generate_jenkins_report",
+                "generate_jenkins_compatible_report", ()),
+    "coverage-style": ("generate_coverage_style_report",
+                       "generate_coverage_style_report", ()),
+    "dashboard": ("generate_reports_dashboard", "generate_reports_index",
+                  ("flake8", "jenkins", "coverage-style")),
+}
+# Reports rendered from the pytest results
+PYTEST_REPORTS = ("jenkins", "coverage-style")
+
+
+def build_order(names=None):
+    """Return the reports in an order that respects their dependencies.
+
+    Dependencies on reports that are not selected are ignored, so the
+    dashboard can be rebuilt on its own.
+    """
+    names = list(REPORTS) if names is None else list(names)
+    for name in names:
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name}!")
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Reports depend on each other: {name}!")
+        visiting.add(name)
+        for dependency in REPORTS[name][2]:
+            if dependency in names:
+                visit(dependency)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def _run_report(module, function, kwargs):
+    """Worker entry point; returns ``(ok, output, seconds taken)``."""
+    started = time.perf_counter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            generate = getattr(importlib.import_module(module), function)
+            ok = bool(generate(**kwargs))
+        except Exception as e:
+            print(f"❌ {module}.{function} failed: {e}")
+            ok = False
+    return ok, output.getvalue(), time.perf_counter() - started
+
+
+def _arguments(name, results_file, cache_dir, summary):
+    """Return the keyword arguments of one report's generator."""
+    if name not in PYTEST_REPORTS:
+        return {}
+    kwargs = {"results_file": results_file, "run_missing": False,
+              "summary": summary}
+    if name == "jenkins":
+        kwargs["cache_dir"] = cache_dir
+    return kwargs
+
+
+def _read_shared_summary(results_file):
+    """Read the results' summary once; None leaves it to the generators."""
+    try:
+        return read_summary(results_file)
+    except (OSError, ValueError):
+        return None
+
+
+def run_reports(names=None, results_file=RESULTS_FILE, cache_dir=None,
+                jobs=None):
+    """Generate the given reports (all by default); return their results.
+
+    Returns a dict mapping each report to ``(ok, seconds taken)``. Up to
+    ``jobs`` generators run at once, one per CPU by default; with one
+    job they run one after another in this process.
+    """
+    order = build_order(names)
+    summary = None
+    if any(name in PYTEST_REPORTS for name in order):
+        summary = _read_shared_summary(results_file)
+    tasks = {name: (*REPORTS[name][:2],
+                    _arguments(name, results_file, cache_dir, summary))
+             for name in order}
+    results = {}
+
+    def finish(name, result):
+        ok, output, seconds = result
+        sys.stdout.write(output)
+        results[name] = (ok, seconds)
+
+    started = time.perf_counter()
+    if jobs == 1:
+        for name in order:
+            finish(name, _run_report(*tasks[name]))
+    else:
+        jobs = min(jobs or os.cpu_count() or 1, len(order)) or 1
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = list(order)
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    if all(dependency in results
+                           for dependency in REPORTS[name][2]
+                           if dependency in tasks):
+                        pending.remove(name)
+                        future = pool.submit(_run_report, *tasks[name])
+                        running[future] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result())
+    elapsed = time.perf_counter() - started
+
+    print("⏱️  Report timings:")
+    for name in order:
+        ok, seconds = results[name]
+        print(f"   {'✅' if ok else '❌'} {name:<16} {seconds:8.3f}s")
+    print(f"   Total: {elapsed:.3f}s with {jobs} job(s)")
+    return results
+
+
+def main(argv=None):
+    """Build the requested reports; return 1 if any of them failed."""
+    parser = argparse.ArgumentParser(
+        description="Generate the HTML reports, independent ones "
+                    "concurrently.")
+    parser.add_argument("reports", nargs="*",
+                        help=f"reports to build: {', '.join(REPORTS)} "
+                             "(default: all)")
+    parser.add_argument("--results", default=RESULTS_FILE,
+                        help="pytest-json-report output file")
+    parser.add_argument("--fragment-cache", metavar="DIR",
+                        help="reuse test rows rendered by the last build, "
+                             "e.g. .report-cache")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="generators to run at once (default: one "
+                             "per CPU)")
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    try:
+        results = run_reports(args.reports or None, args.results,
+                              args.fragment_cache, args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+    if not all(ok for ok, _ in results.values()):
+        print("❌ Some reports could not be generated")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
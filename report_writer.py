@@ -0,0 +1,54 @@
+"""
+Incremental writer for the generated HTML reports.
+Report generators write the page piece by piece, one test row at a time,
+instead of concatenating the whole document in memory, so memory use
+does not grow with the number of tests. Output goes to a temporary file
+that is renamed over the report only once the page is complete; a failed
+run leaves any previous report untouched.
+"""
+
+import os
+
+
+class StreamingHTMLWriter:
+    """Write a report file incrementally and publish it atomically.
+
+    Use as a context manager; ``write`` appends text to the page.
+    """
+
+    def __init__(self, path, encoding="utf-8", buffering=1 << 16):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._file = open(self.tmp_path, "w", encoding=encoding,
+                          buffering=buffering)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, text):
+        """Append text to the page."""
+        self._file.write(text)
+
+    def writelines(self, pieces):
+        """Append every piece of text in an iterable."""
+        for text in pieces:
+            self.write(text)
+
+    def close(self):
+        """Finish the page and move it into place."""
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard the partial page."""
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,221 @@
+"""
+Streaming reader for the test-results.json written by pytest-json-report.
+The report generators only ever need the summary and then one test at a
+time, so instead of json.load() on the whole file this module scans it
+incrementally and parses one test record at a time, keeping memory use
+bounded by the largest single record rather than by the file size.
+
+When ijson is installed it is used as the parser; otherwise a pure-Python
+tokenizer finds value boundaries and hands each value to the C JSON
+decoder.
+
+Usage:
+    summary = read_summary("test-results.json")
+    for test in iter_tests("test-results.json"):
+        ...
+"""
+
+import json
+import re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+CHUNK_SIZE = 1 << 20
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r"[ \t\n\r,\]}]")
+
+
+class _Tokenizer:
+    """Incremental scanner over the text of a JSON document.
+
+    Only the text from the current value onwards is kept in memory;
+    consumed text is dropped whenever another chunk is read.
+    """
+
+    def __init__(self, f, chunk_size=None):
+        self._file = f
+        self._chunk_size = chunk_size or CHUNK_SIZE
+        self._eof = False
+        self.buf = ""
+        self.pos = 0
+        # Start of a value being captured; text after it is kept.
+        self.mark = None
+
+    def _more(self):
+        """Read the next chunk; return False at the end of the file."""
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        drop = self.pos if self.mark is None else self.mark
+        self.buf = self.buf[drop:] + chunk
+        self.pos -= drop
+        if self.mark is not None:
+            self.mark -= drop
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or ''."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char):
+        """Consume ``char`` or fail."""
+        if self.peek() != char:
+            raise ValueError(f"Invalid test results JSON: expected {char!r}!")
+        self.pos += 1
+
+    def _skip_string(self):
+        """Move past the string whose opening quote is at ``pos``."""
+        self.pos += 1
+        while True:
+            end = self.buf.find('"', self.pos)
+            if end < 0:
+                # Keep trailing backslashes: they may escape the next quote.
+                end = len(self.buf)
+                while end > self.pos and self.buf[end - 1] == "\\":
+                    end -= 1
+                self.pos = end
+                if not self._more():
+                    raise ValueError("Invalid test results JSON: "
+                                     "unterminated string!")
+                continue
+            start = end
+            while start > 0 and self.buf[start - 1] == "\\":
+                start -= 1
+            self.pos = end + 1
+            if (end - start) % 2 == 0:
+                return
+
+    def skip_value(self):
+        """Move past the value at the current position."""
+        char = self.peek()
+        if char == '"':
+            self._skip_string()
+        elif char in ("[", "{"):
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buf, self.pos)
+                if match is None:
+                    self.pos = len(self.buf)
+                    if not self._more():
+                        raise ValueError("Invalid test results JSON: "
+                                         "unexpected end!")
+                    continue
+                self.pos = match.start()
+                if match.group() == '"':
+                    self._skip_string()
+                    continue
+                self.pos += 1
+                depth += 1 if match.group() in "[{" else -1
+                if depth == 0:
+                    return
+        elif char:
+            while True:
+                match = _SCALAR_END.search(self.buf, self.pos)
+                if match is not None:
+                    self.pos = match.start()
+                    return
+                self.pos = len(self.buf)
+                if not self._more():
+                    return
+        else:
+            raise ValueError("Invalid test results JSON: unexpected end!")
+
+    def read_value(self):
+        """Parse and return the value at the current position."""
+        self.peek()
+        try:
+            value, end = _DECODER.raw_decode(self.buf, self.pos)
+        except ValueError:
+            pass
+        else:
+            # A value ending with the buffer may be a truncated number.
+            if end < len(self.buf) or self._eof:
+                self.pos = end
+                return value
+        self.mark = self.pos
+        try:
+            self.skip_value()
+            text = self.buf[self.mark:self.pos]
+        finally:
+            self.mark = None
+        return json.loads(text)
+
+    def members(self):
+        """Yield the keys of the object at the current position.
+
+        After each key the caller must read or skip its value.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError("Invalid test results JSON: expected a key!")
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() != ",":
+                self.expect("}")
+                return
+            self.pos += 1
+
+    def items(self):
+        """Yield every element of the array at the current position."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() != ",":
+                self.expect("]")
+                return
+            self.pos += 1
+
+
+def read_summary(path):
+    """Return the ``summary`` object, reading no further than needed.
+
+    pytest-json-report writes the summary before the tests, so this only
+    reads the start of the file; a summary after the tests is found by
+    scanning past them without parsing.
+    """
+    if ijson is not None:
+        with open(path, "rb") as f:
+            for summary in ijson.items(f, "summary", use_float=True):
+                return summary
+        return {}
+    with open(path, encoding="utf-8") as f:
+        tokens = _Tokenizer(f)
+        for key in tokens.members():
+            if key == "summary":
+                return tokens.read_value()
+            tokens.skip_value()
+    return {}
+
+
+def iter_tests(path):
+    """Yield the entries of the ``tests`` array one at a time."""
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "tests.item", use_float=True)
+        return
+    with open(path, encoding="utf-8") as f:
+        tokens = _Tokenizer(f)
+        for key in tokens.members():
+            if key == "tests":
+                yield from tokens.items()
+                return
+            tokens.skip_value()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Single test run feeding every report.
+Runs pytest once, inside this process, with coverage measurement, the
+pytest-json-report output (test-results.json) and the pytest-html report
+all captured by that one run. The Jenkins, coverage-style and dashboard
+reports are then generated from those artifacts, concurrently by
+report_orchestrator.py, so nothing runs the suite a second time.
+
+Usage:
+    python run_tests.py
+    python run_tests.py --no-coverage -- -k Calculator
+"""
+
+import argparse
+import sys
+
+RESULTS_FILE = "test-results.json"
+HTML_REPORT = "pytest-report.html"
+COVERAGE_DIR = "coverage-html"
+
+
+def run_pytest(pytest_args=(), results_file=RESULTS_FILE,
+               html_report=HTML_REPORT, coverage_dir=COVERAGE_DIR):
+    """Run pytest once with every report plugin; return its exit code.
+
+    With a ``coverage_dir`` coverage is measured over the same run and
+    written as an HTML report there, plus a summary on stdout.
+    """
+    import pytest
+
+    cov = None
+    if coverage_dir:
+        import coverage
+        cov = coverage.Coverage()
+        cov.start()
+    try:
+        exit_code = pytest.main([
+            "--json-report", f"--json-report-file={results_file}",
+            f"--html={html_report}", "--self-contained-html",
+            *pytest_args])
+    finally:
+        if cov is not None:
+            cov.stop()
+            cov.save()
+    if cov is not None:
+        try:
+            print("📊 Coverage summary:")
+            cov.report()
+            cov.html_report(directory=coverage_dir)
+        except coverage.CoverageException as e:
+            print(f"⚠️  No coverage report: {e}")
+    return int(exit_code)
+
+
+def generate_reports(results_file=RESULTS_FILE, cache_dir=None, jobs=None):
+    """Generate every pytest report from one run's artifacts.
+
+    ``cache_dir`` keeps the Jenkins report's rendered test rows for the
+    next build; ``jobs`` limits how many generators run at once. Returns
+    True when all reports were written.
+    """
+    # Imported here so coverage, started by run_pytest, sees the modules
+    # being imported by the tests.
+    from report_orchestrator import PYTEST_REPORTS, run_reports
+
+    results = run_reports(PYTEST_REPORTS + ("dashboard",), results_file,
+                          cache_dir, jobs)
+    return all(ok for ok, _ in results.values())
+
+
+def main(argv=None):
+    """Run the suite once, then build every report from it."""
+    parser = argparse.ArgumentParser(
+        description="Run pytest once and generate every test report.")
+    parser.add_argument("--results", default=RESULTS_FILE,
+                        help="pytest-json-report output file")
+    parser.add_argument("--html", default=HTML_REPORT,
+                        help="pytest-html report file")
+    parser.add_argument("--coverage-dir", default=COVERAGE_DIR,
+                        help="coverage HTML report directory")
+    parser.add_argument("--no-coverage", action="store_true",
+                        help="do not measure coverage")
+    parser.add_argument("--fragment-cache", metavar="DIR",
+                        help="reuse test rows rendered by the last build, "
+                             "e.g. .report-cache")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="report generators to run at once")
+    parser.add_argument("--no-reports", action="store_true",
+                        help="only run pytest and write its artifacts")
+    parser.add_argument("pytest_args", nargs="*",
+                        help="extra pytest arguments, after --")
+    args = parser.parse_args(argv)
+
+    print("🧪 Running pytest once for every report...")
+    exit_code = run_pytest(args.pytest_args, args.results, args.html,
+                           None if args.no_coverage else args.coverage_dir)
+    print(f"Pytest exit code: {exit_code}")
+    if args.no_reports:
+        return exit_code
+    print("📊 Generating reports from the test run...")
+    if not generate_reports(args.results, args.fragment_cache,
+                            args.jobs):
+        print("❌ Some reports could not be generated")
+        return exit_code or 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
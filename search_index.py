@@ -0,0 +1,188 @@
+"""
+Prebuilt search index for the coverage-style report's filter box.
+The generator indexes the words of each test's node id, file name and
+failure message, so the page answers a query by looking words up in a
+sorted vocabulary instead of scanning the text of every test. A query
+matches the tests where every query word starts some indexed word:
+"testcalc div" finds "test_app.py::TestCalculator::test_divide".
+
+Sets of tests are run-length encoded: alternating gaps and lengths of
+runs of consecutive test numbers, so a word shared by a whole class of
+tests costs a few numbers. One and two character prefixes that start
+many words also get the union of their words' tests, so the first
+keystrokes of a query are a single lookup too.
+
+Usage:
+    index = SearchIndex()
+    for number, test in enumerate(tests):
+        index.add(number, test)
+    data = index.to_dict()
+"""
+
+import re
+from array import array
+
+# Maps every ASCII byte that is not a letter or digit to a space
+_SEPARATORS = bytes(byte if chr(byte).isalnum() or byte >= 128 else 32
+                    for byte in range(256))
+# Prefixes of up to this many characters get precomputed unions...
+PREFIX_LENGTH = 2
+# ...when they start more than this many words
+PREFIX_MIN_WORDS = 32
+_RUN = re.compile(rb"\x01+")
+
+
+def words(text):
+    """Split text into the lowercase words the index is built from.
+
+    Words are runs of ASCII letters and digits and non-ASCII characters.
+    """
+    return [word.decode() for word in _words(text)]
+
+
+def _words(text):
+    """Return the words of text as UTF-8 bytes, which is quicker."""
+    encoded = text.lower().encode("utf-8", "surrogatepass")
+    return encoded.translate(_SEPARATORS).split()
+
+
+def failure_message(longrepr):
+    """Return the ``E`` lines of a pytest failure, or its last line."""
+    lines = str(longrepr).splitlines()
+    message = [line[1:] for line in lines if line.startswith("E ")]
+    if message:
+        return "\n".join(message)
+    return lines[-1] if lines else ""
+
+
+class Runs:
+    """Run-length encode increasing test numbers as they are added."""
+
+    __slots__ = ("_values", "_previous", "_start", "_end")
+
+    def __init__(self, numbers=()):
+        self._values = array("I")
+        self._previous = 0
+        self._start = self._end = None
+        for number in numbers:
+            self.add(number)
+
+    def add(self, number):
+        """Add a number larger than every number added before."""
+        if number == self._end:
+            self._end += 1
+            return
+        self._flush()
+        self._start = number
+        self._end = number + 1
+
+    def _flush(self):
+        """Append the current run to the encoded values."""
+        if self._start is not None:
+            self._values.append(self._start - self._previous)
+            self._values.append(self._end - self._start)
+            self._previous = self._end
+
+    def encode(self):
+        """Return the runs as comma-separated gaps and lengths."""
+        self._flush()
+        self._start = self._end = None
+        return ",".join(map(str, self._values))
+
+
+def decode_runs(text):
+    """Expand encoded runs back into test numbers."""
+    numbers = []
+    position = 0
+    values = [int(value) for value in text.split(",")] if text else []
+    for gap, run in zip(values[::2], values[1::2]):
+        position += gap
+        numbers.extend(range(position, position + run))
+        position += run
+    return numbers
+
+
+class SearchIndex:
+    """Collect the words of tests numbered from zero."""
+
+    def __init__(self):
+        self._postings = {}
+        self._count = 0
+
+    def add(self, number, test):
+        """Index test ``number``; tests must be added in order."""
+        self._count = number + 1
+        text = [str(test.get("nodeid", "")), str(test.get("file", ""))]
+        if test.get("outcome") == "failed" and "call" in test:
+            text.append(failure_message(test["call"].get("longrepr", "")))
+        postings = self._postings
+        for word in set(_words(" ".join(text))):
+            # Most words belong to one test; only shared words get arrays.
+            entry = postings.get(word)
+            if entry is None:
+                postings[word] = number
+            elif type(entry) is int:
+                postings[word] = array("I", (entry, number))
+            else:
+                entry.append(number)
+
+    def to_dict(self):
+        """Return the index in the form the report's script reads.
+
+        Words are sorted by UTF-16 code units, the order JavaScript
+        compares strings in, so the page can binary search them.
+        """
+        vocabulary = sorted(
+            (word.decode("utf-8", "surrogatepass") for word in self._postings),
+            key=lambda word: word.encode("utf-16-be", "surrogatepass"))
+        keys = [word.encode("utf-8", "surrogatepass") for word in vocabulary]
+        return {
+            "words": vocabulary,
+            "postings": [self._encode(self._postings[key]) for key in keys],
+            "prefixes": self._prefixes(vocabulary, keys),
+        }
+
+    @staticmethod
+    def _encode(entry):
+        """Encode the postings of one word."""
+        if type(entry) is int:
+            return f"{entry},1"
+        if entry[-1] - entry[0] == len(entry) - 1:
+            return f"{entry[0]},{len(entry)}"
+        return Runs(entry).encode()
+
+    def _prefixes(self, vocabulary, keys):
+        """Return the encoded unions of tests of common short prefixes."""
+        prefixes = {}
+        for length in range(1, PREFIX_LENGTH + 1):
+            # Sorted words sharing a prefix are next to each other.
+            start = 0
+            for end in range(1, len(vocabulary) + 1):
+                prefix = vocabulary[start][:length]
+                if (end < len(vocabulary)
+                        and vocabulary[end][:length] == prefix):
+                    continue
+                if (len(prefix) == length
+                        and end - start > PREFIX_MIN_WORDS):
+                    prefixes[prefix] = self._union(keys[start:end])
+                start = end
+        return prefixes
+
+    def _union(self, keys):
+        """Encode the tests of any of the given words."""
+        marks = bytearray(self._count)
+        for key in keys:
+            entry = self._postings[key]
+            if type(entry) is int:
+                marks[entry] = 1
+            elif entry[-1] - entry[0] == len(entry) - 1:
+                marks[entry[0]:entry[-1] + 1] = b"\x01" * len(entry)
+            else:
+                for number in entry:
+                    marks[number] = 1
+        values = []
+        previous = 0
+        for run in _RUN.finditer(marks):
+            values += (run.start() - previous, run.end() - run.start())
+            previous = run.end()
+        return ",".join(map(str, values))
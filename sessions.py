@@ -0,0 +1,218 @@
+"""
+Session manager for many Calculator instances under one memory budget.
+Every session owns a Calculator. The manager tracks the memory held by
+each session's history and, whenever the total exceeds the budget,
+spills the least recently used sessions to columnar history archives on
+disk, or drops them when no spill directory is configured. A spilled
+session is rehydrated from its archive the next time it is requested.
+Eviction, spill and rehydrate latencies are recorded in an
+instrumentation Registry.
+
+Usage:
+    sessions = SessionManager(64 * 2 ** 20, spill_dir="session-spill")
+    sessions.get("alice").calculate("add", 2, 3)
+    print(sessions.metrics.to_prometheus(prefix="calculator_sessions"))
+"""
+
+import collections
+import itertools
+import os
+import threading
+import time
+
+from app import Calculator, HistoryStore, export_history, load_history
+from instrumentation import Registry
+
+# Estimated bytes a session holds besides its history records.
+SESSION_OVERHEAD = 4096
+
+
+def _default_factory(history):
+    """Create the Calculator of a session around its history."""
+    return Calculator(history=history)
+
+
+class SessionManager:
+    """Keep one Calculator per session within a global memory budget.
+
+    ``memory_budget`` is in bytes. ``spill_dir`` is where idle histories
+    are written; without it, sessions over budget are dropped outright.
+    ``idle_timeout`` (seconds) lets ``sweep()`` spill sessions that have
+    not been used for a while even under budget. ``factory`` builds a
+    session's Calculator from a ``HistoryStore``.
+
+    Callers should look a session up with ``get()`` for every request
+    instead of holding on to its Calculator, since a spilled session is
+    rehydrated into a new Calculator.
+    """
+
+    def __init__(self, memory_budget, spill_dir=None, idle_timeout=None,
+                 history_capacity=None, factory=None, clock=time.monotonic,
+                 registry=None):
+        if memory_budget <= 0:
+            raise ValueError("Memory budget must be positive!")
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.idle_timeout = idle_timeout
+        self.history_capacity = history_capacity
+        self.factory = factory or _default_factory
+        self.clock = clock
+        self.metrics = registry or Registry()
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._resident = collections.OrderedDict()
+        self._footprints = {}
+        self._last_used = {}
+        self._dirty = set()
+        self._spilled = {}
+        self._spill_names = itertools.count()
+        self._memory = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._resident) + len(self._spilled)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return (session_id in self._resident
+                    or session_id in self._spilled)
+
+    def get(self, session_id):
+        """Return the Calculator of a session, creating or rehydrating it.
+
+        The session counts as used now; its footprint is re-measured on
+        the next call, after the caller has used it.
+        """
+        with self._lock:
+            calculator = self._resident.get(session_id)
+            if calculator is not None:
+                self._resident.move_to_end(session_id)
+            else:
+                spilled = self._spilled.pop(session_id, None)
+                if spilled is not None:
+                    calculator = self._rehydrate(*spilled)
+                else:
+                    calculator = self.factory(
+                        HistoryStore(self.history_capacity))
+                self._resident[session_id] = calculator
+                self._footprints[session_id] = 0
+            self._last_used[session_id] = self.clock()
+            self._dirty.add(session_id)
+            self._enforce(keep=session_id)
+            return calculator
+
+    def remove(self, session_id):
+        """Forget a session and delete its spill file."""
+        with self._lock:
+            if self._resident.pop(session_id, None) is not None:
+                self._memory -= self._footprints.pop(session_id)
+                del self._last_used[session_id]
+                self._dirty.discard(session_id)
+            spilled = self._spilled.pop(session_id, None)
+            if spilled is not None:
+                os.remove(spilled[0])
+
+    def sweep(self):
+        """Spill sessions idle past ``idle_timeout`` and enforce the budget.
+
+        Returns the number of sessions spilled or evicted.
+        """
+        with self._lock:
+            count = 0
+            if self.idle_timeout is not None:
+                cutoff = self.clock() - self.idle_timeout
+                for session_id in list(self._resident):
+                    if self._last_used[session_id] > cutoff:
+                        break
+                    self._release(session_id)
+                    count += 1
+            return count + self._enforce()
+
+    def memory_usage(self):
+        """Return the estimated bytes held by resident sessions."""
+        with self._lock:
+            self._measure()
+            return self._memory
+
+    def stats(self):
+        """Get session counts and memory use."""
+        with self._lock:
+            self._measure()
+            return {
+                "sessions": len(self._resident) + len(self._spilled),
+                "resident": len(self._resident),
+                "spilled": len(self._spilled),
+                "memory": self._memory,
+                "memory_budget": self.memory_budget,
+            }
+
+    def close(self):
+        """Drop every session and delete all spill files."""
+        with self._lock:
+            for path, _ in self._spilled.values():
+                os.remove(path)
+            self._spilled.clear()
+            self._resident.clear()
+            self._footprints.clear()
+            self._last_used.clear()
+            self._dirty.clear()
+            self._memory = 0
+
+    def _measure(self):
+        """Re-measure the sessions used since they were last measured."""
+        for session_id in self._dirty:
+            history = self._resident[session_id].history
+            footprint = SESSION_OVERHEAD + history.memory_usage()
+            self._memory += footprint - self._footprints[session_id]
+            self._footprints[session_id] = footprint
+        self._dirty.clear()
+
+    def _enforce(self, keep=None):
+        """Release least recently used sessions until within budget."""
+        self._measure()
+        if keep is not None:
+            # The caller is about to use this session; measure it later.
+            self._dirty.add(keep)
+        count = 0
+        while self._memory > self.memory_budget:
+            session_id = next(iter(self._resident), None)
+            if session_id is None or session_id == keep:
+                break
+            self._release(session_id)
+            count += 1
+        return count
+
+    def _release(self, session_id):
+        """Spill a resident session to disk, or drop it."""
+        started = time.perf_counter()
+        calculator = self._resident.pop(session_id)
+        self._memory -= self._footprints.pop(session_id)
+        del self._last_used[session_id]
+        self._dirty.discard(session_id)
+        history = calculator.history
+        if self.spill_dir is None or not len(history):
+            self._observe("evict", started)
+            return
+        path = os.path.join(self.spill_dir,
+                            f"session-{next(self._spill_names)}.calc")
+        export_history(history, path)
+        self._spilled[session_id] = (path, history.capacity)
+        self._observe("spill", started)
+
+    def _rehydrate(self, path, capacity):
+        """Load a spilled history into a new Calculator."""
+        started = time.perf_counter()
+        with load_history(path) as archive:
+            columns, raw = archive.columns()
+            history = HistoryStore.from_columns(columns, raw, capacity)
+        os.remove(path)
+        calculator = self.factory(history)
+        self._observe("rehydrate", started)
+        return calculator
+
+    def _observe(self, name, started):
+        """Record one eviction, spill or rehydrate latency."""
+        stats = self.metrics.stats(name)
+        stats.calls += 1
+        stats.observe(time.perf_counter() - started)
@@ -1,6 +1,22 @@
+import array
+import decimal
+import fractions
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import threading
 import unittest
+from unittest import mock
 from app import (add, subtract, multiply, divide, calculate_percentage,
-                 Calculator)
+                 Calculator, add_batch, subtract_batch, multiply_batch,
+                 divide_batch, calculate_percentage_batch, HistoryStore,
+                 HistoryIndex, ConcurrentCalculator, percent_of_total,
+                 CompensatedSum, LogProduct, RunningStats, stable_sum,
+                 stable_product, mean_variance, load_history, np,
+                 read_operations, evaluate_operations, write_results, main)
 
 
 class TestMathFunctions(unittest.TestCase):
@@ -50,6 +66,295 @@ class TestMathFunctions(unittest.TestCase):
             calculate_percentage(10, 0)
         self.assertEqual(str(context.exception), "Total cannot be zero!")
 
+    def test_exact_native_results(self):
+        """Test that exact results stay native when they fit."""
+        self.assertEqual(divide(10, 5, exact=True), 2)
+        self.assertIs(type(divide(10, 5, exact=True)), int)
+        self.assertEqual(divide(10, 4, exact=True), 2.5)
+        self.assertEqual(divide(-0.75, 0.25, exact=True), -3.0)
+        self.assertIs(type(calculate_percentage(1, 4, exact=True)), int)
+        self.assertEqual(divide(2 ** 60 + 2, 2, exact=True), 2 ** 59 + 1)
+
+    def test_exact_decimal_results(self):
+        """Test that inexact quotients fall back to Decimal."""
+        self.assertEqual(divide(1, 10, exact=True), decimal.Decimal("0.1"))
+        self.assertEqual(calculate_percentage(1, 3, exact=True),
+                         decimal.Decimal("33.33333333333333333333333333"
+                                         "333333"))
+        self.assertEqual(divide(0.3, 0.1, exact=True),
+                         decimal.Decimal("2.99999999999999972244424384371088"))
+        self.assertEqual(divide(fractions.Fraction(1, 3), 2, exact=True),
+                         fractions.Fraction(1, 6))
+        with self.assertRaises(ValueError):
+            divide(1, 0, exact=True)
+
+    def test_exact_tiny_results(self):
+        """Test that subnormal and underflowing quotients stay exact."""
+        tiny = 5e-324
+        self.assertEqual(divide(tiny * 4, 2, exact=True), tiny * 2)
+        self.assertEqual(divide(1, 2 ** 1070, exact=True), 2.0 ** -1070)
+        self.assertEqual(str(divide(tiny, 2, exact=True)),
+                         "2.470328229206232720882843964341107E-324")
+        result = divide(1, 2 ** 1100, exact=True)
+        self.assertIsInstance(result, decimal.Decimal)
+        self.assertEqual(str(result),
+                         "7.362151829022862675436866177144965E-332")
+
+
+class CountingArray(array.array):
+    """A float array that counts Python-level iterations over it."""
+
+    iterations = 0
+
+    def __iter__(self):
+        CountingArray.iterations += 1
+        return super().__iter__()
+
+
+class TestBatchFunctions(unittest.TestCase):
+    """Test cases for the vectorized batch functions."""
+
+    vectorized = np is not None
+
+    def test_arithmetic_batches(self):
+        """Test element-wise add, subtract and multiply."""
+        a = array.array("d", [1, 2, 3])
+        b = [4, 5, 6]
+        self.assertEqual(list(add_batch(a, b)), [5, 7, 9])
+        self.assertEqual(list(subtract_batch(a, b)), [-3, -3, -3])
+        self.assertEqual(list(multiply_batch(a, b)), [4, 10, 18])
+
+    def test_scalar_broadcast(self):
+        """Test that a scalar operand is applied to every row."""
+        self.assertEqual(list(multiply_batch(array.array("i", [1, 2]), 3)),
+                         [3, 6])
+
+    def test_buffer_operand(self):
+        """Test that buffer-protocol objects are accepted."""
+        values = memoryview(array.array("d", [10, 20]))
+        self.assertEqual(list(divide_batch(values, 10)), [1, 2])
+
+    def test_length_mismatch(self):
+        """Test that mismatched operands are rejected."""
+        with self.assertRaises(ValueError):
+            list(add_batch([1, 2], [1, 2, 3]))
+
+    def test_divide_batch_fill(self):
+        """Test that zero divisors are filled instead of raising."""
+        result = divide_batch([10, 5, 9], [2, 0, 3])
+        self.assertEqual(result[0], divide(10, 2))
+        self.assertTrue(math.isnan(result[1]))
+        self.assertEqual(result[2], divide(9, 3))
+        self.assertEqual(list(divide_batch([1], [0], fill=-1)), [-1])
+
+    def test_divide_batch_mask(self):
+        """Test that the mask marks zero-divisor rows."""
+        result, mask = divide_batch([1, 2, 3], [1, 0, 1], fill=0,
+                                    return_mask=True)
+        self.assertEqual(list(result), [1, 0, 3])
+        self.assertEqual([bool(m) for m in mask], [False, True, False])
+
+    def test_calculate_percentage_batch(self):
+        """Test batch percentages match the scalar function."""
+        result, mask = calculate_percentage_batch([25, 50, 7], [100, 0, 3],
+                                                  fill=-1, return_mask=True)
+        self.assertEqual(result[0], calculate_percentage(25, 100))
+        self.assertEqual(result[1], -1)
+        self.assertEqual(result[2], calculate_percentage(7, 3))
+        self.assertEqual([bool(m) for m in mask], [False, True, False])
+
+    def test_exact_batches(self):
+        """Test exact batches match the exact scalar functions."""
+        a = [10, 1, 7, 0.5, 2 ** 60 + 1, 3]
+        b = [4, 3, 0, 0.25, 3, 1]
+        result, mask = divide_batch(a, b, fill=None, return_mask=True,
+                                    exact=True)
+        expected = [None if y == 0 else divide(x, y, exact=True)
+                    for x, y in zip(a, b)]
+        self.assertEqual(result, expected)
+        self.assertEqual([type(r) for r in result],
+                         [type(e) for e in expected])
+        self.assertEqual([bool(m) for m in mask],
+                         [False, False, True, False, False, False])
+        self.assertEqual(
+            calculate_percentage_batch(array.array("d", [1, 2]), 8,
+                                       exact=True),
+            [12.5, 25.0])
+
+    def test_exact_mixed_batches(self):
+        """Test that mixed int/float batches keep each row's scalar type."""
+        rng = random.Random(11)
+
+        def number():
+            value = rng.randint(-500, 500)
+            return value if rng.random() < 0.5 else value / 2
+
+        a = [-214, 0.5] + [number() for _ in range(2000)]
+        b = [2, 1] + [number() for _ in range(2000)]
+        for batch, scalar in ((divide_batch, divide),
+                              (calculate_percentage_batch,
+                               calculate_percentage)):
+            result = batch(a, b, fill=None, exact=True)
+            for x, y, row in zip(a, b, result):
+                expected = None if y == 0 else scalar(x, y, exact=True)
+                self.assertEqual((row, type(row)), (expected, type(expected)),
+                                 (x, y))
+
+    def test_exact_tiny_batches(self):
+        """Test that subnormal batches match the exact scalar function."""
+        rng = random.Random(5)
+        a = [rng.randint(-2 ** 20, 2 ** 20) * 5e-324 for _ in range(500)]
+        a += [math.ldexp(rng.randint(1, 2 ** 30), rng.randint(-1060, -1000))
+              for _ in range(500)]
+        b = [rng.choice([0.5, 2.0, 3.0, 1e-300, 1e-310, 7.0, 0.1])
+             for _ in a]
+        for batch, scalar in ((divide_batch, divide),
+                              (calculate_percentage_batch,
+                               calculate_percentage)):
+            result = batch(a, b, exact=True)
+            for x, y, row in zip(a, b, result):
+                expected = scalar(x, y, exact=True)
+                self.assertEqual((row, type(row)), (expected, type(expected)),
+                                 (x, y))
+
+    def test_exact_float_buffers(self):
+        """Test that float buffers are divided without a Python scan."""
+        CountingArray.iterations = 0
+        a = CountingArray("d", [1.0, 2.0, 0.75])
+        b = memoryview(array.array("d", [4.0, 0.5, 0.25]))
+        self.assertEqual(divide_batch(a, b, exact=True), [0.25, 4.0, 3.0])
+        if self.vectorized:
+            self.assertEqual(CountingArray.iterations, 0)
+
+
+class TestBatchFunctionsPurePython(TestBatchFunctions):
+    """Run the batch tests against the pure-Python fallback."""
+
+    vectorized = False
+
+    def setUp(self):
+        """Hide NumPy from the app module."""
+        patcher = mock.patch("app.np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestPercentOfTotal(unittest.TestCase):
+    """Test cases for bulk percent-of-total calculation."""
+
+    def test_percent_of_total(self):
+        """Test shares match calculate_percentage against the sum."""
+        values = [5, 15, 30, 0.5]
+        shares, total = percent_of_total(iter(values), return_totals=True)
+        self.assertEqual(total, sum(values))
+        for share, value in zip(shares, values):
+            self.assertAlmostEqual(share,
+                                   calculate_percentage(value, total))
+
+    def test_buffer_input(self):
+        """Test that typed buffers are read without conversion."""
+        shares = percent_of_total(array.array("d", [1, 3]))
+        self.assertEqual(list(shares), [25.0, 75.0])
+
+    def test_grouped_totals(self):
+        """Test that grouped shares use each group's own total."""
+        shares, totals = percent_of_total([1, 2, 3, 6], ["a", "b", "a", "b"],
+                                          return_totals=True)
+        self.assertEqual(totals, {"a": 4, "b": 8})
+        self.assertEqual(list(shares), [25.0, 25.0, 75.0, 75.0])
+
+    def test_zero_total(self):
+        """Test zero totals raise, overall or per group."""
+        with self.assertRaises(ValueError) as context:
+            percent_of_total([1, -1])
+        self.assertEqual(str(context.exception), "Total cannot be zero!")
+        with self.assertRaises(ValueError) as context:
+            percent_of_total([2, 1, -1], ["x", "y", "y"])
+        self.assertEqual(str(context.exception),
+                         "Total cannot be zero for group 'y'!")
+
+    def test_length_mismatch(self):
+        """Test that values and keys must line up."""
+        with self.assertRaises(ValueError):
+            percent_of_total([1, 2, 3], ["a", "b"])
+
+
+class TestPercentOfTotalPurePython(TestPercentOfTotal):
+    """Run the percent-of-total tests without NumPy."""
+
+    def setUp(self):
+        """Hide NumPy from the app module."""
+        patcher = mock.patch("app.np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestStreamingReductions(unittest.TestCase):
+    """Test cases for the streaming, numerically stable reducers."""
+
+    def test_stable_sum(self):
+        """Test that many tiny terms are not lost."""
+        values = [1.0] + [1e-16] * 100000
+        self.assertEqual(stable_sum(iter(values)), math.fsum(values))
+        self.assertEqual(stable_sum(array.array("d", values)),
+                         math.fsum(values))
+        self.assertEqual(stable_sum([]), 0.0)
+
+    def test_incremental_sum(self):
+        """Test that add and update can be mixed."""
+        total = CompensatedSum([0.1] * 10)
+        total.add(1e100)
+        total.add(-1e100)
+        total.update(iter([0.1] * 10))
+        self.assertEqual(total.value, 2.0)
+        self.assertEqual(stable_sum([math.inf, 1.0]), math.inf)
+
+    def test_stable_product(self):
+        """Test products whose partial results leave the float range."""
+        self.assertEqual(stable_product([1e200, 1e200, 1e-300]), 1e100)
+        self.assertEqual(stable_product([1e-200, 1e-200, 1e300]), 1e-100)
+        self.assertEqual(stable_product(iter([-2, 3, 0.5])), -3.0)
+        self.assertEqual(stable_product([]), 1.0)
+        self.assertEqual(stable_product([1e308] * 3), math.inf)
+        self.assertEqual(stable_product([5, 0, 1e308]), 0.0)
+
+    def test_log_product(self):
+        """Test the logarithm of a product that does not fit a float."""
+        product = LogProduct([1e300] * 1000)
+        self.assertAlmostEqual(product.log, 1000 * math.log(1e300),
+                               places=6)
+        self.assertEqual(product.sign, 1.0)
+        product.add(-1)
+        self.assertEqual(product.sign, -1.0)
+        self.assertEqual(product.value, -math.inf)
+
+    def test_mean_variance(self):
+        """Test Welford's method on values with a large offset."""
+        values = [1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]
+        self.assertEqual(mean_variance(iter(values)), (1e9 + 10, 22.5))
+        stats = RunningStats(values[:2])
+        for value in values[2:]:
+            stats.add(value)
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.sample_variance, 30.0)
+
+    def test_empty_statistics(self):
+        """Test that statistics of no values raise."""
+        with self.assertRaises(ValueError):
+            RunningStats().mean
+        with self.assertRaises(ValueError):
+            RunningStats([1]).sample_variance
+
+
+class TestStreamingReductionsPurePython(TestStreamingReductions):
+    """Run the reduction tests without NumPy."""
+
+    def setUp(self):
+        """Hide NumPy from the app module."""
+        patcher = mock.patch("app.np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
 
 class TestCalculator(unittest.TestCase):
     """Test cases for Calculator class."""
@@ -79,6 +384,474 @@ class TestCalculator(unittest.TestCase):
         self.calc.clear_history()
         self.assertEqual(len(self.calc.get_history()), 0)
 
+    def test_exact_calculator(self):
+        """Test that an exact calculator uses exact division."""
+        calc = Calculator(exact=True)
+        self.assertEqual(calc.calculate("divide", 1, 10),
+                         decimal.Decimal("0.1"))
+        self.assertEqual(calc.calculate("calculate_percentage", 1, 8), 12.5)
+        self.assertEqual(calc.calculate("add", 1, 2), 3)
+        self.assertEqual(self.calc.calculate("divide", 1, 10), 0.1)
+
+    def test_history_format_preserved(self):
+        """Test that lazily formatted history matches the f-string form."""
+        entries = [("10 / 4", 2.5), ("7 - -3", 10), ("0.1 + 0.2", 0.1 + 0.2),
+                   ("25% of 200", 50.0), ("2 + 3", "five")]
+        for operation, result in entries:
+            self.calc.add_to_history(operation, result)
+        self.assertEqual(self.calc.get_history(),
+                         [f"{op} = {res}" for op, res in entries])
+
+    def test_record(self):
+        """Test structured records skip string handling."""
+        self.calc.record("*", 6, 7, multiply(6, 7))
+        self.calc.record("/", 1, 3, divide(1, 3))
+        self.assertEqual(self.calc.get_history(),
+                         ["6 * 7 = 42", f"1 / 3 = {divide(1, 3)}"])
+        self.assertEqual(list(self.calc.history.records()),
+                         [("*", 6, 7, 42), ("/", 1, 3, divide(1, 3))])
+
+
+class TestExpressionEvaluation(unittest.TestCase):
+    """Test cases for Calculator.evaluate."""
+
+    def setUp(self):
+        """Set up a calculator with a small expression cache."""
+        self.calc = Calculator(expression_cache_size=2)
+
+    def test_evaluate(self):
+        """Test evaluating expressions with the module functions."""
+        self.assertEqual(self.calc.evaluate("5 + 10"), add(5, 10))
+        self.assertEqual(self.calc.evaluate("10 - 4"), subtract(10, 4))
+        self.assertEqual(self.calc.evaluate("(1 + 2) * -3 / 4"), -2.25)
+        self.assertEqual(self.calc.evaluate("1.5 * 2"), 3.0)
+
+    def test_evaluate_divide_by_zero(self):
+        """Test that dividing by zero keeps the scalar error."""
+        with self.assertRaises(ValueError) as context:
+            self.calc.evaluate("1 / 0")
+        self.assertEqual(str(context.exception), "Cannot divide by zero!")
+
+    def test_evaluate_rejects_unsupported(self):
+        """Test that anything beyond arithmetic is rejected."""
+        for expr in ("2 ** 3", "abs(3)", "1 +", "5 # 3", "__import__(1)"):
+            with self.assertRaises(ValueError):
+                self.calc.evaluate(expr)
+
+    def test_template_cache(self):
+        """Test that templates are compiled once and the cache is bounded."""
+        self.calc.evaluate("5 + 10")
+        self.calc.evaluate("7 + 3")
+        info = self.calc.expression_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        self.calc.evaluate("2 * 3")
+        self.calc.evaluate("2 - 3")
+        self.assertEqual(self.calc.expression_cache_info().currsize, 2)
+
+
+class TestCalculatorMemoization(unittest.TestCase):
+    """Test cases for opt-in memoization on Calculator."""
+
+    def setUp(self):
+        """Set up a calculator with memoization enabled."""
+        self.calc = Calculator()
+        self.calc.enable_memoization(policy="lfu", maxsize=16)
+
+    def test_calculate(self):
+        """Test that calculate dispatches to the module functions."""
+        self.assertEqual(self.calc.calculate("divide", 10, 4), divide(10, 4))
+        self.assertEqual(self.calc.calculate("divide", 10, 4), divide(10, 4))
+        self.assertEqual(
+            self.calc.calculate("calculate_percentage", 25, 100), 25.0)
+        stats = self.calc.memo_stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 2))
+
+    def test_calculate_unknown_operation(self):
+        """Test that unknown operation names are rejected."""
+        with self.assertRaises(ValueError):
+            self.calc.calculate("modulo", 1, 2)
+
+    def test_negative_results(self):
+        """Test that repeated divide-by-zero fails from the cache."""
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.calc.calculate("divide", 1, 0)
+        self.assertEqual(self.calc.memo_stats().hits, 1)
+
+    def test_evaluate_memoized(self):
+        """Test that evaluate results are memoized too."""
+        self.calc.evaluate("5 + 10")
+        self.assertEqual(self.calc.evaluate("5 + 10"), 15)
+        self.assertEqual(self.calc.memo_stats().hits, 1)
+
+    def test_disable(self):
+        """Test that memoization can be switched off again."""
+        self.calc.disable_memoization()
+        self.assertIsNone(self.calc.memo_stats())
+        self.assertEqual(self.calc.calculate("add", 1, 2), 3)
+
+
+class TestOperationStream(unittest.TestCase):
+    """Test cases for the streaming operation evaluator."""
+
+    def run_stream(self, text, fmt):
+        """Evaluate a stream and return (output, errors)."""
+        errors = []
+        out = io.StringIO()
+        rows = read_operations(io.StringIO(text), fmt)
+        write_results(evaluate_operations(
+            rows, lambda *error: errors.append(error)), out, fmt)
+        return out.getvalue(), errors
+
+    def test_csv_stream(self):
+        """Test that CSV rows are evaluated and bad rows side-channelled."""
+        output, errors = self.run_stream(
+            "op,a,b\nadd,1,2\ndivide,1,0\n/,9,2\nmodulo,1,2\n", "csv")
+        self.assertEqual(output, "op,a,b,result\nadd,1,2,3\n/,9,2,4.5\n")
+        self.assertEqual(errors, [
+            (3, "divide", 1, 0, "Cannot divide by zero!"),
+            (5, "modulo", "1", "2", "Unknown operation: modulo"),
+        ])
+
+    def test_jsonl_stream(self):
+        """Test that JSONL rows are evaluated and bad rows side-channelled."""
+        output, errors = self.run_stream(
+            '{"op": "calculate_percentage", "a": 1, "b": 4}\n'
+            '{"op": "calculate_percentage", "a": 1, "b": 0}\n'
+            'not json\n', "jsonl")
+        self.assertEqual(json.loads(output)["result"], 25.0)
+        self.assertEqual([error[0] for error in errors], [2, 3])
+        self.assertEqual(errors[0][-1], "Total cannot be zero!")
+
+    def test_overflow_is_side_channelled(self):
+        """Test that an overflowing row does not stop the stream."""
+        huge = "1" + "0" * 400
+        output, errors = self.run_stream(
+            f"divide,{huge},3\nadd,1,2\n", "csv")
+        self.assertEqual(output, "op,a,b,result\nadd,1,2,3\n")
+        self.assertEqual(errors, [
+            (1, "divide", int(huge), 3,
+             "integer division result too large for a float"),
+        ])
+
+    def test_jsonl_non_finite_results(self):
+        """Test that JSONL output stays valid JSON for inf and nan."""
+        output, errors = self.run_stream(
+            '{"op": "multiply", "a": 1e308, "b": 10}\n'
+            '{"op": "subtract", "a": "inf", "b": "inf"}\n', "jsonl")
+        rows = [json.loads(line, parse_constant=self.fail)
+                for line in output.splitlines()]
+        self.assertEqual([(row["a"], row["result"]) for row in rows],
+                         [(1e308, "inf"), ("inf", "nan")])
+        self.assertEqual(errors, [])
+
+    def test_stream_is_lazy(self):
+        """Test that rows are consumed one at a time."""
+        def lines():
+            yield "add,1,1\n"
+            raise AssertionError("read past the first row")
+
+        results = evaluate_operations(read_operations(lines()), print)
+        self.assertEqual(next(results), ("add", 1, 1, 2))
+
+    def test_main_files(self):
+        """Test the command-line entry point with files."""
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "ops.jsonl")
+            output = os.path.join(tmp, "out.csv")
+            errors = os.path.join(tmp, "errors.jsonl")
+            with open(source, "w") as f:
+                f.write('{"op": "*", "a": 3, "b": 7}\n'
+                        '{"op": "/", "a": 1, "b": 0}\n')
+            self.assertEqual(main([source, "-o", output, "-e", errors,
+                                   "--output-format", "csv"]), 0)
+            with open(output) as f:
+                self.assertEqual(f.read(), "op,a,b,result\n*,3,7,21\n")
+            with open(errors) as f:
+                self.assertEqual(json.loads(f.read())["line"], 2)
+
+
+class TestHistoryQueries(unittest.TestCase):
+    """Test cases for indexed history queries."""
+
+    def setUp(self):
+        """Set up an indexed calculator with a controllable clock."""
+        self.now = 0.0
+        self.calc = Calculator(history_capacity=50)
+        self.calc.enable_history_index(clock=lambda: self.now)
+        self.expected = []
+        for i in range(80):
+            self.now = float(i)
+            a, b = i, i % 7 + 1
+            op = "+-*/"[i % 4]
+            result = {"+": add, "-": subtract, "*": multiply,
+                      "/": divide}[op](a, b)
+            self.calc.record(op, a, b, result)
+            self.expected.append((op, a, b, result, self.now))
+        self.live = self.expected[-50:]
+
+    def test_query_by_operation(self):
+        """Test filtering by operator symbol or operation name."""
+        divisions = [r for r in self.live if r[0] == "/"]
+        self.assertEqual(self.calc.query_history(op="/"), divisions)
+        self.assertEqual(self.calc.query_history(op="divide"), divisions)
+
+    def test_query_combined(self):
+        """Test divisions above a result within a time window."""
+        self.assertEqual(
+            self.calc.query_history(op="divide", min_result=10, since=60),
+            [r for r in self.live
+             if r[0] == "/" and r[3] >= 10 and r[4] >= 60])
+
+    def test_query_result_range(self):
+        """Test bisect-based result range queries."""
+        self.assertEqual(
+            self.calc.query_history(min_result=50, max_result=100),
+            [r for r in self.live if 50 <= r[3] <= 100])
+
+    def test_query_time_range(self):
+        """Test timestamp range queries."""
+        self.assertEqual(self.calc.query_history(since=40, until=45),
+                         self.expected[40:46])
+
+    def test_index_follows_history(self):
+        """Test that indexing existing records and clearing both work."""
+        calc = Calculator()
+        calc.add_to_history("10 / 2", 5.0)
+        calc.add_to_history("25% of 200", 50.0)
+        calc.enable_history_index(clock=lambda: 1.0)
+        calc.add_to_history("9 / 3", 3.0)
+        self.assertEqual(calc.query_history(op="/", max_result=4),
+                         [("/", 9, 3, 3.0, 1.0)])
+        self.assertEqual(len(calc.query_history()), 3)
+        calc.clear_history()
+        self.assertEqual(calc.query_history(), [])
+
+    def test_merge_and_purge(self):
+        """Test queries stay exact while runs merge and old records drop."""
+        store = HistoryStore(capacity=30)
+        index = HistoryIndex(store, clock=lambda: 0.0, merge_threshold=4)
+        expected = []
+        for i in range(200):
+            result = (i * 37) % 101
+            index.add(store.record("+", i, 0, result), result)
+            expected.append(("+", i, 0, result, 0.0))
+        live = expected[-30:]
+        self.assertEqual(index.query(min_result=20, max_result=60),
+                         [r for r in live if 20 <= r[3] <= 60])
+        self.assertEqual(index.query(op="add"), live)
+        self.assertLess(len(index._result_values), 60)
+
+    def test_query_requires_index(self):
+        """Test that querying without an index is rejected."""
+        with self.assertRaises(ValueError):
+            Calculator().query_history(op="+")
+        with self.assertRaises(ValueError):
+            self.calc.query_history(op="modulo")
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Test cases for the compact history store."""
+
+    def test_ring_buffer(self):
+        """Test that a bounded store keeps only the newest records."""
+        store = HistoryStore(capacity=3)
+        for i in range(5):
+            store.append(f"{i} + 1", i + 1)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store), ["2 + 1 = 3", "3 + 1 = 4", "4 + 1 = 5"])
+        self.assertEqual(store[-1], "4 + 1 = 5")
+
+    def test_ring_buffer_drops_raw_records(self):
+        """Test that evicted free-form records are released."""
+        store = HistoryStore(capacity=1)
+        store.append("sqrt 4", 2)
+        store.append("1 + 1", 2)
+        self.assertEqual(list(store), ["1 + 1 = 2"])
+        self.assertEqual(store._raw, {})
+
+    def test_invalid_capacity(self):
+        """Test that a non-positive capacity is rejected."""
+        with self.assertRaises(ValueError):
+            HistoryStore(capacity=0)
+
+    def test_from_columns(self):
+        """Test rebuilding a store from its columns."""
+        store = HistoryStore(capacity=4)
+        for i in range(6):
+            store.append(f"{i} * 2", i * 2)
+        store.append("sqrt 9", 3)
+        columns, raw = store.columns()
+        self.assertEqual(list(HistoryStore.from_columns(columns, raw)),
+                         list(store))
+        self.assertEqual(list(HistoryStore.from_columns(columns, raw, 2)),
+                         ["5 * 2 = 10", "sqrt 9 = 3"])
+
+    def test_memory_usage(self):
+        """Test that the memory estimate grows with the records."""
+        store = HistoryStore()
+        empty = store.memory_usage()
+        for i in range(1000):
+            store.record("+", i, 1, i + 1)
+        self.assertGreater(store.memory_usage(), empty + 1000 * 26)
+
+
+class TestConcurrentCalculator(unittest.TestCase):
+    """Test cases for the thread-safe calculator."""
+
+    def run_threads(self, calc, threads=4, per_thread=500):
+        barrier = threading.Barrier(threads)
+
+        def work(worker):
+            barrier.wait()
+            for i in range(per_thread):
+                calc.record("+", worker, i, worker + i)
+
+        pool = [threading.Thread(target=work, args=(n,))
+                for n in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+    def test_history_from_many_threads(self):
+        """Test that every thread's records are kept in thread order."""
+        calc = ConcurrentCalculator()
+        self.run_threads(calc)
+        history = calc.get_history()
+        self.assertEqual(len(history), 2000)
+        for worker in range(4):
+            mine = [h for h in history if h.startswith(f"{worker} + ")]
+            self.assertEqual(mine, [f"{worker} + {i} = {worker + i}"
+                                    for i in range(500)])
+
+    def test_recording_order(self):
+        """Test that history follows the order records were added."""
+        calc = ConcurrentCalculator()
+        calc.add_to_history("1 + 1", 2)
+        thread = threading.Thread(target=calc.add_to_history,
+                                  args=("sqrt 4", 2))
+        thread.start()
+        thread.join()
+        calc.record("*", 2, 3, 6)
+        self.assertEqual(calc.get_history(),
+                         ["1 + 1 = 2", "sqrt 4 = 2", "2 * 3 = 6"])
+
+    def test_clear_history_while_recording(self):
+        """Test that clearing during appends leaves a valid history."""
+        calc = ConcurrentCalculator()
+        done = threading.Event()
+
+        def clear():
+            while not done.is_set():
+                calc.clear_history()
+
+        clearer = threading.Thread(target=clear)
+        clearer.start()
+        try:
+            self.run_threads(calc, threads=2)
+        finally:
+            done.set()
+            clearer.join()
+        for entry in calc.get_history():
+            self.assertRegex(entry, r"^\d \+ \d+ = \d+$")
+        calc.clear_history()
+        self.assertEqual(calc.get_history(), [])
+
+    def test_history_capacity(self):
+        """Test that only the newest records are returned."""
+        calc = ConcurrentCalculator(history_capacity=3)
+        for i in range(5):
+            calc.add_to_history(f"{i} + 1", i + 1)
+        self.assertEqual(calc.get_history(),
+                         ["2 + 1 = 3", "3 + 1 = 4", "4 + 1 = 5"])
+
+    def test_memoization_and_index(self):
+        """Test memoization support and the unsupported history index."""
+        calc = ConcurrentCalculator()
+        calc.enable_memoization(maxsize=4)
+        self.assertEqual(calc.calculate("add", 1, 2), 3)
+        self.assertEqual(calc.calculate("add", 1, 2), 3)
+        self.assertEqual(calc.memo_stats().hits, 1)
+        with self.assertRaises(ValueError):
+            calc.enable_history_index()
+
+
+class TestHistoryArchive(unittest.TestCase):
+    """Test cases for columnar history export and loading."""
+
+    def setUp(self):
+        """Create a scratch archive path."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "history.cols")
+
+    def load(self):
+        """Load the scratch archive, closing it after the test."""
+        archive = load_history(self.path)
+        self.addCleanup(archive.close)
+        return archive
+
+    def test_round_trip(self):
+        """Test that an archive reads back the exported history."""
+        calc = Calculator(history_capacity=4)
+        for i in range(6):
+            calc.record("/", i, 4, i / 4)
+        calc.add_to_history("sqrt 16", 4)
+        calc.export_history(self.path)
+        archive = self.load()
+        self.assertEqual(list(archive), calc.get_history())
+        self.assertEqual(archive[0], "3 / 4 = 0.75")
+        self.assertEqual(list(archive.records())[-1],
+                         (None, "sqrt 16", None, "4"))
+        self.assertEqual(archive.dictionary, ("+", "-", "*", "/"))
+
+    def test_zero_copy_columns(self):
+        """Test that columns are views into the mapped file."""
+        calc = Calculator()
+        calc.record("+", 1, 2, 3)
+        calc.record("*", 2, 0.5, 1.0)
+        calc.export_history(self.path)
+        archive = self.load()
+        lhs = archive.columns()[0]["lhs"]
+        self.assertIsInstance(lhs, memoryview)
+        self.assertEqual(lhs.tolist(), [1.0, 2.0])
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_view(self):
+        """Test that the columns are readable as NumPy arrays."""
+        calc = Calculator()
+        for i in range(3):
+            calc.record("-", i, 1, i - 1)
+        calc.export_history(self.path)
+        arrays = self.load().to_numpy()
+        self.assertEqual(arrays["result"].tolist(), [-1.0, 0.0, 1.0])
+        self.assertEqual(arrays["op"].tolist(), [1, 1, 1])
+        self.assertFalse(arrays["lhs"].flags.writeable)
+
+    def test_read_only(self):
+        """Test that a calculator over an archive cannot change it."""
+        Calculator().export_history(self.path)
+        calc = Calculator(history=self.load())
+        self.assertEqual(calc.get_history(), [])
+        with self.assertRaises(ValueError):
+            calc.add_to_history("1 + 1", 2)
+
+    def test_concurrent_export(self):
+        """Test exporting the merged history of a concurrent calculator."""
+        calc = ConcurrentCalculator()
+        calc.record("+", 1, 2, 3)
+        calc.add_to_history("foo", 1)
+        calc.export_history(self.path)
+        self.assertEqual(list(self.load()), ["1 + 2 = 3", "foo = 1"])
+
+    def test_rejects_foreign_files(self):
+        """Test that files that are not archives are rejected."""
+        with open(self.path, "wb") as f:
+            f.write(b"definitely not a columnar history archive")
+        with self.assertRaises(ValueError):
+            load_history(self.path)
+
 
 if __name__ == "__main__":
     unittest.main()
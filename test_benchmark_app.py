@@ -0,0 +1,65 @@
+import unittest
+from benchmark_app import (compare, mann_whitney_p, metadata_differences,
+                           summarize)
+
+
+def results(**medians):
+    """Build a results document with a few samples around each median."""
+    return {
+        "metadata": {"python": "3.11", "machine": "x86_64"},
+        "benchmarks": {
+            name: summarize([m * 0.98, m * 0.99, m, m * 1.01, m * 1.02],
+                            "ns/call")
+            for name, m in medians.items()
+        },
+    }
+
+
+class TestMannWhitney(unittest.TestCase):
+    """Test cases for the slowdown significance test."""
+
+    def test_clear_slowdown(self):
+        """Test that fully separated samples are significant."""
+        self.assertLess(mann_whitney_p([1, 2, 3, 4, 5], [6, 7, 8, 9, 10]),
+                        0.01)
+
+    def test_speedup_is_not_a_slowdown(self):
+        """Test that the test is one-sided."""
+        self.assertGreater(mann_whitney_p([6, 7, 8, 9, 10], [1, 2, 3, 4, 5]),
+                           0.99)
+
+    def test_identical_samples(self):
+        """Test that ties everywhere are not significant."""
+        self.assertEqual(mann_whitney_p([5, 5, 5], [5, 5, 5]), 1.0)
+        self.assertEqual(mann_whitney_p([], [1]), 1.0)
+
+
+class TestCompare(unittest.TestCase):
+    """Test cases for comparing results against a baseline."""
+
+    def test_flags_significant_slowdown(self):
+        """Test that only the slowed-down benchmark regresses."""
+        rows = compare(results(add=100, divide=100),
+                       results(add=100, divide=150))
+        regressed = {row[0]: row[5] for row in rows}
+        self.assertEqual(regressed, {"add": False, "divide": True})
+
+    def test_threshold(self):
+        """Test that small slowdowns are tolerated."""
+        rows = compare(results(add=100), results(add=105), threshold=0.10)
+        self.assertFalse(rows[0][5])
+
+    def test_missing_benchmarks_are_skipped(self):
+        """Test that benchmarks missing from the new run are ignored."""
+        self.assertEqual(compare(results(add=100), results(divide=1)), [])
+
+    def test_metadata_differences(self):
+        """Test that a different interpreter is reported."""
+        current = results()
+        current["metadata"]["python"] = "3.12"
+        self.assertEqual(metadata_differences(results(), current),
+                         ["python: 3.11 -> 3.12"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import unittest
+from app import add, divide, calculate_percentage, multiply
+from calc_server import CalculatorService, evaluate_group, serve
+
+
+class TestEvaluateGroup(unittest.TestCase):
+    """Test cases for micro-batch evaluation."""
+
+    def test_matches_scalar_functions(self):
+        """Test that batched results equal the scalar results."""
+        rows = [(1, 2), (2 ** 60, 3), (0.1, 0.2), (7, 3)]
+        self.assertEqual(evaluate_group("add", rows),
+                         [add(a, b) for a, b in rows])
+        self.assertEqual(evaluate_group("multiply", rows),
+                         [multiply(a, b) for a, b in rows])
+        self.assertEqual(evaluate_group("divide", rows),
+                         [divide(a, b) for a, b in rows])
+
+    def test_int_results_stay_ints(self):
+        """Test that integer arithmetic keeps integer results."""
+        self.assertIs(type(evaluate_group("add", [(1, 2)])[0]), int)
+
+    def test_zero_divisor_errors(self):
+        """Test that zero divisors become per-row errors."""
+        results = evaluate_group("calculate_percentage", [(1, 4), (1, 0)])
+        self.assertEqual(results[0], calculate_percentage(1, 4))
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(str(results[1]), "Total cannot be zero!")
+
+
+class TestCalculatorService(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the asyncio calculator service."""
+
+    async def asyncSetUp(self):
+        """Start a service on an ephemeral port."""
+        self.service = CalculatorService(max_inflight=4, queue_size=8)
+        self.server = await serve(self.service, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection(
+            "127.0.0.1", port)
+
+    async def asyncTearDown(self):
+        """Close the connection and stop the service."""
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.server.close()
+        await self.server.wait_closed()
+        await self.service.stop()
+
+    async def request_all(self, requests):
+        """Pipeline every request, then read the responses."""
+        for request in requests:
+            self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        # Bounded, so a stalled service fails the test instead of hanging
+        return [json.loads(await asyncio.wait_for(self.reader.readline(), 5),
+                           parse_constant=self.fail)
+                for _ in requests]
+
+    async def test_pipelined_requests_in_order(self):
+        """Test that pipelined responses come back in request order."""
+        requests = [{"id": i, "op": "divide", "a": i, "b": i % 3}
+                    for i in range(50)]
+        responses = await self.request_all(requests)
+        self.assertEqual([r["id"] for r in responses], list(range(50)))
+        for i, response in enumerate(responses):
+            if i % 3:
+                self.assertEqual(response["result"], divide(i, i % 3))
+            else:
+                self.assertEqual(response["error"], "Cannot divide by zero!")
+
+    async def test_history_and_evaluate(self):
+        """Test recording, evaluating and reading history."""
+        responses = await self.request_all([
+            {"id": 1, "op": "add", "a": 5, "b": 10, "record": True},
+            {"id": 2, "op": "evaluate", "expr": "2 * 3", "record": True},
+            {"id": 3, "op": "history"},
+            {"id": 4, "op": "clear_history"},
+            {"id": 5, "op": "history"},
+        ])
+        self.assertEqual(responses[1]["result"], 6)
+        self.assertEqual(responses[2]["result"], ["5 + 10 = 15", "2 * 3 = 6"])
+        self.assertEqual(responses[4]["result"], [])
+
+    async def test_invalid_requests(self):
+        """Test that invalid requests get error responses."""
+        self.writer.write(b"not json\n")
+        responses = await self.request_all([
+            {"id": 1, "op": "modulo", "a": 1, "b": 2},
+            {"id": 2, "op": "add", "a": "1", "b": 2},
+        ])
+        responses.append(json.loads(await self.reader.readline()))
+        self.assertIn("Invalid request", responses[0]["error"])
+        self.assertEqual(responses[1]["error"], "Unknown operation: modulo")
+        self.assertEqual(responses[2]["error"], "Operands must be numbers")
+
+    async def test_overflow_errors_keep_serving(self):
+        """Test that an overflowing request does not stall later ones."""
+        huge = 10 ** 400
+        responses = await self.request_all([
+            {"id": 1, "op": "divide", "a": huge, "b": 3},
+            {"id": 2, "op": "evaluate", "expr": f"{huge} / 3"},
+            {"id": 3, "op": "multiply", "a": 1e308, "b": 10},
+            {"id": 4, "op": "evaluate", "expr": "1e308 * 10"},
+            {"id": 5, "op": "subtract", "a": 1e308 * 10, "b": 1e308 * 10},
+        ])
+        responses += await self.request_all([
+            {"id": 6, "op": "add", "a": 1, "b": 2},
+        ])
+        self.assertEqual(responses[0]["error"],
+                         "integer division result too large for a float")
+        self.assertEqual(responses[1]["error"], responses[0]["error"])
+        self.assertEqual([r["result"] for r in responses[2:5]],
+                         ["inf", "inf", "nan"])
+        self.assertEqual(responses[5], {"id": 6, "result": 3})
+
+    async def test_failed_batch_keeps_serving(self):
+        """Test that an unexpected error fails only its own batch."""
+        process = self.service._process
+        calls = []
+
+        def fail_once(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("batch failed")
+            process(batch)
+
+        self.service._process = fail_once
+        first = await self.request_all([{"id": 1, "op": "add", "a": 1,
+                                         "b": 2}])
+        second = await self.request_all([{"id": 2, "op": "add", "a": 1,
+                                          "b": 2}])
+        self.assertEqual(first, [{"id": 1, "error": "batch failed"}])
+        self.assertEqual(second, [{"id": 2, "result": 3}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import math
+import unittest
+from unittest import mock
+from app import (add, calculate_percentage, divide, divide_batch, multiply,
+                 subtract)
+from column_eval import compile_columns, evaluate_columns
+
+
+def scalar_rows(func, *columns):
+    """Compose the scalar functions row by row, NaN on zero divisors."""
+    results = []
+    for row in zip(*columns):
+        try:
+            results.append(func(*row))
+        except ValueError:
+            results.append(math.nan)
+    return results
+
+
+class TestColumnEval(unittest.TestCase):
+    """Test cases for vectorized formula evaluation over columns."""
+
+    a = [3.0, -0.0, 1.5, 7.25, 0.0, -4.0, 2.0, 9.5, 1e-3, 6.0]
+    b = [2.0, 5.0, -1.0, 0.5, 3.0, 8.0, 0.0, 2.5, 4.0, -3.0]
+    c = [4.0, 0.0, 3.0, -2.0, 1.0, 0.0, 5.0, 7.0, 2.0, 0.25]
+
+    def assertRowsEqual(self, result, expected):
+        """Compare results, treating NaN as equal to NaN."""
+        result = list(result)
+        self.assertEqual(len(result), len(expected))
+        for value, want in zip(result, expected):
+            if math.isnan(want):
+                self.assertTrue(math.isnan(value))
+            else:
+                self.assertEqual(value, want)
+
+    def evaluate(self, formula, **options):
+        """Evaluate a formula over the test columns."""
+        return evaluate_columns(formula, {"a": self.a, "b": self.b,
+                                          "c": self.c}, **options)
+
+    def test_matches_scalar_functions(self):
+        """Test that every block size matches scalar composition."""
+        cases = {
+            "a * b / c": lambda x, y, z: divide(multiply(x, y), z),
+            "percent(a, c) - b": lambda x, y, z: subtract(
+                calculate_percentage(x, z), y),
+            "-(a + b) / (c - 5) * 2": lambda x, y, z: multiply(
+                divide(-add(x, y), subtract(z, 5)), 2),
+            "b / a / c": lambda x, y, z: divide(divide(y, x), z),
+        }
+        for formula, func in cases.items():
+            expected = scalar_rows(func, self.a, self.b, self.c)
+            for block_size in (1, 3, 4096):
+                with self.subTest(formula=formula, block_size=block_size):
+                    self.assertRowsEqual(
+                        self.evaluate(formula, block_size=block_size),
+                        expected)
+
+    def test_zero_divisor_mask(self):
+        """Test the batch fill/mask policy for zero divisors."""
+        result, mask = self.evaluate("a / c", fill=-1, return_mask=True)
+        expected, expected_mask = divide_batch(self.a, self.c, fill=-1,
+                                               return_mask=True)
+        self.assertEqual(list(result), list(expected))
+        self.assertEqual([bool(m) for m in mask],
+                         [bool(m) for m in expected_mask])
+
+    def test_scalar_bindings_and_constants(self):
+        """Test that scalar columns and literals broadcast."""
+        self.assertRowsEqual(
+            evaluate_columns("percent(x, total)", {"x": self.a, "total": 8}),
+            [calculate_percentage(x, 8) for x in self.a])
+        self.assertRowsEqual(evaluate_columns("x / 0", {"x": [1, 2]}),
+                             [math.nan, math.nan])
+        self.assertRowsEqual(evaluate_columns("2 * 3", {}), [6.0])
+
+    def test_common_subexpressions_share_registers(self):
+        """Test that repeated subexpressions are computed once."""
+        expr = compile_columns("a * b / c + a * b")
+        self.assertEqual(len(expr._steps), 3)
+        self.assertEqual(expr._register_count, 2)
+        self.assertEqual(expr.columns, ("a", "b", "c"))
+
+    def test_errors(self):
+        """Test invalid formulas and inputs."""
+        for formula in ("a ** 2", "abs(a)", "a +", "percent(a)"):
+            with self.subTest(formula=formula):
+                with self.assertRaises(ValueError):
+                    compile_columns(formula)
+        with self.assertRaises(ValueError):
+            evaluate_columns("a + d", {"a": [1]})
+        with self.assertRaises(ValueError):
+            evaluate_columns("a + b", {"a": [1, 2], "b": [1]})
+
+    def test_repeated_subexpression(self):
+        """Test that a step used twice keeps its own scratch register."""
+        self.assertRowsEqual(
+            evaluate_columns("(a + b) * (a + b) + c * 2",
+                             {"a": self.a, "b": self.b, "c": self.c}),
+            scalar_rows(lambda a, b, c: add(multiply(add(a, b), add(a, b)),
+                                            multiply(c, 2)),
+                        self.a, self.b, self.c))
+        self.assertRowsEqual(
+            evaluate_columns("(a + b) * (a + b) + c * 2",
+                             {"a": [1, 2], "b": [1, 1], "c": [10, 10]}),
+            [24, 29])
+
+    def test_non_finite_constants(self):
+        """Test constants that overflow to infinity."""
+        self.assertRowsEqual(evaluate_columns("a * 1e400", {"a": self.a}),
+                             [a * math.inf for a in self.a])
+        self.assertRowsEqual(evaluate_columns("b - 1e400 + 2", {"b": self.b}),
+                             [-math.inf] * len(self.b))
+
+
+class TestColumnEvalPurePython(TestColumnEval):
+    """Run the column evaluation tests without NumPy."""
+
+    def setUp(self):
+        """Hide NumPy from the column_eval module."""
+        patcher = mock.patch("column_eval.np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+if __name__ == "__main__":
+    unittest.main()
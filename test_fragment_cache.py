@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from fragment_cache import INDEX_MARK, FragmentCache, record_key
+
+
+def render_row(i, test):
+    """Render a row the way the report generators do."""
+    return f'<tr id="row-{i}"><td>{test.get("nodeid")}</td></tr>\n'
+
+
+def render_row_v2(i, test):
+    """Render a row with a changed template."""
+    return f'<li id="row-{i}">{test.get("nodeid")}</li>\n'
+
+
+def sample_tests(count, outcome="passed"):
+    """Build test records with distinct node ids."""
+    return [{"nodeid": f"test_app.py::test_{i}", "outcome": outcome,
+             "duration": 0.001 * i} for i in range(count)]
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test cases for the cross-build test row cache."""
+
+    def setUp(self):
+        """Keep the pack file in a scratch directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache", "rows.pack")
+
+    def build(self, tests, render=render_row):
+        """Render every row through the cache; return rows and cache."""
+        with FragmentCache(self.path, render) as cache:
+            rows = [cache.render(i, test) for i, test in enumerate(tests)]
+        return rows, cache
+
+    def test_second_build_reuses_rows(self):
+        """Test that an unchanged build renders nothing."""
+        tests = sample_tests(50)
+        first, cache = self.build(tests)
+        self.assertEqual((cache.hits, cache.misses), (0, 50))
+        second, cache = self.build(tests)
+        self.assertEqual((cache.hits, cache.misses), (50, 0))
+        self.assertEqual(second, first)
+        self.assertEqual(first, [render_row(i, test)
+                                 for i, test in enumerate(tests)])
+
+    def test_changed_rows_are_rendered(self):
+        """Test that only changed or moved records miss the cache."""
+        tests = sample_tests(10)
+        self.build(tests)
+        tests[3]["outcome"] = "failed"
+        tests[3]["call"] = {"longrepr": "AssertionError"}
+        tests.insert(0, {"nodeid": "test_app.py::test_new"})
+        rows, cache = self.build(tests)
+        self.assertEqual((cache.hits, cache.misses), (9, 2))
+        self.assertEqual(rows, [render_row(i, test)
+                                for i, test in enumerate(tests)])
+
+    def test_removed_tests_are_dropped(self):
+        """Test that each build only keeps the rows it used."""
+        self.build(sample_tests(100))
+        large = os.path.getsize(self.path)
+        self.build(sample_tests(10))
+        self.assertLess(os.path.getsize(self.path), large / 5)
+
+    def test_template_change_invalidates(self):
+        """Test that a changed renderer does not reuse old rows."""
+        tests = sample_tests(5)
+        self.build(tests)
+        rows, cache = self.build(tests, render_row_v2)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(rows[0], render_row_v2(0, tests[0]))
+
+    def test_corrupt_pack_is_ignored(self):
+        """Test that an unreadable pack is treated as empty."""
+        tests = sample_tests(5)
+        self.build(tests)
+        with open(self.path, "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\xff\xff\xff\xff")
+        rows, cache = self.build(tests)
+        self.assertEqual(cache.misses, 5)
+
+    def test_failed_build_keeps_previous_pack(self):
+        """Test that an error leaves the last pack in place."""
+        tests = sample_tests(5)
+        self.build(tests)
+        with self.assertRaises(RuntimeError):
+            with FragmentCache(self.path, render_row) as cache:
+                cache.render(0, {"nodeid": "other"})
+                raise RuntimeError("render failed")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                         ["rows.pack"])
+        _, cache = self.build(tests)
+        self.assertEqual(cache.hits, 5)
+
+    def test_record_key_covers_shown_fields(self):
+        """Test which record changes change the key."""
+        test = {"nodeid": "t", "outcome": "passed", "duration": 0.0101}
+        key = record_key(test)
+        self.assertEqual(record_key(dict(test, duration=0.0104)), key)
+        self.assertNotEqual(record_key(dict(test, duration=0.011)), key)
+        self.assertNotEqual(record_key(dict(test, file="a.py")), key)
+        self.assertEqual(record_key(dict(test, call={"longrepr": "E"})), key)
+        failed = dict(test, outcome="failed", call={"longrepr": "E"})
+        self.assertNotEqual(record_key(dict(failed, call={"longrepr": "F"})),
+                            record_key(failed))
+        self.assertIsNone(record_key({"nodeid": f"bad{INDEX_MARK}"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
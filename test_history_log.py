@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from app import Calculator, load_history
+from history_log import HEADER, RECORD, HistoryLog
+
+
+class TestHistoryLog(unittest.TestCase):
+    """Test cases for the persistent history log."""
+
+    def setUp(self):
+        """Create a scratch directory for log files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "history.log")
+
+    def open_log(self, **options):
+        """Open the scratch log, closing it after the test."""
+        log = HistoryLog(self.path, **options)
+        self.addCleanup(log.close)
+        return log
+
+    def test_history_survives_reopen(self):
+        """Test that history is readable after reopening the log."""
+        calc = Calculator(history=HistoryLog(self.path))
+        calc.add_to_history("5 + 10", 15)
+        calc.record("/", 1, 4, 0.25)
+        calc.add_to_history("25% of 200", 50.0)
+        calc.history.close()
+        calc = Calculator(history=self.open_log())
+        self.assertEqual(calc.get_history(),
+                         ["5 + 10 = 15", "1 / 4 = 0.25", "25% of 200 = 50.0"])
+        self.assertEqual(next(calc.history.records()), ("+", 5, 10, 15))
+
+    def test_fixed_size_records(self):
+        """Test that each append adds exactly one fixed-size record."""
+        log = self.open_log()
+        for i in range(10):
+            log.append(f"{i} * 2", i * 2)
+        self.assertEqual(os.path.getsize(self.path),
+                         HEADER.size + 10 * RECORD.size)
+
+    def test_torn_tail_is_dropped(self):
+        """Test recovery from partial and corrupt trailing records."""
+        log = HistoryLog(self.path)
+        log.append("1 + 1", 2)
+        log.append("2 + 2", 4)
+        log.close()
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\xff")
+            f.seek(0, os.SEEK_END)
+            f.write(b"\x00" * (RECORD.size // 2))
+        log = self.open_log()
+        self.assertEqual(list(log), ["1 + 1 = 2"])
+        log.append("3 + 3", 6)
+        self.assertEqual(list(log), ["1 + 1 = 2", "3 + 3 = 6"])
+
+    def test_clear_persists(self):
+        """Test that clearing survives a reopen."""
+        log = HistoryLog(self.path)
+        log.append("1 + 1", 2)
+        log.clear()
+        log.append("2 + 2", 4)
+        log.close()
+        self.assertEqual(list(self.open_log()), ["2 + 2 = 4"])
+
+    def test_compaction(self):
+        """Test that compaction drops dead records and keeps live ones."""
+        log = self.open_log(compact_threshold=5)
+        for i in range(8):
+            log.append(f"{i} + 0", i)
+        log.append("note", "kept")
+        log.clear()
+        log.append("x y", "z")
+        self.assertEqual(os.path.getsize(self.path),
+                         HEADER.size + RECORD.size)
+        self.assertEqual(list(log), ["x y = z"])
+        files = sorted(os.listdir(self.tmp.name))
+        self.assertEqual(files, ["history.log", "history.log.raw.1"])
+
+    def test_capacity(self):
+        """Test that a bounded log shows only the newest records."""
+        log = self.open_log(capacity=2)
+        for i in range(4):
+            log.append(f"{i} - 1", i - 1)
+        self.assertEqual(list(log), ["2 - 1 = 1", "3 - 1 = 2"])
+
+    def test_rejects_foreign_files(self):
+        """Test that files without the log header are rejected."""
+        with open(self.path, "wb") as f:
+            f.write(b"not a history log at all, clearly")
+        with self.assertRaises(ValueError):
+            HistoryLog(self.path)
+
+    def test_export_columns(self):
+        """Test that a log exports the same history it shows."""
+        log = self.open_log(capacity=3)
+        calc = Calculator(history=log)
+        for i in range(5):
+            calc.record("*", i, 2.5, i * 2.5)
+        calc.add_to_history("25% of 200", 50.0)
+        archive_path = os.path.join(self.tmp.name, "history.cols")
+        calc.export_history(archive_path)
+        with load_history(archive_path) as archive:
+            self.assertEqual(list(archive), calc.get_history())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import unittest
+import app
+import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for the instrumentation hooks."""
+
+    def enable(self, **options):
+        """Enable instrumentation for one test."""
+        self.addCleanup(instrumentation.disable)
+        return instrumentation.enable(**options)
+
+    def test_disabled_leaves_functions_untouched(self):
+        """Test that disabling restores the original objects."""
+        originals = (app.divide, app.OPERATIONS["divide"],
+                     app.Calculator.calculate,
+                     app._EXPRESSION_NAMESPACE["add"])
+        instrumentation.enable()
+        self.assertIsNot(app.divide, originals[0])
+        self.assertTrue(instrumentation.is_enabled())
+        instrumentation.disable()
+        self.assertEqual((app.divide, app.OPERATIONS["divide"],
+                          app.Calculator.calculate,
+                          app._EXPRESSION_NAMESPACE["add"]), originals)
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIsNone(instrumentation.registry())
+
+    def test_counts_calls_and_errors(self):
+        """Test call and divide-by-zero error counting."""
+        registry = self.enable()
+        calc = app.Calculator()
+        self.assertEqual(calc.calculate("divide", 6, 3), 2)
+        with self.assertRaises(ValueError):
+            calc.calculate("divide", 1, 0)
+        calc.evaluate("2 + 3")
+        stats = registry.snapshot()
+        self.assertEqual(stats["divide"]["calls"], 2)
+        self.assertEqual(stats["divide"]["errors"], {"ValueError": 1})
+        self.assertEqual(stats["Calculator.calculate"]["calls"], 2)
+        self.assertEqual(stats["Calculator.evaluate"]["calls"], 1)
+        self.assertEqual(stats["add"]["calls"], 1)
+        self.assertEqual(stats["divide"]["timed"], 2)
+
+    def test_sampling(self):
+        """Test that sampling times a fraction but counts every call."""
+        registry = self.enable(sample_rate=0.1)
+        for i in range(100):
+            app.add(i, 1)
+        stats = registry.stats("add")
+        self.assertEqual(stats.calls, 100)
+        self.assertEqual(stats.timed, 10)
+        with self.assertRaises(ValueError):
+            instrumentation.enable(sample_rate=0)
+
+    def test_json_export(self):
+        """Test that the snapshot serializes to JSON."""
+        registry = self.enable()
+        app.multiply(2, 3)
+        data = json.loads(registry.to_json())
+        buckets = data["multiply"]["buckets"]
+        self.assertEqual(buckets[-1][0], "+Inf")
+        self.assertEqual(sum(count for _, count in buckets), 1)
+
+    def test_prometheus_export(self):
+        """Test the Prometheus text exposition format."""
+        registry = self.enable()
+        with self.assertRaises(ValueError):
+            app.calculate_percentage(1, 0)
+        text = registry.to_prometheus()
+        self.assertIn('calculator_calls_total{function="calculate_percentage"}'
+                      ' 1\n', text)
+        self.assertIn('calculator_errors_total{function='
+                      '"calculate_percentage",error="ValueError"} 1\n', text)
+        self.assertIn('calculator_latency_seconds_bucket{function='
+                      '"calculate_percentage",le="+Inf"} 1\n', text)
+        self.assertIn("# TYPE calculator_latency_seconds histogram", text)
+
+    def test_reset(self):
+        """Test that resetting keeps counting into the same registry."""
+        registry = self.enable()
+        app.subtract(3, 1)
+        registry.reset()
+        app.subtract(3, 1)
+        self.assertEqual(registry.stats("subtract").calls, 1)
+        self.assertEqual(registry.stats("subtract").timed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
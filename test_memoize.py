@@ -0,0 +1,122 @@
+import unittest
+from app import divide, calculate_percentage
+from memoize import MemoCache, memoize
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoize(unittest.TestCase):
+    """Test cases for the memoize decorator."""
+
+    def test_hits_and_misses(self):
+        """Test that repeated calls are answered from the cache."""
+        cached = memoize(divide)
+        self.assertEqual(cached(10, 4), 2.5)
+        self.assertEqual(cached(10, 4), 2.5)
+        stats = cached.cache_stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+        self.assertEqual(stats.hit_rate, 0.5)
+
+    def test_keys_are_typed(self):
+        """Test that int and float arguments are cached separately."""
+        cached = memoize(calculate_percentage)
+        self.assertIs(type(cached(1, 2)), float)
+        cached(1.0, 2)
+        self.assertEqual(cached.cache_stats().misses, 2)
+
+    def test_negative_caching(self):
+        """Test that errors are cached and re-raised without a call."""
+        calls = []
+
+        @memoize(maxsize=4)
+        def checked_divide(a, b):
+            calls.append((a, b))
+            return divide(a, b)
+
+        for _ in range(3):
+            with self.assertRaises(ValueError) as context:
+                checked_divide(1, 0)
+            self.assertEqual(str(context.exception), "Cannot divide by zero!")
+        self.assertEqual(calls, [(1, 0)])
+        self.assertEqual(checked_divide.cache_stats().hits, 2)
+
+    def test_uncached_exceptions(self):
+        """Test that exceptions outside cache_exceptions are not stored."""
+        cached = memoize(divide, cache_exceptions=())
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cached(1, 0)
+        self.assertEqual(cached.cache_stats().misses, 2)
+
+
+class TestEvictionPolicies(unittest.TestCase):
+    """Test cases for the MemoCache eviction policies."""
+
+    def fill(self, cache, keys):
+        """Look up every key, computing its square on a miss."""
+        for key in keys:
+            cache.call(key, lambda k: k * k, key)
+
+    def cached_keys(self, cache, keys):
+        """Return which keys are still cached without disturbing stats."""
+        return [key for key in keys
+                if key in cache._policy._entries]
+
+    def test_lru(self):
+        """Test that the least recently used entry is evicted."""
+        cache = MemoCache(maxsize=2, policy="lru")
+        self.fill(cache, [1, 2, 1, 3])
+        self.assertEqual(self.cached_keys(cache, [1, 2, 3]), [1, 3])
+        self.assertEqual(cache.stats().evictions, 1)
+
+    def test_lfu(self):
+        """Test that the least frequently used entry is evicted."""
+        cache = MemoCache(maxsize=2, policy="lfu")
+        self.fill(cache, [1, 1, 1, 2, 2, 3, 3, 4])
+        self.assertEqual(self.cached_keys(cache, [1, 2, 3, 4]), [1, 4])
+        self.assertEqual(cache.stats().evictions, 2)
+
+    def test_ttl(self):
+        """Test that entries expire after the ttl."""
+        clock = FakeClock()
+        cache = MemoCache(policy="ttl", ttl=10, clock=clock)
+        self.fill(cache, [1, 2])
+        clock.now = 5
+        self.fill(cache, [1])
+        clock.now = 11
+        self.fill(cache, [1])
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 3))
+        self.assertEqual(stats.expirations, 2)
+        self.assertEqual(stats.currsize, 1)
+
+    def test_ttl_requires_ttl(self):
+        """Test that the TTL policy needs a positive ttl."""
+        with self.assertRaises(ValueError):
+            MemoCache(policy="ttl")
+
+    def test_unknown_policy(self):
+        """Test that unknown policies are rejected."""
+        with self.assertRaises(ValueError):
+            MemoCache(policy="random")
+
+    def test_memory_cap(self):
+        """Test that max_bytes bounds the approximate cache size."""
+        cache = MemoCache(maxsize=None, max_bytes=1000)
+        self.fill(cache, range(100))
+        stats = cache.stats()
+        self.assertLessEqual(stats.nbytes, 1000)
+        self.assertGreater(stats.evictions, 0)
+        self.assertEqual(stats.currsize, 100 - stats.evictions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import array
+import math
+import unittest
+from app import divide_batch, multiply_batch
+from parallel_eval import ParallelExecutor, parallel_batch
+
+
+class TestParallelExecutor(unittest.TestCase):
+    """Test cases for multi-process batch evaluation."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start one small pool shared by every test."""
+        cls.executor = ParallelExecutor(workers=2, chunk_size=100,
+                                        min_chunk_size=10,
+                                        min_parallel_size=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the worker pool."""
+        cls.executor.close()
+
+    def test_order_preserved(self):
+        """Test that chunked results come back in input order."""
+        a = array.array("d", range(1000))
+        b = array.array("d", range(1000, 2000))
+        result = self.executor.run("multiply", a, b)
+        self.assertEqual(list(result), list(multiply_batch(a, b)))
+        self.assertGreater(self.executor.chunks_run, 1)
+
+    def test_zero_divisor_mask(self):
+        """Test that zero divisors follow the batch fill/mask policy."""
+        a = [float(i) for i in range(500)]
+        b = [float(i % 5) for i in range(500)]
+        result, mask = self.executor.run("divide", a, b, fill=-1,
+                                         return_mask=True)
+        expected, expected_mask = divide_batch(a, b, fill=-1,
+                                               return_mask=True)
+        self.assertEqual(list(result), list(expected))
+        self.assertEqual([bool(m) for m in mask],
+                         [bool(m) for m in expected_mask])
+
+    def test_scalar_operand(self):
+        """Test that a scalar second operand is broadcast."""
+        result = self.executor.run("calculate_percentage", [1, 2, 3], 4)
+        self.assertEqual(list(result), [25.0, 50.0, 75.0])
+
+    def test_chunk_size_tuned(self):
+        """Test that the chunk size stays within its bounds."""
+        self.executor.run("add", list(range(5000)), 1)
+        self.assertGreaterEqual(self.executor.chunk_size, 10)
+        self.assertLessEqual(self.executor.chunk_size, 1 << 22)
+
+    def test_invalid_input(self):
+        """Test that bad operations and shapes are rejected."""
+        with self.assertRaises(ValueError):
+            self.executor.run("modulo", [1], [1])
+        with self.assertRaises(ValueError):
+            self.executor.run("add", [1, 2], [1])
+        with self.assertRaises(ValueError):
+            self.executor.run("add", 1, [1])
+
+
+class TestParallelBatch(unittest.TestCase):
+    """Test cases for the parallel_batch helper."""
+
+    def test_inline_for_small_inputs(self):
+        """Test that small inputs are evaluated in-process."""
+        result = parallel_batch("divide", [1, 2], [0, 2])
+        self.assertTrue(math.isnan(result[0]))
+        self.assertEqual(result[1], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
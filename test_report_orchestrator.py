@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import generate_coverage_style_report
+import generate_jenkins_report
+from report_orchestrator import REPORTS, build_order, main, run_reports
+
+TESTDATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "testdata")
+PAGES = {"jenkins": "jenkins-pytest-report.html",
+         "coverage-style": os.path.join("pytest-report", "index.html"),
+         "dashboard": "reports-dashboard.html"}
+
+
+class TestReportOrchestrator(unittest.TestCase):
+    """Test cases for the concurrent report orchestrator."""
+
+    def setUp(self):
+        """Run the generators in a scratch directory with sample input."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        shutil.copy(os.path.join(TESTDATA, "test-results-sample.json"),
+                    "test-results.json")
+
+    def test_dashboard_runs_last(self):
+        """Test that the dashboard waits for the reports it links."""
+        order = build_order()
+        self.assertEqual(order[-1], "dashboard")
+        self.assertEqual(sorted(order), sorted(REPORTS))
+        self.assertEqual(build_order(["dashboard", "jenkins"]),
+                         ["jenkins", "dashboard"])
+        self.assertEqual(build_order(["dashboard"]), ["dashboard"])
+
+    def test_bad_graphs_are_rejected(self):
+        """Test unknown reports and dependency cycles."""
+        with self.assertRaises(ValueError):
+            build_order(["nonexistent"])
+        cycle = {"a": ("m", "f", ("b",)), "b": ("m", "f", ("a",))}
+        with mock.patch.dict(REPORTS, cycle, clear=True):
+            with self.assertRaises(ValueError):
+                build_order()
+
+    def test_reports_built_concurrently(self):
+        """Test that a process pool writes every requested report."""
+        with mock.patch("builtins.print"), mock.patch("sys.stdout"):
+            results = run_reports(list(PAGES), jobs=2)
+        self.assertEqual(set(results), set(PAGES))
+        for name, (ok, seconds) in results.items():
+            self.assertTrue(ok, name)
+            self.assertGreaterEqual(seconds, 0)
+            self.assertTrue(os.path.exists(PAGES[name]), name)
+
+    def test_summary_read_once(self):
+        """Test that generators use the summary read by the orchestrator."""
+        with mock.patch.object(generate_jenkins_report, "read_summary",
+                               side_effect=AssertionError), \
+                mock.patch.object(generate_coverage_style_report,
+                                  "read_summary",
+                                  side_effect=AssertionError), \
+                mock.patch("builtins.print"), mock.patch("sys.stdout"):
+            results = run_reports(["jenkins", "coverage-style"], jobs=1)
+        self.assertTrue(all(ok for ok, _ in results.values()))
+
+    def test_failures_set_exit_code(self):
+        """Test that a failed generator fails the command."""
+        os.remove("test-results.json")
+        with mock.patch("builtins.print"), mock.patch("sys.stdout"):
+            self.assertEqual(main(["--jobs", "1", "jenkins"]), 1)
+            self.assertEqual(main(["--jobs", "1", "dashboard"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
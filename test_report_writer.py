@@ -0,0 +1,215 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+import generate_coverage_style_report
+import generate_jenkins_report
+from report_writer import StreamingHTMLWriter
+
+TESTDATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "testdata")
+
+
+class FixedDatetime(datetime.datetime):
+    """A datetime whose now() is the time the golden files were made."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 1, 2, 3, 4, 5)
+
+
+def synthetic_tests(count):
+    """Yield pytest-json-report style test entries."""
+    for i in range(count):
+        outcome = "failed" if i % 10 == 0 else "passed"
+        yield {"nodeid": f"test_app.py::TestMany::test_{i}",
+               "outcome": outcome, "file": "test_app.py",
+               "function": f"test_{i}", "duration": i / 1000,
+               "call": {"longrepr": "E   AssertionError\n" * 5}}
+
+
+def read_script(path, callback):
+    """Return the arguments of the callback a data script makes."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    prefix = f"{callback}("
+    assert text.startswith(prefix) and text.endswith(");\n"), text[:80]
+    return json.loads(f"[{text[len(prefix):-3]}]")
+
+
+class TestReportGenerators(unittest.TestCase):
+    """Test cases for the streaming report generators."""
+
+    def setUp(self):
+        """Run the generators in a scratch directory with sample input."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        shutil.copy(os.path.join(TESTDATA, "test-results-sample.json"),
+                    "test-results.json")
+        for module in (generate_jenkins_report,
+                       generate_coverage_style_report):
+            patcher = mock.patch.object(module, "datetime", FixedDatetime)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assertSameBytes(self, path, expected):
+        """Compare a generated file with a golden file."""
+        with open(path, "rb") as f, open(
+                os.path.join(TESTDATA, expected), "rb") as golden:
+            self.assertEqual(f.read(), golden.read())
+
+    def test_jenkins_report_unchanged(self):
+        """Test that the Jenkins report matches the golden file."""
+        with mock.patch("builtins.print"):
+            self.assertTrue(
+                generate_jenkins_report.generate_jenkins_compatible_report())
+        self.assertSameBytes("jenkins-pytest-report.html",
+                             "jenkins-pytest-report.expected.html")
+        self.assertFalse(os.path.exists("jenkins-pytest-report.html.tmp"))
+
+    def test_coverage_style_report_unchanged(self):
+        """Test that the coverage-style report matches the golden file."""
+        with mock.patch("builtins.print"):
+            self.assertTrue(generate_coverage_style_report
+                            .generate_coverage_style_report())
+        self.assertSameBytes(os.path.join("pytest-report", "index.html"),
+                             "pytest-report-index.expected.html")
+        [index] = read_script("pytest-report/shards/index.js",
+                              "pytestReportIndex")
+        self.assertEqual(index, {
+            "build": "20240102030405", "total": 5, "shardSize": 1000,
+            "shards": [{"file": "shard-00000.js", "count": 5, "failed": 2}],
+            "outcomes": {"passed": "0,1,2,1", "failed": "1,1,2,1",
+                         "skipped": "2,1"}})
+        words, postings, _ = read_script("pytest-report/shards/search.js",
+                                         "pytestReportSearch")
+        words = words.split("\n")
+        position = words.index("divide")
+        self.assertEqual(postings.split("\n")[position], "1,1")
+        self.assertIn("unexpected", words)
+        rows = read_script("pytest-report/shards/shard-00000.js",
+                           "pytestReportShard")
+        self.assertEqual(rows[0], 0)
+        self.assertEqual(rows[1][1], [
+            "test_app.py::TestMathFunctions::test_divide", "failed", 0.0125,
+            "test_app.py", "test_divide",
+            "test_app.py:42: in test_divide\n"
+            "    self.assertEqual(divide(6, 3), 3)\n"
+            "E   AssertionError: 2.0 != 3 <unexpected> & \"quoted\""])
+        self.assertEqual(rows[1][4], ["test_app.py::TestCalculator::"
+                                      "test_broken", "failed", 0.75, "N/A",
+                                      "N/A", "No details available"])
+
+    def test_cached_rows_give_same_reports(self):
+        """Test that a rebuild from the row cache is byte-identical."""
+        with mock.patch("builtins.print"):
+            for _ in range(2):
+                self.assertTrue(generate_jenkins_report
+                                .generate_jenkins_compatible_report(
+                                    cache_dir=".report-cache"))
+        self.assertSameBytes("jenkins-pytest-report.html",
+                             "jenkins-pytest-report.expected.html")
+        self.assertEqual(os.listdir(".report-cache"), ["jenkins.pack"])
+
+    def peak_memory(self, write, count):
+        """Return the peak traced memory of streaming ``count`` tests."""
+        tracemalloc.start()
+        try:
+            write(synthetic_tests(count))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_stays_flat(self):
+        """Test that peak memory does not grow with the test count."""
+        def write_jenkins(tests):
+            with StreamingHTMLWriter("report.html") as out:
+                out.writelines(
+                    generate_jenkins_report.render_jenkins_report(tests, {}))
+
+        def write_shards(tests):
+            generate_coverage_style_report.write_test_shards(
+                tests, "pytest-report", shard_size=500, search=False)
+
+        for write in (write_jenkins, write_shards):
+            with self.subTest(write=write.__name__):
+                small = self.peak_memory(write, 1000)
+                large = self.peak_memory(write, 20000)
+                self.assertLess(large, small * 1.5)
+        self.assertGreater(os.path.getsize("report.html"), 20000 * 500)
+        self.assertEqual(len(os.listdir(os.path.join("pytest-report",
+                                                     "shards"))), 41)
+
+
+class TestTestShards(unittest.TestCase):
+    """Test cases for the coverage-style report's test data shards."""
+
+    def setUp(self):
+        """Write shards into a scratch directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.shard_dir = os.path.join(tmp.name, "shards")
+
+    def write(self, count, shard_size):
+        """Write ``count`` synthetic tests; return the index."""
+        return generate_coverage_style_report.write_test_shards(
+            synthetic_tests(count), self.directory, shard_size=shard_size)
+
+    def test_tests_are_paged(self):
+        """Test that every test lands in order in a shard of its page."""
+        index = self.write(25, shard_size=10)
+        self.assertEqual(index["total"], 25)
+        self.assertEqual([(shard["count"], shard["failed"])
+                          for shard in index["shards"]],
+                         [(10, 1), (10, 1), (5, 1)])
+        names = []
+        for number, shard in enumerate(index["shards"]):
+            args = read_script(os.path.join(self.shard_dir, shard["file"]),
+                               "pytestReportShard")
+            self.assertEqual(args[0], number)
+            names.extend(row[0] for row in args[1])
+        self.assertEqual(names, [test["nodeid"]
+                                 for test in synthetic_tests(25)])
+
+    def test_stale_shards_are_removed(self):
+        """Test that a smaller report deletes the extra old shards."""
+        self.write(25, shard_size=10)
+        self.write(5, shard_size=10)
+        self.assertEqual(sorted(os.listdir(self.shard_dir)),
+                         ["index.js", "search.js", "shard-00000.js"])
+
+    def test_empty_suite(self):
+        """Test that a run without tests writes an empty index."""
+        index = self.write(0, shard_size=10)
+        self.assertEqual((index["total"], index["shards"]), (0, []))
+        self.assertEqual(sorted(os.listdir(self.shard_dir)),
+                         ["index.js", "search.js"])
+
+
+class TestStreamingHTMLWriter(unittest.TestCase):
+    """Test cases for the incremental report writer."""
+
+    def test_failed_render_keeps_previous_report(self):
+        """Test that an error leaves the old report in place."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.html")
+            with StreamingHTMLWriter(path) as out:
+                out.write("old")
+            with self.assertRaises(RuntimeError):
+                with StreamingHTMLWriter(path) as out:
+                    out.write("partial")
+                    raise RuntimeError("render failed")
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "old")
+            self.assertEqual(os.listdir(tmp), ["report.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import results_reader
+from results_reader import iter_tests, read_summary
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "testdata", "test-results-sample.json")
+
+
+class TestResultsReader(unittest.TestCase):
+    """Test cases for the streaming test-results.json reader."""
+
+    def setUp(self):
+        """Use the pure-Python tokenizer with a scratch directory."""
+        patcher = mock.patch("results_reader.ijson", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "test-results.json")
+
+    def write(self, text):
+        """Write a results file and return its path."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return self.path
+
+    def test_matches_json_load(self):
+        """Test that summary and tests match a full json.load."""
+        with open(SAMPLE, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(read_summary(SAMPLE), data["summary"])
+        self.assertEqual(list(iter_tests(SAMPLE)), data["tests"])
+
+    def test_values_split_across_chunks(self):
+        """Test strings, escapes and numbers cut at every chunk boundary."""
+        tests = [{"nodeid": f"test_{i}", "duration": 1234.5678e-3 * i,
+                  "call": {"longrepr": 'E  "quoted" \\ back\\\\slash ☃'
+                           + "\\" * i + '"}]{[,'}}
+                 for i in range(20)]
+        document = {"summary": {"total": 20, "duration": 98765.4321},
+                    "tests": tests, "warnings": []}
+        for indent in (None, 1):
+            path = self.write(json.dumps(document, indent=indent,
+                                         ensure_ascii=False))
+            for chunk_size in (1, 2, 3, 5, 64):
+                with self.subTest(indent=indent, chunk_size=chunk_size):
+                    with mock.patch("results_reader.CHUNK_SIZE",
+                                    chunk_size):
+                        self.assertEqual(list(iter_tests(path)), tests)
+                        self.assertEqual(read_summary(path),
+                                         document["summary"])
+
+    def test_summary_after_tests(self):
+        """Test that a trailing summary is found by skipping the tests."""
+        path = self.write('{"tests": [{"a": "}"}, [1, 2]], '
+                          '"summary": {"total": 2}}')
+        self.assertEqual(read_summary(path), {"total": 2})
+
+    def test_summary_reads_only_the_start(self):
+        """Test that the summary pass stops before the tests."""
+        path = self.write('{"created": 1, "summary": {"passed": 1}, '
+                          '"tests": [not json at all')
+        self.assertEqual(read_summary(path), {"passed": 1})
+        with self.assertRaises(ValueError):
+            list(iter_tests(path))
+
+    def test_missing_keys(self):
+        """Test files without a summary or tests."""
+        path = self.write('{"created": 1.5, "exitcode": 0}')
+        self.assertEqual(read_summary(path), {})
+        self.assertEqual(list(iter_tests(path)), [])
+
+    def test_invalid_json(self):
+        """Test that malformed files raise ValueError."""
+        for text in ("", "[]", '{"tests": [1, }', '{"tests": ['):
+            with self.subTest(text=text):
+                path = self.write(text)
+                with self.assertRaises(ValueError):
+                    read_summary(path)
+                with self.assertRaises(ValueError):
+                    list(iter_tests(path))
+
+
+class TestIjsonBackend(unittest.TestCase):
+    """Test cases for the optional ijson backend."""
+
+    @unittest.skipIf(results_reader.ijson is None, "ijson is not installed")
+    def test_matches_json_load(self):
+        """Test that ijson reads the same summary and tests."""
+        with open(SAMPLE, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(read_summary(SAMPLE), data["summary"])
+        self.assertEqual(list(iter_tests(SAMPLE)), data["tests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+from results_reader import read_summary
+from run_tests import generate_reports, main
+
+SAMPLE_TESTS = textwrap.dedent('''
+    def test_passes():
+        assert 1 + 1 == 2
+
+
+    def test_fails():
+        assert 1 + 1 == 3
+''')
+
+
+class TestRunTests(unittest.TestCase):
+    """Test cases for the single-run test entry point."""
+
+    def setUp(self):
+        """Work in a scratch directory holding a tiny test suite."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        with open("test_sample.py", "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TESTS)
+
+    def test_one_run_feeds_every_report(self):
+        """Test that every report comes from a single pytest run."""
+        with mock.patch("subprocess.run") as run, \
+                mock.patch("builtins.print"):
+            exit_code = main(["--no-coverage", "--jobs", "1", "--", "-q",
+                              "-p", "no:cacheprovider", "test_sample.py"])
+        self.assertEqual(exit_code, 1)
+        run.assert_not_called()
+        summary = read_summary("test-results.json")
+        self.assertEqual((summary["passed"], summary["failed"]), (1, 1))
+        for path in ("pytest-report.html", "jenkins-pytest-report.html",
+                     os.path.join("pytest-report", "index.html"),
+                     "reports-dashboard.html"):
+            self.assertTrue(os.path.exists(path), path)
+
+    def test_missing_results_do_not_rerun_pytest(self):
+        """Test that generators never re-run the suite for the runner."""
+        with mock.patch("subprocess.run") as run, \
+                mock.patch("builtins.print"):
+            self.assertFalse(generate_reports("missing.json", jobs=1))
+        run.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from search_index import (PREFIX_MIN_WORDS, Runs, SearchIndex, decode_runs,
+                          failure_message, words)
+
+
+def prefix_search(data, query):
+    """Answer a query the way the report's script does."""
+    matches = None
+    for word in words(query):
+        found = set()
+        for position, indexed in enumerate(data["words"]):
+            if indexed.startswith(word):
+                found.update(decode_runs(data["postings"][position]))
+        matches = found if matches is None else matches & found
+    return sorted(matches)
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Test cases for the report filter's prebuilt search index."""
+
+    def setUp(self):
+        """Index a few tests."""
+        self.tests = [
+            {"nodeid": "test_app.py::TestCalculator::test_divide",
+             "outcome": "failed", "file": "test_app.py",
+             "call": {"longrepr": "tb\nE   ZeroDivisionError: boom"}},
+            {"nodeid": "test_app.py::TestCalculator::test_add",
+             "outcome": "passed", "file": "test_app.py"},
+            {"nodeid": "test_web.py::test_index[café]",
+             "outcome": "passed", "file": "test_web.py",
+             "call": {"longrepr": "E   NotIndexed"}},
+        ]
+        self.index = SearchIndex()
+        for number, test in enumerate(self.tests):
+            self.index.add(number, test)
+        self.data = self.index.to_dict()
+
+    def test_words(self):
+        """Test that words split at ASCII punctuation and are lowercase."""
+        self.assertEqual(words("test_app.py::TestCalc[CafÉ-2]"),
+                         ["test", "app", "py", "testcalc", "café", "2"])
+
+    def test_queries_match_word_prefixes(self):
+        """Test that every query word must start an indexed word."""
+        self.assertEqual(prefix_search(self.data, "testcalc div"), [0])
+        self.assertEqual(prefix_search(self.data, "TEST_"), [0, 1, 2])
+        self.assertEqual(prefix_search(self.data, "zerodiv"), [0])
+        self.assertEqual(prefix_search(self.data, "café"), [2])
+        self.assertEqual(prefix_search(self.data, "alc"), [])
+
+    def test_only_failure_messages_are_indexed(self):
+        """Test that tracebacks and passing tests' longrepr are skipped."""
+        self.assertNotIn("tb", self.data["words"])
+        self.assertNotIn("notindexed", self.data["words"])
+        self.assertEqual(failure_message("a\nb"), "b")
+
+    def test_words_are_in_javascript_order(self):
+        """Test that words sort by UTF-16 code units."""
+        index = SearchIndex()
+        index.add(0, {"nodeid": "\U0001f600 Ａ"})
+        self.assertEqual(index.to_dict()["words"], ["\U0001f600", "ａ"])
+
+    def test_common_prefixes_are_precomputed(self):
+        """Test the unions stored for prefixes of many words."""
+        index = SearchIndex()
+        count = PREFIX_MIN_WORDS + 5
+        for number in range(count):
+            index.add(number, {"nodeid": f"k{number} other{number % 2}"})
+        data = index.to_dict()
+        self.assertEqual(decode_runs(data["prefixes"]["k"]),
+                         list(range(count)))
+        self.assertNotIn("o", data["prefixes"])
+        self.assertEqual(prefix_search(data, "k1"),
+                         [1] + list(range(10, 20)))
+
+    def test_runs(self):
+        """Test the run-length encoding of test numbers."""
+        numbers = [0, 1, 2, 5, 7, 8, 100]
+        encoded = Runs(numbers).encode()
+        self.assertEqual(encoded, "0,3,2,1,1,2,91,1")
+        self.assertEqual(decode_runs(encoded), numbers)
+        self.assertEqual(Runs().encode(), "")
+        self.assertEqual(decode_runs(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from sessions import SESSION_OVERHEAD, SessionManager
+
+
+class FakeClock:
+    """A manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionManager(unittest.TestCase):
+    """Test cases for the memory-bounded session manager."""
+
+    def setUp(self):
+        """Create a scratch spill directory and a manager using it."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill_dir = os.path.join(tmp.name, "spill")
+        self.clock = FakeClock()
+        self.sessions = SessionManager(3 * SESSION_OVERHEAD + 40000,
+                                       spill_dir=self.spill_dir,
+                                       idle_timeout=60, clock=self.clock)
+        self.addCleanup(self.sessions.close)
+
+    def fill(self, session_id, count=1000):
+        """Record ``count`` additions in a session."""
+        calc = self.sessions.get(session_id)
+        for i in range(count):
+            calc.record("+", i, 1, i + 1)
+        calc.add_to_history("sqrt 4", 2)
+        return calc.get_history()
+
+    def test_same_calculator(self):
+        """Test that a resident session keeps its Calculator."""
+        calc = self.sessions.get("alice")
+        self.assertIs(self.sessions.get("alice"), calc)
+        self.assertIn("alice", self.sessions)
+        self.assertEqual(len(self.sessions), 1)
+
+    def test_spill_and_rehydrate(self):
+        """Test that sessions over budget spill and load back lazily."""
+        history = self.fill("alice")
+        for name in ("bob", "carol", "dave"):
+            self.fill(name)
+        self.sessions.sweep()
+        stats = self.sessions.stats()
+        self.assertLessEqual(stats["memory"], stats["memory_budget"])
+        self.assertEqual(stats["sessions"], 4)
+        self.assertGreater(stats["spilled"], 0)
+        self.assertEqual(len(os.listdir(self.spill_dir)), stats["spilled"])
+        self.assertEqual(self.sessions.get("alice").get_history(), history)
+        metrics = self.sessions.metrics.snapshot()
+        self.assertEqual(metrics["spill"]["calls"], stats["spilled"] + 1)
+        self.assertEqual(metrics["rehydrate"]["calls"], 1)
+        self.assertEqual(metrics["rehydrate"]["timed"], 1)
+
+    def test_evict_without_spill_dir(self):
+        """Test that sessions are dropped when nothing can spill."""
+        sessions = SessionManager(SESSION_OVERHEAD + 20000)
+        calc = sessions.get("alice")
+        for i in range(1000):
+            calc.record("*", i, 2, i * 2)
+        sessions.get("bob")
+        self.assertNotIn("alice", sessions)
+        self.assertEqual(sessions.get("alice").get_history(), [])
+        self.assertEqual(sessions.metrics.stats("evict").calls, 1)
+
+    def test_idle_sweep(self):
+        """Test that idle sessions spill even under budget."""
+        history = self.fill("alice", 10)
+        self.clock.now = 30
+        self.fill("bob", 10)
+        self.clock.now = 61
+        self.assertEqual(self.sessions.sweep(), 1)
+        self.assertEqual(self.sessions.stats()["spilled"], 1)
+        self.assertEqual(self.sessions.get("alice").get_history(), history)
+
+    def test_remove_deletes_spill_file(self):
+        """Test that removing a spilled session deletes its file."""
+        self.fill("alice", 10)
+        self.clock.now = 120
+        self.sessions.sweep()
+        self.sessions.remove("alice")
+        self.assertNotIn("alice", self.sessions)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_capacity_survives_spill(self):
+        """Test that a bounded history stays bounded after rehydrating."""
+        sessions = SessionManager(10 ** 6, spill_dir=self.spill_dir,
+                                  idle_timeout=0, history_capacity=3,
+                                  clock=self.clock)
+        self.addCleanup(sessions.close)
+        calc = sessions.get("alice")
+        for i in range(5):
+            calc.record("-", i, 1, i - 1)
+        sessions.sweep()
+        calc = sessions.get("alice")
+        calc.record("-", 9, 1, 8)
+        self.assertEqual(calc.get_history(),
+                         ["3 - 1 = 2", "4 - 1 = 3", "9 - 1 = 8"])
+
+    def test_invalid_budget(self):
+        """Test that a non-positive budget is rejected."""
+        with self.assertRaises(ValueError):
+            SessionManager(0)
+
+
+if __name__ == "__main__":
+    unittest.main()